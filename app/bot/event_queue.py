@@ -0,0 +1,132 @@
+import logging  # 匯入日誌工具
+import queue  # 匯入執行緒安全佇列
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+import zlib  # 匯入穩定雜湊
+from collections import deque  # 匯入固定長度佇列
+from typing import Any, Callable  # 匯入型別提示
+
+from app.core.statistics import percentile  # 匯入百分位數工具
+
+
+logger = logging.getLogger(__name__)  # 模組日誌
+
+_STOP = object()  # 通知 worker 結束的哨兵物件
+
+
+def source_key(event: Any) -> str:
+    source = getattr(event, "source", None)  # 事件來源（群組 / 多人聊天室 / 個人）
+    for attribute in ("group_id", "room_id", "user_id"):
+        value = getattr(source, attribute, None)  # 依序取群組、聊天室、使用者 ID
+        if value:
+            return value  # 同一個聊天室的事件使用同一個鍵
+    return ""  # 沒有來源的事件集中到同一個 worker
+
+
+class WebhookEventQueue:
+    def __init__(self, dispatch_func: Callable[[Any, str | None], None], worker_count: int, max_size: int) -> None:
+        self._dispatch_func = dispatch_func  # 單一事件分派函式
+        self._worker_count = max(1, worker_count)  # worker 數量至少 1
+        per_worker_size = -(-max(0, max_size) // self._worker_count)  # 總上限平均分給各 worker（0 代表不限長度）
+        self._queues: list[queue.Queue] = [
+            queue.Queue(maxsize=per_worker_size) for _ in range(self._worker_count)
+        ]  # 每個 worker 一個佇列，同一聊天室的事件依序處理
+        self._workers: list[threading.Thread] = []  # 已啟動 worker
+        self._lock = threading.Lock()  # 統計用鎖
+        self._recent_waits: deque[float] = deque(maxlen=1000)  # 最近等待時間（秒）
+        self._enqueued = 0  # 已排入事件數
+        self._processed = 0  # 已處理事件數
+        self._failed = 0  # 處理失敗事件數
+        self._rejected = 0  # 佇列已滿被拒事件數
+        self._max_depth = 0  # 觀察到的最大佇列深度
+        self._total_wait = 0.0  # 累積等待時間
+        self._max_wait = 0.0  # 最大等待時間
+
+    @property
+    def running(self) -> bool:
+        return any(worker.is_alive() for worker in self._workers)  # 是否有 worker 執行中
+
+    def start(self) -> None:
+        if self.running:
+            return  # 已啟動就略過
+        self._workers = [
+            threading.Thread(target=self._worker_loop, args=(worker_queue,), name=f"webhook-worker-{index}", daemon=True)
+            for index, worker_queue in enumerate(self._queues)
+        ]  # 建立 worker 執行緒（各自消化自己的佇列）
+        for worker in self._workers:
+            worker.start()  # 啟動 worker
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._workers:
+            for worker_queue in self._queues:
+                worker_queue.put(_STOP)  # 每個 worker 一個結束訊號（排在既有事件之後）
+        for worker in self._workers:
+            worker.join(timeout=timeout)  # 等待 worker 處理完剩餘事件
+        self._workers = []  # 清空 worker 清單
+
+    def _queue_for(self, event: Any) -> queue.Queue:
+        index = zlib.crc32(source_key(event).encode("utf-8")) % self._worker_count  # 跨程序重啟也穩定的分配
+        return self._queues[index]  # 同一聊天室固定交給同一個 worker
+
+    def depth(self) -> int:
+        return sum(worker_queue.qsize() for worker_queue in self._queues)  # 所有 worker 佇列的總深度
+
+    def submit(self, event: Any, destination: str | None = None, timeout: float = 0.0) -> bool:
+        try:
+            self._queue_for(event).put(
+                (event, destination, time.perf_counter()), block=timeout > 0, timeout=timeout if timeout > 0 else None
+            )  # 排入事件與排入時間（該聊天室的佇列已滿時最多等待 timeout 秒）
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1  # 佇列已滿
+            return False  # 交由呼叫端回應 503 讓 LINE 重送
+        with self._lock:
+            self._enqueued += 1  # 累計排入數
+            self._max_depth = max(self._max_depth, self.depth())  # 更新最大深度
+        return True  # 排入成功
+
+    def _worker_loop(self, worker_queue: queue.Queue) -> None:
+        while True:
+            item = worker_queue.get()  # 取出事件
+            if item is _STOP:
+                worker_queue.task_done()  # 標記哨兵完成
+                return  # 結束 worker
+            event, destination, enqueued_at = item  # 拆解事件資料
+            waited = time.perf_counter() - enqueued_at  # 在佇列中等待的時間
+            failed = False  # 是否處理失敗
+            try:
+                self._dispatch_func(event, destination)  # 交給 LINE 事件處理器
+            except Exception:
+                failed = True  # 單一事件失敗不影響 worker
+                logger.exception("webhook 事件處理失敗")  # 記錄錯誤
+            finally:
+                worker_queue.task_done()  # 標記事件完成
+            with self._lock:
+                self._processed += 1  # 累計處理數
+                self._failed += int(failed)  # 累計失敗數
+                self._total_wait += waited  # 累計等待時間
+                self._max_wait = max(self._max_wait, waited)  # 更新最大等待時間
+                self._recent_waits.append(waited)  # 保留最近等待時間
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent_waits)  # 排序後計算百分位數
+            processed = self._processed  # 已處理數
+            snapshot = {
+                "workers": self._worker_count,
+                "running": self.running,
+                "depth": self.depth(),
+                "worker_depths": [worker_queue.qsize() for worker_queue in self._queues],
+                "max_size": sum(worker_queue.maxsize for worker_queue in self._queues),
+                "max_depth": self._max_depth,
+                "enqueued": self._enqueued,
+                "processed": processed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "wait_avg_ms": round(self._total_wait / processed * 1000, 2) if processed else 0.0,
+                "wait_max_ms": round(self._max_wait * 1000, 2),
+            }  # 佇列統計快照
+        snapshot["wait_p50_ms"] = round(percentile(recent, 0.50) * 1000, 2)  # 最近等待時間中位數
+        snapshot["wait_p95_ms"] = round(percentile(recent, 0.95) * 1000, 2)  # 最近等待時間 p95
+        return snapshot  # 回傳統計
+
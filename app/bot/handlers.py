@@ -1,38 +1,186 @@
+import asyncio  # 匯入 asyncio 工具
+from dataclasses import replace  # 匯入快照替換工具
+from functools import partial  # 匯入參數綁定工具
+from typing import Awaitable, Callable  # 匯入型別提示
+
 from linebot.v3 import WebhookHandler  # 匯入 Webhook Handler
+from linebot.v3.webhook import WebhookPayload  # 匯入 Webhook 解析結果
 from linebot.v3.exceptions import InvalidSignatureError  # 匯入簽章錯誤
 from linebot.v3.messaging import (
-    ApiClient,
     Configuration,
     FlexMessage,
-    MessagingApi,
     ReplyMessageRequest,
     TextMessage,
 )  # 匯入 Messaging API
-from linebot.v3.webhooks import FollowEvent, JoinEvent, MessageEvent, TextMessageContent  # 匯入事件型別
+from linebot.v3.webhooks import Event, FollowEvent, JoinEvent, MessageEvent, TextMessageContent  # 匯入事件型別
 
+from app.bot.line_client import LineReplyClient  # 匯入共用 LINE 回覆客戶端
 from app.core.config import settings  # 匯入設定
+from app.core.deadline import DeadlineExceeded, deadline_after  # 匯入事件期限工具
+from app.core.metrics import (
+    command_hits_total,
+    event_seconds,
+    events_total,
+    translation_fallbacks_total,
+    webhook_duplicates_total,
+)  # 匯入指標
 from app.core.languages import SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE_CODE, DEFAULT_LANGUAGE_LABEL  # 匯入語言設定
-from app.db.session import SessionLocal  # 匯入資料庫 Session
-from app.repositories.user_repository import get_user_by_line_id, create_user, update_user_language  # 匯入使用者存取
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.db.session import SessionLocal, get_async_sessionmaker  # 匯入資料庫 Session
+from app.repositories.chat_context_repository import ChatContext, load_chat_context  # 匯入對話情境快照
+from app.repositories.user_repository import set_user_language  # 匯入使用者存取
 from app.repositories.group_repository import (
     get_group,
     create_group,
-    bind_group_inviter,
-    set_group_inviter,
-    get_group_languages,
+    replace_group_inviter,
+    try_bind_group_inviter,
 )  # 匯入群組存取
-from app.services.id_service import generate_member_code  # 匯入編號服務
-from app.services.translation_service import translate_text  # 匯入翻譯服務
+from app.services.translation_service import translate_text, translate_text_async  # 匯入翻譯服務
+from app.services.user_service import create_missing_users, provision_user, provision_users, provision_users_async  # 匯入使用者建立服務
 from app.services.permission_service import can_manage_group  # 匯入權限服務
-from app.ui.menu_cards import build_main_menu_card  # 匯入主選單小卡
+from app.services.usage_service import limit_group_languages  # 匯入群組字元額度政策
+from app.services.webhook_dedup_service import webhook_event_store  # 匯入 webhook 事件去重
+from app.ui.card_cache import FlexCardCache, PreparedMessage, get_language_setting_card, get_main_menu_card  # 匯入預先序列化小卡快取
 from app.fanfan_core.language_profile import resolve_language_code, parse_language_labels  # 匯入舊版語言解析核心
-from app.fanfan_core.group_service import ensure_group_exists, toggle_or_set_languages, reset_languages  # 匯入舊版群組設定核心
-from app.fanfan_core.formatting import format_language_updated, format_translation_results  # 匯入舊版輸出格式核心
-from app.fanfan_core.menu_builder import build_legacy_language_setting_card  # 匯入舊版語言設定卡
-
-
-configuration = Configuration(access_token=settings.line_channel_access_token)  # 建立 LINE API 設定
-line_handler = WebhookHandler(settings.line_channel_secret)  # 建立 webhook handler
+from app.fanfan_core.group_service import toggle_or_set_languages, reset_languages  # 匯入舊版群組設定核心
+from app.fanfan_core.formatting import (
+    DEADLINE_MISSED_TEXT,
+    format_language_updated,
+    format_translation_results,
+    format_translation_results_async,
+)  # 匯入舊版輸出格式核心
+
+
+class LineEventDispatcher(WebhookHandler):
+    def __init__(self, channel_secret: str) -> None:
+        super().__init__(channel_secret)  # 初始化 SDK handler
+        self._async_handlers: dict[str, Callable[[Event], Awaitable[None]]] = {}  # asyncio 版事件處理器
+
+    def parse(self, body: str, signature: str) -> WebhookPayload:
+        return self.parser.parse(body, signature, as_payload=True)  # 驗證簽章並解析事件
+
+    def add_async(self, event: type, message: type | None = None):
+        def decorator(func: Callable[[Event], Awaitable[None]]):
+            key = f"{event.__name__}_{message.__name__}" if message else event.__name__  # 與 SDK 相同的處理器 key
+            self._async_handlers[key] = func  # 登記 asyncio 處理器
+            return func
+        return decorator
+
+    @staticmethod
+    def _find_handler(event: Event, handlers: dict):
+        func = None  # 對應的事件處理函式
+        if isinstance(event, MessageEvent):
+            func = handlers.get(f"{event.__class__.__name__}_{event.message.__class__.__name__}")  # 先找訊息型別處理器
+        if func is None:
+            func = handlers.get(event.__class__.__name__)  # 再找事件型別處理器
+        return func  # 回傳處理器（可能為 None）
+
+    @staticmethod
+    def _claim(event: Event, event_type: str) -> bool:
+        is_redelivery = _is_redelivery(event)  # 是否為重送
+        claimed = webhook_event_store.claim(getattr(event, "webhook_event_id", None), is_redelivery)  # 登記事件 ID
+        return _count_claim(claimed, event_type, is_redelivery)  # 記錄指標並回傳是否可處理
+
+    @staticmethod
+    async def _claim_async(event: Event, event_type: str) -> bool:
+        is_redelivery = _is_redelivery(event)  # 是否為重送
+        claimed = await webhook_event_store.claim_async(getattr(event, "webhook_event_id", None), is_redelivery)  # 以 asyncio driver 登記
+        return _count_claim(claimed, event_type, is_redelivery)  # 記錄指標並回傳是否可處理
+
+    def dispatch_event(self, event: Event, destination: str | None = None) -> None:
+        func = self._find_handler(event, self._handlers) or self._default  # 找不到時使用預設處理器
+        event_type = _event_type_label(event)  # 事件類型標籤
+        if not self._claim(event, event_type):
+            return  # 重複事件
+        if func is None:
+            return  # 無處理器就略過
+        try:
+            with event_seconds.time(event_type=event_type):
+                func(event)  # 執行處理器並記錄耗時
+        except Exception:
+            webhook_event_store.release(getattr(event, "webhook_event_id", None))  # 處理失敗時允許 LINE 重送後再處理
+            raise
+
+    async def dispatch_event_async(self, event: Event, destination: str | None = None) -> None:
+        async_func = self._find_handler(event, self._async_handlers)  # 優先使用 asyncio 處理器
+        func = None if async_func else self._find_handler(event, self._handlers) or self._default  # 其他事件沿用同步處理器
+        event_type = _event_type_label(event)  # 事件類型標籤
+        if not await self._claim_async(event, event_type):
+            return  # 重複事件
+        if async_func is None and func is None:
+            return  # 無處理器就略過
+        try:
+            with event_seconds.time(event_type=event_type):
+                if async_func is not None:
+                    await async_func(event)  # asyncio 處理器
+                else:
+                    await asyncio.to_thread(func, event)  # 其他事件沿用同步處理器與同步引擎（在執行緒執行）
+        except Exception:
+            await webhook_event_store.release_async(getattr(event, "webhook_event_id", None))  # 處理失敗時允許 LINE 重送後再處理
+            raise
+
+    def prepare_events(self, events: list[Event]) -> None:
+        follower_ids = _batch_follower_ids(events)  # 同一批 webhook 內的加好友使用者
+        if not follower_ids:
+            return  # 單筆由事件處理器自行建立
+        with SessionLocal() as db:
+            provision_users(db, follower_ids)  # 一次查詢並以單一 upsert 建立
+
+    async def prepare_events_async(self, events: list[Event]) -> None:
+        follower_ids = _batch_follower_ids(events)  # 同一批 webhook 內的加好友使用者
+        if not follower_ids:
+            return  # 單筆由事件處理器自行建立
+        async with get_async_sessionmaker()() as db:
+            await provision_users_async(db, follower_ids)  # 一次查詢並以單一 upsert 建立
+
+    def handle(self, body: str, signature: str) -> None:
+        payload = self.parse(body, signature)  # 驗證並解析
+        self.prepare_events(payload.events)  # 批次預先建立加好友使用者
+        for event in payload.events:
+            self.dispatch_event(event, payload.destination)  # 逐筆分派事件
+
+    async def handle_payload_async(self, payload: WebhookPayload) -> None:
+        await self.prepare_events_async(payload.events)  # 批次預先建立加好友使用者
+        for event in payload.events:
+            await self.dispatch_event_async(event, payload.destination)  # 依序分派事件（保持同一使用者的訊息順序）
+
+
+def _batch_follower_ids(events: list[Event]) -> list[str]:
+    follower_ids = [
+        event.source.user_id
+        for event in events
+        if isinstance(event, FollowEvent) and getattr(event.source, "user_id", None)
+    ]  # 加好友事件的使用者
+    return follower_ids if len(follower_ids) > 1 else []  # 兩筆以上才值得批次建立
+
+
+def _event_type_label(event: Event) -> str:
+    event_type = getattr(event, "type", None) or event.__class__.__name__  # 事件類型
+    if isinstance(event, MessageEvent):
+        return f"{event_type}.{getattr(event.message, 'type', 'unknown')}"  # 訊息事件再區分訊息類型
+    return event_type  # 回傳事件類型
+
+
+def _is_redelivery(event: Event) -> bool:
+    return bool(getattr(getattr(event, "delivery_context", None), "is_redelivery", False))  # LINE 重送標記
+
+
+def _count_claim(claimed: bool, event_type: str, is_redelivery: bool) -> bool:
+    if not claimed:
+        webhook_duplicates_total.inc(event_type=event_type, redelivery=str(is_redelivery).lower())  # 累計丟棄的重複事件
+        return False  # 已處理過，不再查資料庫或翻譯
+    events_total.inc(event_type=event_type)  # 累計事件數
+    return True  # 可以處理
+
+
+configuration = Configuration(
+    access_token=settings.line_channel_access_token,
+    host=settings.line_api_host.strip() or None,
+)  # 建立 LINE API 設定（可改指向本機替身）
+line_handler = LineEventDispatcher(settings.line_channel_secret)  # 建立 webhook handler
+line_reply_client = LineReplyClient(configuration)  # 建立共用 LINE 回覆客戶端
+flex_card_cache = FlexCardCache(max_entries=settings.card_cache_max_entries)  # 建立 Flex 小卡快取
 
 語言選單指令 = {"語言設定", "語言選單", "選單"}  # 中文語言選單指令
 主選單指令 = {"主選單", "功能選單", "選單小卡"}  # 中文主選單小卡指令
@@ -95,21 +243,28 @@ def _建立說明文字(source_type: str, is_group_manager: bool) -> str:
     return "\n".join(lines)  # 組合說明文字
 
 
-def _reply_text(reply_token: str, message: str, with_language_menu: bool = False) -> None:
-    quick_reply = None  # 關閉底部 Quick Reply 小按鈕
-    _reply_messages(reply_token, [TextMessage(text=message, quickReply=quick_reply, quoteToken=None)])  # 回覆單一文字
+def build_main_menu_card(source_type: str, is_group_manager: bool) -> PreparedMessage:
+    return get_main_menu_card(flex_card_cache, source_type, is_group_manager)  # 由快取取得主選單小卡
+
+
+def build_legacy_language_setting_card(selected_codes: list[str], source_type: str, can_manage_group: bool) -> PreparedMessage:
+    return get_language_setting_card(flex_card_cache, selected_codes, source_type, can_manage_group)  # 由快取取得語言設定卡
 
 
-def _reply_messages(reply_token: str, messages: list[TextMessage | FlexMessage]) -> None:
-    with ApiClient(configuration) as api_client:
-        messaging_api = MessagingApi(api_client)  # 建立訊息 API
-        messaging_api.reply_message(
-            ReplyMessageRequest(
-                replyToken=reply_token,
-                messages=messages,
-                notificationDisabled=False,
-            )
-        )  # 回覆文字
+def _build_reply_request(reply_token: str, messages: list[TextMessage | FlexMessage | PreparedMessage]) -> ReplyMessageRequest:
+    return ReplyMessageRequest.construct(
+        replyToken=reply_token,
+        messages=messages,
+        notificationDisabled=False,
+    )  # 組合回覆請求（預先序列化的小卡不再經過 pydantic 驗證）
+
+
+def _reply_messages(reply_token: str, messages: list[TextMessage | FlexMessage | PreparedMessage]) -> None:
+    line_reply_client.reply(_build_reply_request(reply_token, messages))  # 使用共用連線回覆
+
+
+async def _reply_messages_async(reply_token: str, messages: list[TextMessage | FlexMessage | PreparedMessage]) -> None:
+    await line_reply_client.reply_async(_build_reply_request(reply_token, messages))  # 使用 asyncio 連線回覆
 
 
 @line_handler.add(FollowEvent)
@@ -122,10 +277,7 @@ def handle_follow(event: FollowEvent) -> None:
         return  # 無使用者 ID 時跳過
 
     with SessionLocal() as db:
-        user = get_user_by_line_id(db, user_id)  # 查詢使用者
-        if not user:
-            member_code = generate_member_code(db)  # 產生綁定編號
-            user = create_user(db, user_id, member_code, DEFAULT_LANGUAGE_CODE)  # 建立使用者資料
+        user = provision_user(db, user_id)  # 取得或以 upsert 建立使用者資料
 
     message = (
         f"感謝使用翻翻君！\n您的個人編號：{user.member_code}\n"
@@ -169,186 +321,228 @@ def handle_join(event: JoinEvent) -> None:
     )  # 回覆群組初始化提示與主選單小卡
 
 
-@line_handler.add(MessageEvent, message=TextMessageContent)
-def handle_text_message(event: MessageEvent) -> None:
-    reply_token = event.reply_token  # 取得回覆 token
-    if not reply_token:
-        return  # 無法回覆就跳過
+def _text_messages(message: str) -> list[TextMessage]:
+    return [TextMessage(text=message, quickReply=None, quoteToken=None)]  # 單一文字回覆
 
+
+def _text_event_fields(event: MessageEvent) -> tuple[str, str, str | None, str | None]:
     text = _標準化指令文字(getattr(event.message, "text", ""))  # 取得並正規化文字內容
     source_type = getattr(event.source, "type", "")  # 來源型別
     user_id = getattr(event.source, "user_id", None)  # 來源使用者
     group_id = getattr(event.source, "group_id", None) if source_type == "group" else None  # 來源群組
+    return text, source_type, user_id, group_id  # 回傳事件欄位
+
+
+def _prepare_text_message(
+    db: Session,
+    text: str,
+    source_type: str,
+    user_id: str | None,
+    group_id: str | None,
+) -> tuple[ChatContext, list[TextMessage | FlexMessage | PreparedMessage] | None]:
+    context = load_chat_context(db, user_id, group_id)  # 一次讀取使用者、群組與語言，之後只讀快照
+    if user_id and context.user is None:
+        context = replace(context, user=create_missing_users(db, [user_id])[user_id])  # 以 upsert 補建使用者（同時建立也不衝突）
+    messages = _run_text_command(db, text, source_type, user_id, group_id, context)  # 指令回覆（非指令為 None）
+    if messages is None and group_id and context.group is None:
+        create_group(db, group_id)  # 首次發言時建立群組資料（新群組即為預設語言）
+    return context, messages  # 回傳快照與指令回覆
+
+
+def _run_text_command(
+    db: Session,
+    text: str,
+    source_type: str,
+    user_id: str | None,
+    group_id: str | None,
+    context: ChatContext,
+) -> list[TextMessage | FlexMessage | PreparedMessage] | None:
+    can_manage = can_manage_group(context.group, context.user, user_id)  # 指令權限（群組尚未建立時僅所有者/管理員）
+    is_group_manager = bool(context.group and can_manage)  # 小卡與說明顯示的群組管理權限
+
+    if text in 語言選單指令:
+        command_hits_total.inc(command="language_menu")  # 累計指令命中
+        if group_id:
+            selected_codes = context.group_language_codes  # 取得群組勾選語言
+        else:
+            selected_codes = [context.personal_language_code]  # 取得個人語言
+        return [
+            TextMessage(text="請使用下方小卡設定翻譯語言。", quickReply=None, quoteToken=None),
+            build_legacy_language_setting_card(selected_codes, source_type, is_group_manager),
+        ]  # 顯示語言設定小卡
+
+    if text in 主選單指令:
+        command_hits_total.inc(command="main_menu")  # 累計指令命中
+        return [
+            TextMessage(text="這是翻翻君主選單，請直接點擊小卡按鈕操作。", quickReply=None, quoteToken=None),
+            build_main_menu_card(source_type=source_type, is_group_manager=is_group_manager),
+        ]  # 顯示主選單小卡
+
+    if text in 說明指令:
+        command_hits_total.inc(command="help")  # 累計指令命中
+        return [
+            TextMessage(
+                text=_建立說明文字(source_type, is_group_manager),
+                quickReply=None,
+                quoteToken=None,
+            ),
+            build_main_menu_card(source_type=source_type, is_group_manager=is_group_manager),
+        ]  # 顯示指令說明與主選單小卡
+
+    if text.startswith("設定語言 "):
+        command_hits_total.inc(command="set_language")  # 累計指令命中
+        selected_labels = parse_language_labels(text.replace("設定語言 ", "", 1).strip())  # 解析語言名稱
+        if not selected_labels:
+            return _text_messages("請至少指定一種語言，例如：設定語言 中文")  # 參數不足
+        selected_codes: list[str] = []  # 有效語言代碼
+        invalid_labels: list[str] = []  # 無效語言名稱
+        for label in selected_labels:
+            code = resolve_language_code(label)
+            if code:
+                selected_codes.append(code)
+            else:
+                invalid_labels.append(label)
+
+        if invalid_labels:
+            return _text_messages(f"以下語言不支援：{'、'.join(invalid_labels)}")  # 語言不存在
 
-    with SessionLocal() as db:
-        user = get_user_by_line_id(db, user_id) if user_id else None  # 查詢使用者資料
-        if user_id and not user:
-            member_code = generate_member_code(db)  # 產生新編號
-            user = create_user(db, user_id, member_code, DEFAULT_LANGUAGE_CODE)  # 自動補建使用者
-
-        current_group = get_group(db, group_id) if group_id else None  # 先讀取群組資料供說明與權限判斷使用
-        is_group_manager = bool(current_group and can_manage_group(current_group, user, user_id))  # 是否具備群組管理權限
-
-        if text in 語言選單指令:
-            selected_codes = get_group_languages(db, group_id) if group_id else [user.target_language] if user else [DEFAULT_LANGUAGE_CODE]  # 取得目前勾選語言
-            _reply_messages(
-                reply_token,
-                [
-                    TextMessage(text="請使用下方小卡設定翻譯語言。", quickReply=None, quoteToken=None),
-                    build_legacy_language_setting_card(selected_codes, source_type, is_group_manager),
-                ],
-            )  # 顯示語言設定小卡
-            return
-
-        if text in 主選單指令:
-            _reply_messages(
-                reply_token,
-                [
-                    TextMessage(text="這是翻翻君主選單，請直接點擊小卡按鈕操作。", quickReply=None, quoteToken=None),
-                    build_main_menu_card(source_type=source_type, is_group_manager=is_group_manager),
-                ],
-            )  # 顯示主選單小卡
-            return
-
-        if text in 說明指令:
-            _reply_messages(
-                reply_token,
-                [
-                    TextMessage(
-                        text=_建立說明文字(source_type, is_group_manager),
-                        quickReply=None,
-                        quoteToken=None,
-                    ),
-                    build_main_menu_card(source_type=source_type, is_group_manager=is_group_manager),
-                ],
-            )  # 顯示指令說明與主選單小卡
-            return
-
-        if text.startswith("設定語言 "):
-            selected_labels = parse_language_labels(text.replace("設定語言 ", "", 1).strip())  # 解析語言名稱
-            if not selected_labels:
-                _reply_text(reply_token, "請至少指定一種語言，例如：設定語言 中文")  # 參數不足
-                return
-            selected_codes: list[str] = []  # 有效語言代碼
-            invalid_labels: list[str] = []  # 無效語言名稱
-            for label in selected_labels:
-                code = resolve_language_code(label)
-                if code:
-                    selected_codes.append(code)
-                else:
-                    invalid_labels.append(label)
-
-            if invalid_labels:
-                _reply_text(reply_token, f"以下語言不支援：{'、'.join(invalid_labels)}", with_language_menu=True)  # 語言不存在
-                return
-
-            if source_type == "group" and group_id:
-                group = current_group or ensure_group_exists(db, group_id)  # 取得群組設定
-                if not can_manage_group(group, user, user_id):
-                    _reply_text(reply_token, "你沒有群組設定權限，僅邀請者代表/管理員/所有者可設定。")  # 權限不足
-                    return
-                updated_codes = toggle_or_set_languages(
-                    db,
-                    group_id,
-                    selected_codes,
-                    toggle_single=(len(selected_codes) == 1 and len(selected_labels) == 1),
-                )  # 使用舊版群組語言切換核心
-
-                _reply_messages(
-                    reply_token,
-                    [
-                        TextMessage(text=format_language_updated(updated_codes), quickReply=None, quoteToken=None),
-                        build_legacy_language_setting_card(updated_codes, source_type, True),
-                    ],
-                )  # 顯示更新後小卡
-                return
-
-            if user:
-                update_user_language(db, user, selected_codes[0])  # 更新個人語言（單語）
-            _reply_messages(
-                reply_token,
-                [
-                    TextMessage(text=format_language_updated([selected_codes[0]]), quickReply=None, quoteToken=None),
-                    build_legacy_language_setting_card([selected_codes[0]], source_type, True),
-                ],
-            )  # 個人模式更新語言與顯示小卡
-            return
-
-        if text in 重設翻譯指令:
-            if source_type == "group" and group_id:
-                group = current_group or create_group(db, group_id)  # 取得群組資料
-                if not can_manage_group(group, user, user_id):
-                    _reply_text(reply_token, "此指令僅限邀請者代表/管理員/所有者使用。")  # 權限不足
-                    return
-                updated_codes = reset_languages(db, group_id)  # 重設群組翻譯語言
-                _reply_messages(
-                    reply_token,
-                    [
-                        TextMessage(text=format_language_updated(updated_codes), quickReply=None, quoteToken=None),
-                        build_legacy_language_setting_card(updated_codes, source_type, True),
-                    ],
-                )  # 回覆重設成功並顯示小卡
-                return
-
-            if user:
-                update_user_language(db, user, DEFAULT_LANGUAGE_CODE)  # 重設個人翻譯語言
-            _reply_messages(
-                reply_token,
-                [
-                    TextMessage(text=format_language_updated([DEFAULT_LANGUAGE_CODE]), quickReply=None, quoteToken=None),
-                    build_legacy_language_setting_card([DEFAULT_LANGUAGE_CODE], source_type, True),
-                ],
-            )  # 個人模式重設成功並顯示小卡
-            return
-
-        if source_type == "group" and group_id and text in 管理員白名單指令:
-            group = current_group or create_group(db, group_id)  # 取得群組資料
-            if not can_manage_group(group, user, user_id):
-                _reply_text(reply_token, "此指令僅限邀請者代表/管理員/所有者使用。")  # 白名單權限不足
-                return
-
-            if text == "查看群組設定":
-                inviter_text = group.inviter_user_id if group.inviter_user_id else "尚未綁定"  # 邀請者代表資訊
-                language_codes = get_group_languages(db, group_id)  # 取得群組語言清單
-                language_label = _群組語言摘要(language_codes)  # 轉換語言名稱
-                _reply_text(
-                    reply_token,
-                    f"群組設定：\n翻譯語言：{language_label}\n邀請者代表：{inviter_text}",
-                )  # 顯示群組設定
-                return
-
-            if text == "重設邀請者":
-                if not user_id:
-                    _reply_text(reply_token, "無法識別使用者，請稍後重試。")  # 無使用者 ID
-                    return
-                set_group_inviter(db, group, user_id)  # 直接重設為目前使用者
-                _reply_text(reply_token, "邀請者代表已重設為你，現在你可管理本群翻譯設定。")  # 回覆成功
-                return
-
-        if source_type == "group" and group_id and text == 綁定邀請者指令:
-            if not user_id:
-                _reply_text(reply_token, "無法識別使用者，請稍後重試。")  # 無法取得使用者
-                return
-            group = current_group or create_group(db, group_id)  # 取得群組資料
-            if group.inviter_user_id and group.inviter_user_id != user_id:
-                _reply_text(reply_token, "此群組邀請者代表已綁定，無法重複綁定。")  # 已被他人綁定
-                return
-            bind_group_inviter(db, group, user_id)  # 綁定邀請者代表
-            _reply_text(reply_token, "邀請者代表綁定完成，現在你可管理本群翻譯語言。")  # 回覆成功
-            return
-
-        target_code = DEFAULT_LANGUAGE_CODE  # 預設語言
         if source_type == "group" and group_id:
-            group = current_group or create_group(db, group_id)  # 取得群組設定
-            target_codes = get_group_languages(db, group_id)  # 採用群組多語設定
-            translated_text = format_translation_results(text, target_codes, translate_text)  # 使用舊版核心輸出格式
-            _reply_text(reply_token, translated_text)  # 回覆多語翻譯
-            return
-        elif user:
-            target_code = user.target_language  # 採用個人語言
-
-        translated = translate_text(text, target_code)  # 執行翻譯
-        _reply_text(reply_token, f"翻譯結果：\n{translated}")  # 回覆翻譯結果
+            if not can_manage:
+                return _text_messages("你沒有群組設定權限，僅邀請者代表/管理員/所有者可設定。")  # 權限不足
+            updated_codes = toggle_or_set_languages(
+                db,
+                group_id,
+                selected_codes,
+                toggle_single=(len(selected_codes) == 1 and len(selected_labels) == 1),
+            )  # 使用舊版群組語言切換核心（群組尚未建立時一併建立）
+            return [
+                TextMessage(text=format_language_updated(updated_codes), quickReply=None, quoteToken=None),
+                build_legacy_language_setting_card(updated_codes, source_type, True),
+            ]  # 顯示更新後小卡
+
+        if context.user:
+            set_user_language(db, user_id, selected_codes[0])  # 更新個人語言（單語）
+        return [
+            TextMessage(text=format_language_updated([selected_codes[0]]), quickReply=None, quoteToken=None),
+            build_legacy_language_setting_card([selected_codes[0]], source_type, True),
+        ]  # 個人模式更新語言與顯示小卡
+
+    if text in 重設翻譯指令:
+        command_hits_total.inc(command="reset_languages")  # 累計指令命中
+        if source_type == "group" and group_id:
+            if not can_manage:
+                return _text_messages("此指令僅限邀請者代表/管理員/所有者使用。")  # 權限不足
+            updated_codes = reset_languages(db, group_id)  # 重設群組翻譯語言（群組尚未建立時一併建立）
+            return [
+                TextMessage(text=format_language_updated(updated_codes), quickReply=None, quoteToken=None),
+                build_legacy_language_setting_card(updated_codes, source_type, True),
+            ]  # 回覆重設成功並顯示小卡
+
+        if context.user:
+            set_user_language(db, user_id, DEFAULT_LANGUAGE_CODE)  # 重設個人翻譯語言
+        return [
+            TextMessage(text=format_language_updated([DEFAULT_LANGUAGE_CODE]), quickReply=None, quoteToken=None),
+            build_legacy_language_setting_card([DEFAULT_LANGUAGE_CODE], source_type, True),
+        ]  # 個人模式重設成功並顯示小卡
+
+    if source_type == "group" and group_id and text in 管理員白名單指令:
+        command_hits_total.inc(command="group_admin")  # 累計指令命中
+        if not can_manage:
+            return _text_messages("此指令僅限邀請者代表/管理員/所有者使用。")  # 白名單權限不足
+
+        if text == "查看群組設定":
+            inviter_text = context.inviter_user_id or "尚未綁定"  # 邀請者代表資訊
+            language_label = _群組語言摘要(context.group_language_codes)  # 轉換語言名稱
+            return _text_messages(f"群組設定：\n翻譯語言：{language_label}\n邀請者代表：{inviter_text}")  # 顯示群組設定
+
+        if text == "重設邀請者":
+            if not user_id:
+                return _text_messages("無法識別使用者，請稍後重試。")  # 無使用者 ID
+            replace_group_inviter(db, group_id, user_id)  # 直接重設為目前使用者（群組尚未建立時一併建立）
+            return _text_messages("邀請者代表已重設為你，現在你可管理本群翻譯設定。")  # 回覆成功
+
+    if source_type == "group" and group_id and text == 綁定邀請者指令:
+        command_hits_total.inc(command="bind_inviter")  # 累計指令命中
+        if not user_id:
+            return _text_messages("無法識別使用者，請稍後重試。")  # 無法取得使用者
+        if not try_bind_group_inviter(db, group_id, user_id):
+            return _text_messages("此群組邀請者代表已綁定，無法重複綁定。")  # 已被他人綁定（以條件式更新判斷，不依賴快取）
+        return _text_messages("邀請者代表綁定完成，現在你可管理本群翻譯語言。")  # 回覆成功
+
+    return None  # 不是指令，交給翻譯
+
+
+def _group_target_codes(context: ChatContext, group_id: str) -> list[str]:
+    target_codes = limit_group_languages(group_id, context.group_language_codes)  # 超量群組依政策限制語言數
+    command_hits_total.inc(command="translate_group")  # 累計群組翻譯
+    return target_codes  # 回傳要翻譯的語言
+
+
+def _personal_target_code(context: ChatContext) -> str:
+    command_hits_total.inc(command="translate_personal")  # 累計個人翻譯
+    return context.personal_language_code  # 採用個人語言（未建立時為預設語言）
+
+
+def _translate_reply(text: str, context: ChatContext, group_id: str | None, deadline: float | None) -> str:
+    if group_id:
+        return format_translation_results(
+            text,
+            _group_target_codes(context, group_id),
+            partial(translate_text, group_id=group_id),
+            deadline=deadline,
+        )  # 使用舊版核心輸出格式（逾時語言以部分結果回覆）
+    try:
+        translated = translate_text(text, _personal_target_code(context), deadline=deadline)  # 執行翻譯
+    except DeadlineExceeded:
+        translated = DEADLINE_MISSED_TEXT  # 期限內未完成時仍回覆
+        translation_fallbacks_total.inc(reason="deadline")  # 累計逾時
+    return f"翻譯結果：\n{translated}"  # 個人翻譯格式
+
+
+async def _translate_reply_async(text: str, context: ChatContext, group_id: str | None, deadline: float | None) -> str:
+    if group_id:
+        return await format_translation_results_async(
+            text,
+            _group_target_codes(context, group_id),
+            partial(translate_text_async, group_id=group_id),
+            deadline=deadline,
+        )  # asyncio 多語翻譯（逾時語言以部分結果回覆）
+    try:
+        translated = await translate_text_async(text, _personal_target_code(context), deadline=deadline)  # 執行翻譯
+    except DeadlineExceeded:
+        translated = DEADLINE_MISSED_TEXT  # 期限內未完成時仍回覆
+        translation_fallbacks_total.inc(reason="deadline")  # 累計逾時
+    return f"翻譯結果：\n{translated}"  # 個人翻譯格式
+
+
+@line_handler.add(MessageEvent, message=TextMessageContent)
+def handle_text_message(event: MessageEvent) -> None:
+    reply_token = event.reply_token  # 取得回覆 token
+    if not reply_token:
+        return  # 無法回覆就跳過
+    deadline = deadline_after(getattr(event, "timestamp", None), settings.reply_deadline_seconds)  # 依事件時間計算翻譯期限
+    text, source_type, user_id, group_id = _text_event_fields(event)  # 取得事件欄位
+
+    with SessionLocal() as db:
+        context, messages = _prepare_text_message(db, text, source_type, user_id, group_id)  # 讀取快照並執行指令
+    if messages is None:
+        messages = _text_messages(_translate_reply(text, context, group_id, deadline))  # 翻譯前已歸還資料庫連線
+    _reply_messages(reply_token, messages)  # 回覆
+
+
+@line_handler.add_async(MessageEvent, message=TextMessageContent)
+async def handle_text_message_async(event: MessageEvent) -> None:
+    reply_token = event.reply_token  # 取得回覆 token
+    if not reply_token:
+        return  # 無法回覆就跳過
+    deadline = deadline_after(getattr(event, "timestamp", None), settings.reply_deadline_seconds)  # 依事件時間計算翻譯期限
+    text, source_type, user_id, group_id = _text_event_fields(event)  # 取得事件欄位
+
+    async with get_async_sessionmaker()() as db:
+        context, messages = await db.run_sync(_prepare_text_message, text, source_type, user_id, group_id)  # 同一份邏輯走 asyncio driver
+    if messages is None:
+        messages = _text_messages(await _translate_reply_async(text, context, group_id, deadline))  # asyncio 翻譯
+    await _reply_messages_async(reply_token, messages)  # asyncio 回覆
 
 
 def verify_signature(body: str, signature: str) -> None:
@@ -0,0 +1,103 @@
+import logging  # 匯入日誌工具
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from typing import Any  # 匯入型別提示
+
+from app.core.metrics import line_reply_seconds  # 匯入 LINE 回覆耗時指標
+from linebot.v3.messaging import (
+    ApiClient,
+    AsyncApiClient,
+    AsyncMessagingApi,
+    Configuration,
+    MessagingApi,
+    ReplyMessageRequest,
+)  # 匯入 Messaging API
+
+
+logger = logging.getLogger(__name__)  # 模組日誌
+
+
+class LineReplyClient:
+    def __init__(self, configuration: Configuration) -> None:
+        self._configuration = configuration  # LINE API 設定
+        self._lock = threading.Lock()  # 建立客戶端與統計用鎖
+        self._api_client: ApiClient | None = None  # 同步客戶端（長期持有連線池）
+        self._messaging_api: MessagingApi | None = None  # 同步 Messaging API
+        self._async_api_client: AsyncApiClient | None = None  # asyncio 客戶端
+        self._async_messaging_api: AsyncMessagingApi | None = None  # asyncio Messaging API
+        self._calls = 0  # 回覆呼叫次數
+        self._errors = 0  # 回覆失敗次數
+        self._errors_by_status: dict[str, int] = {}  # 依 HTTP 狀態分類的失敗次數
+        self._total_latency = 0.0  # 累積耗時
+        self._max_latency = 0.0  # 最大耗時
+
+    def open(self) -> MessagingApi:
+        with self._lock:
+            if self._messaging_api is None:
+                self._api_client = ApiClient(self._configuration)  # 建立長期持有的客戶端
+                self._messaging_api = MessagingApi(self._api_client)  # 建立訊息 API
+            return self._messaging_api  # 回傳同步 API
+
+    def _open_async(self) -> AsyncMessagingApi:
+        if self._async_messaging_api is None:
+            self._async_api_client = AsyncApiClient(self._configuration)  # 需在事件迴圈內建立 aiohttp Session
+            self._async_messaging_api = AsyncMessagingApi(self._async_api_client)  # 建立 asyncio 訊息 API
+        return self._async_messaging_api  # 回傳 asyncio API
+
+    def close(self) -> None:
+        with self._lock:
+            if self._api_client is not None:
+                self._api_client.close()  # 關閉同步連線池
+            self._api_client = None  # 清除參照
+            self._messaging_api = None  # 清除參照
+
+    async def aclose(self) -> None:
+        self.close()  # 關閉同步客戶端
+        if self._async_api_client is not None:
+            await self._async_api_client.close()  # 關閉 asyncio 連線池
+        self._async_api_client = None  # 清除參照
+        self._async_messaging_api = None  # 清除參照
+
+    def reply(self, request: ReplyMessageRequest) -> None:
+        messaging_api = self.open()  # 取得長期持有的 API
+        started = time.perf_counter()  # 開始計時
+        try:
+            messaging_api.reply_message(request)  # 回覆訊息
+        except Exception as exc:
+            self._record(started, exc)  # 記錄失敗
+            raise
+        self._record(started, None)  # 記錄成功
+
+    async def reply_async(self, request: ReplyMessageRequest) -> None:
+        messaging_api = self._open_async()  # 取得 asyncio API
+        started = time.perf_counter()  # 開始計時
+        try:
+            await messaging_api.reply_message(request)  # 回覆訊息
+        except Exception as exc:
+            self._record(started, exc)  # 記錄失敗
+            raise
+        self._record(started, None)  # 記錄成功
+
+    def _record(self, started: float, error: Exception | None) -> None:
+        elapsed = time.perf_counter() - started  # 本次耗時
+        line_reply_seconds.observe(elapsed, outcome="ok" if error is None else "error")  # 記錄回覆耗時分布
+        with self._lock:
+            self._calls += 1  # 累計呼叫
+            self._total_latency += elapsed  # 累計耗時
+            self._max_latency = max(self._max_latency, elapsed)  # 更新最大耗時
+            if error is not None:
+                status = str(getattr(error, "status", None) or type(error).__name__)  # HTTP 狀態或例外名稱
+                self._errors += 1  # 累計失敗
+                self._errors_by_status[status] = self._errors_by_status.get(status, 0) + 1  # 依狀態分類
+        if error is not None:
+            logger.warning("LINE 回覆失敗：%s", error)  # 記錄警告
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "errors": self._errors,
+                "errors_by_status": dict(self._errors_by_status),
+                "latency_avg_ms": round(self._total_latency / self._calls * 1000, 2) if self._calls else 0.0,
+                "latency_max_ms": round(self._max_latency * 1000, 2),
+            }  # 回覆統計
@@ -8,8 +8,73 @@ class Settings(BaseSettings):
     line_channel_access_token: str = Field(default="", validation_alias=AliasChoices("LINE_CHANNEL_ACCESS_TOKEN", "CHANNEL_ACCESS_TOKEN"))  # LINE Token
     line_channel_secret: str = Field(default="", validation_alias=AliasChoices("LINE_CHANNEL_SECRET", "CHANNEL_SECRET"))  # LINE Secret
     deepl_api_key: str = Field(default="", validation_alias=AliasChoices("DEEPL_API_KEY", "DEEPL_AUTH_KEY"))  # DeepL API Key
+    deepl_api_url: str = Field(default="", validation_alias=AliasChoices("DEEPL_API_URL"))  # 覆寫 DeepL 端點（空白時依金鑰選 Free/Pro）
+    google_translate_url: str = Field(default="", validation_alias=AliasChoices("GOOGLE_TRANSLATE_URL"))  # 覆寫 Google 翻譯端點
+    line_api_host: str = Field(default="", validation_alias=AliasChoices("LINE_API_HOST"))  # 覆寫 LINE Messaging API 主機
     app_owner_user_ids: str = Field(default="", validation_alias=AliasChoices("APP_OWNER_USER_IDS"))  # 所有者 ID 字串
     database_url: str = Field(default="sqlite:///./translator.db", validation_alias=AliasChoices("DATABASE_URL"))  # 資料庫連線
+    auto_migrate: bool = Field(default=True, validation_alias=AliasChoices("AUTO_MIGRATE"))  # 啟動時自動套用資料庫遷移
+    async_db_enabled: bool = Field(default=False, validation_alias=AliasChoices("ASYNC_DB_ENABLED"))  # webhook 改用 asyncio 資料庫引擎（需 asyncpg / aiosqlite）
+    db_pool_size: int = Field(default=5, validation_alias=AliasChoices("DB_POOL_SIZE"))  # 常駐資料庫連線數
+    db_max_overflow: int = Field(default=10, validation_alias=AliasChoices("DB_MAX_OVERFLOW"))  # 尖峰時可額外開啟的連線數
+    db_pool_timeout: float = Field(default=30.0, validation_alias=AliasChoices("DB_POOL_TIMEOUT"))  # 連線用盡時等待秒數
+    db_pool_recycle_seconds: int = Field(default=300, validation_alias=AliasChoices("DB_POOL_RECYCLE_SECONDS"))  # 連線使用多久後重建（-1 為不重建）
+    db_pool_pre_ping: str = Field(default="idle", validation_alias=AliasChoices("DB_POOL_PRE_PING"))  # 取出連線前檢查：always / idle / off
+    db_pool_ping_idle_seconds: float = Field(default=30.0, validation_alias=AliasChoices("DB_POOL_PING_IDLE_SECONDS"))  # idle 模式下閒置超過此秒數才 ping
+    db_statement_timeout_ms: int = Field(default=0, validation_alias=AliasChoices("DB_STATEMENT_TIMEOUT_MS"))  # Postgres 單一查詢逾時毫秒（0 為不限）
+    sqlite_tuning_enabled: bool = Field(default=True, validation_alias=AliasChoices("SQLITE_TUNING_ENABLED"))  # SQLite 連線時套用調校參數
+    sqlite_journal_mode: str = Field(default="wal", validation_alias=AliasChoices("SQLITE_JOURNAL_MODE"))  # SQLite 日誌模式（WAL 讀寫互不阻塞）
+    sqlite_synchronous: str = Field(default="normal", validation_alias=AliasChoices("SQLITE_SYNCHRONOUS"))  # SQLite 同步等級：off / normal / full / extra
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024, validation_alias=AliasChoices("SQLITE_MMAP_SIZE"))  # SQLite 記憶體映射位元組數
+    sqlite_cache_size_kib: int = Field(default=64 * 1024, validation_alias=AliasChoices("SQLITE_CACHE_SIZE_KIB"))  # SQLite 每條連線頁面快取 KiB
+    sqlite_busy_timeout_ms: int = Field(default=5000, validation_alias=AliasChoices("SQLITE_BUSY_TIMEOUT_MS"))  # SQLite 鎖定時等待毫秒
+    sqlite_write_queue_enabled: bool = Field(default=True, validation_alias=AliasChoices("SQLITE_WRITE_QUEUE_ENABLED"))  # SQLite 寫入依序排隊（單一寫入者）
+    webhook_queue_enabled: bool = Field(default=False, validation_alias=AliasChoices("WEBHOOK_QUEUE_ENABLED"))  # 先回 200 再背景處理事件
+    webhook_queue_workers: int = Field(default=4, validation_alias=AliasChoices("WEBHOOK_QUEUE_WORKERS"))  # 背景 worker 數量
+    webhook_queue_max_size: int = Field(default=1000, validation_alias=AliasChoices("WEBHOOK_QUEUE_MAX_SIZE"))  # 佇列上限（0 為不限）
+    webhook_queue_submit_timeout_seconds: float = Field(default=1.0, validation_alias=AliasChoices("WEBHOOK_QUEUE_SUBMIT_TIMEOUT_SECONDS"))  # 佇列已滿時等待空位的秒數
+    webhook_dedup_enabled: bool = Field(default=True, validation_alias=AliasChoices("WEBHOOK_DEDUP_ENABLED"))  # 依 webhookEventId 丟棄重送事件
+    webhook_dedup_ttl_seconds: float = Field(default=3600.0, validation_alias=AliasChoices("WEBHOOK_DEDUP_TTL_SECONDS"))  # 事件 ID 保留秒數
+    webhook_dedup_max_entries: int = Field(default=100000, validation_alias=AliasChoices("WEBHOOK_DEDUP_MAX_ENTRIES"))  # 記憶體內事件 ID 上限
+    webhook_dedup_db_enabled: bool = Field(default=False, validation_alias=AliasChoices("WEBHOOK_DEDUP_DB_ENABLED"))  # 多 worker 時以資料庫共用事件 ID
+    provider_connect_timeout: float = Field(default=3.0, validation_alias=AliasChoices("PROVIDER_CONNECT_TIMEOUT"))  # 翻譯 API 連線逾時秒數
+    provider_read_timeout: float = Field(default=15.0, validation_alias=AliasChoices("PROVIDER_READ_TIMEOUT"))  # 翻譯 API 讀取逾時秒數
+    provider_pool_connections: int = Field(default=4, validation_alias=AliasChoices("PROVIDER_POOL_CONNECTIONS"))  # 連線池主機數
+    provider_pool_maxsize: int = Field(default=32, validation_alias=AliasChoices("PROVIDER_POOL_MAXSIZE"))  # 每個主機的連線數上限
+    provider_http2: bool = Field(default=False, validation_alias=AliasChoices("PROVIDER_HTTP2"))  # asyncio 客戶端啟用 HTTP/2（需安裝 h2）
+    provider_breaker_window: int = Field(default=50, validation_alias=AliasChoices("PROVIDER_BREAKER_WINDOW"))  # 熔斷器滾動視窗筆數
+    provider_breaker_min_samples: int = Field(default=10, validation_alias=AliasChoices("PROVIDER_BREAKER_MIN_SAMPLES"))  # 計算錯誤率的最少樣本數
+    provider_breaker_error_rate: float = Field(default=0.5, validation_alias=AliasChoices("PROVIDER_BREAKER_ERROR_RATE"))  # 錯誤率熔斷門檻
+    provider_breaker_consecutive_failures: int = Field(default=5, validation_alias=AliasChoices("PROVIDER_BREAKER_CONSECUTIVE_FAILURES"))  # 連續失敗熔斷門檻
+    provider_breaker_cooldown_seconds: float = Field(default=30.0, validation_alias=AliasChoices("PROVIDER_BREAKER_COOLDOWN_SECONDS"))  # 熔斷後多久背景探測
+    provider_slow_latency_seconds: float = Field(default=5.0, validation_alias=AliasChoices("PROVIDER_SLOW_LATENCY_SECONDS"))  # p90 超過此秒數改用較快來源
+    provider_hedge_enabled: bool = Field(default=True, validation_alias=AliasChoices("PROVIDER_HEDGE_ENABLED"))  # 主要來源變慢時同時送出備援請求
+    provider_hedge_percentile: float = Field(default=0.9, validation_alias=AliasChoices("PROVIDER_HEDGE_PERCENTILE"))  # 超過此耗時百分位數即對沖
+    provider_hedge_default_delay_seconds: float = Field(default=2.0, validation_alias=AliasChoices("PROVIDER_HEDGE_DEFAULT_DELAY_SECONDS"))  # 樣本不足時的對沖等待秒數
+    reply_deadline_seconds: float = Field(default=10.0, validation_alias=AliasChoices("REPLY_DEADLINE_SECONDS"))  # 每則事件翻譯期限（0 為不限）
+    deepl_rate_per_second: float = Field(default=10.0, validation_alias=AliasChoices("DEEPL_RATE_PER_SECOND"))  # DeepL 每秒請求上限（0 為不限）
+    deepl_rate_burst: int = Field(default=20, validation_alias=AliasChoices("DEEPL_RATE_BURST"))  # DeepL 瞬間請求上限
+    google_rate_per_second: float = Field(default=20.0, validation_alias=AliasChoices("GOOGLE_RATE_PER_SECOND"))  # Google 每秒請求上限（0 為不限）
+    google_rate_burst: int = Field(default=40, validation_alias=AliasChoices("GOOGLE_RATE_BURST"))  # Google 瞬間請求上限
+    provider_rate_limit_wait_seconds: float = Field(default=0.5, validation_alias=AliasChoices("PROVIDER_RATE_LIMIT_WAIT_SECONDS"))  # 最後備援來源等待限速額度秒數
+    usage_flush_interval_seconds: float = Field(default=60.0, validation_alias=AliasChoices("USAGE_FLUSH_INTERVAL_SECONDS"))  # 字元用量寫入資料庫間隔
+    deepl_monthly_char_budget: int = Field(default=0, validation_alias=AliasChoices("DEEPL_MONTHLY_CHAR_BUDGET"))  # DeepL 每月字元額度（0 為不限）
+    group_monthly_char_budget: int = Field(default=0, validation_alias=AliasChoices("GROUP_MONTHLY_CHAR_BUDGET"))  # 每個群組每月字元上限（0 為不限）
+    group_budget_action: str = Field(default="reroute", validation_alias=AliasChoices("GROUP_BUDGET_ACTION"))  # 超量群組處理：reroute / limit
+    group_budget_max_languages: int = Field(default=1, validation_alias=AliasChoices("GROUP_BUDGET_MAX_LANGUAGES"))  # limit 模式下保留的語言數
+    translation_fanout_workers: int = Field(default=16, validation_alias=AliasChoices("TRANSLATION_FANOUT_WORKERS"))  # 多語翻譯共用執行緒數
+    translation_fanout_per_group: int = Field(default=5, validation_alias=AliasChoices("TRANSLATION_FANOUT_PER_GROUP"))  # 單則群組訊息同時翻譯上限
+    language_detection_enabled: bool = Field(default=True, validation_alias=AliasChoices("LANGUAGE_DETECTION_ENABLED"))  # 原文已是目標語言時略過翻譯
+    translation_cache_max_entries: int = Field(default=5000, validation_alias=AliasChoices("TRANSLATION_CACHE_MAX_ENTRIES"))  # 翻譯快取筆數上限（0 為停用）
+    translation_cache_max_bytes: int = Field(default=8 * 1024 * 1024, validation_alias=AliasChoices("TRANSLATION_CACHE_MAX_BYTES"))  # 翻譯快取位元組上限
+    translation_cache_ttl_seconds: float = Field(default=86400, validation_alias=AliasChoices("TRANSLATION_CACHE_TTL_SECONDS"))  # 翻譯快取存活秒數
+    group_cache_max_entries: int = Field(default=10000, validation_alias=AliasChoices("GROUP_CACHE_MAX_ENTRIES"))  # 群組設定快取數量（0 為停用）
+    group_cache_ttl_seconds: float = Field(default=30, validation_alias=AliasChoices("GROUP_CACHE_TTL_SECONDS"))  # 群組設定快取秒數
+    card_cache_max_entries: int = Field(default=2048, validation_alias=AliasChoices("CARD_CACHE_MAX_ENTRIES"))  # Flex 小卡快取數量（0 為停用）
+    card_cache_warm_up: bool = Field(default=True, validation_alias=AliasChoices("CARD_CACHE_WARM_UP"))  # 啟動時預建常用小卡
+    translation_memory_enabled: bool = Field(default=True, validation_alias=AliasChoices("TRANSLATION_MEMORY_ENABLED"))  # 資料庫翻譯記憶
+    translation_memory_max_entries: int = Field(default=100000, validation_alias=AliasChoices("TRANSLATION_MEMORY_MAX_ENTRIES"))  # 翻譯記憶筆數上限
+    translation_memory_prune_interval: int = Field(default=500, validation_alias=AliasChoices("TRANSLATION_MEMORY_PRUNE_INTERVAL"))  # 每幾次寫入整理一次
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")  # 指定 .env
 
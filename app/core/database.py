@@ -29,3 +29,37 @@ def normalize_database_url(raw_url: str) -> str:
         )  # 重組 URL
 
     return db_url  # 回傳處理後 URL
+
+
+ASYNC_DRIVERS = {"postgresql": ("asyncpg", "asyncpg"), "sqlite": ("aiosqlite", "aiosqlite")}  # 資料庫 -> (asyncio driver, 套件名稱)
+
+
+def async_database_url(raw_url: str) -> str:
+    db_url = normalize_database_url(raw_url)  # 先套用同步版的正規化
+    scheme, rest = db_url.split("://", 1)  # 拆出 scheme
+    backend = scheme.split("+", 1)[0]  # 去除同步 driver
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"不支援 asyncio 的資料庫：{backend}")  # 其他資料庫不提供 asyncio 引擎
+    db_url = f"{backend}+{ASYNC_DRIVERS[backend][0]}://{rest}"  # 換成 asyncio driver
+    if backend == "postgresql":
+        parsed = urlparse(db_url)  # 解析 URL
+        query_params = dict(parse_qsl(parsed.query, keep_blank_values=True))  # 轉 query 參數
+        if "sslmode" in query_params:
+            query_params["ssl"] = query_params.pop("sslmode")  # asyncpg 使用 ssl 參數
+        db_url = urlunparse(
+            (
+                parsed.scheme,
+                parsed.netloc,
+                parsed.path,
+                parsed.params,
+                urlencode(query_params),
+                parsed.fragment,
+            )
+        )  # 重組 URL
+    return db_url  # 回傳 asyncio URL
+
+
+def async_driver_package(raw_url: str) -> str | None:
+    backend = normalize_database_url(raw_url).split("://", 1)[0].split("+", 1)[0]  # 資料庫種類
+    driver = ASYNC_DRIVERS.get(backend)  # 對應的 asyncio driver
+    return driver[1] if driver else None  # 回傳需安裝的套件名稱
@@ -0,0 +1,38 @@
+import time  # 匯入計時工具
+
+
+MIN_PROVIDER_TIMEOUT = 0.05  # 剩餘時間極短時的最小逾時秒數
+MIN_EVENT_BUDGET = 1.0  # 扣除排隊時間後至少保留的秒數（避免時鐘誤差讓所有訊息逾時）
+
+
+class DeadlineExceeded(Exception):
+    pass  # 超過事件回覆期限
+
+
+def deadline_after(event_timestamp_ms: int | None, budget_seconds: float) -> float | None:
+    if budget_seconds <= 0:
+        return None  # 設為 0 時不限制
+    remaining = budget_seconds  # 剩餘秒數
+    if event_timestamp_ms:
+        elapsed = max(0.0, time.time() - event_timestamp_ms / 1000)  # 事件發生後已經過的秒數（含排隊等待）
+        remaining = max(min(MIN_EVENT_BUDGET, budget_seconds), budget_seconds - elapsed)  # 扣除已等待時間但保留最低預算
+    return time.monotonic() + remaining  # 以 monotonic 時間表示期限
+
+
+def time_left(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None  # 無期限
+    return deadline - time.monotonic()  # 剩餘秒數（可能為負）
+
+
+def check_deadline(deadline: float | None) -> None:
+    left = time_left(deadline)  # 剩餘秒數
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()  # 已超過期限
+
+
+def bounded_timeout(timeout: float, deadline: float | None) -> float:
+    left = time_left(deadline)  # 剩餘秒數
+    if left is None:
+        return timeout  # 無期限時沿用原逾時
+    return max(MIN_PROVIDER_TIMEOUT, min(timeout, left))  # 不超過剩餘時間
@@ -0,0 +1,170 @@
+import bisect  # 匯入二分搜尋
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from contextlib import contextmanager  # 匯入情境管理工具
+from typing import Callable, Iterator  # 匯入型別提示
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)  # 預設耗時分桶（秒）
+
+LabelValues = tuple[str, ...]  # 標籤值
+Sample = tuple[dict[str, str], float]  # (標籤, 數值)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')  # Prometheus 標籤值跳脫
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""  # 無標籤
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"  # 標籤字串
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"  # 無限大
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))  # 數值字串
+
+
+class Counter:
+    metric_type = "counter"  # 指標類型
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name = name  # 指標名稱
+        self.documentation = documentation  # 指標說明
+        self.label_names = label_names  # 標籤名稱
+        self._values: dict[LabelValues, float] = {}  # 各標籤組合的累計值
+        self._lock = threading.Lock()  # 執行緒鎖
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)  # 標籤值
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount  # 累加
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)  # 複製目前數值
+        return [
+            f"{self.name}{_format_labels(dict(zip(self.label_names, key)))} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]  # 輸出各標籤組合
+
+
+class Histogram:
+    metric_type = "histogram"  # 指標類型
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name  # 指標名稱
+        self.documentation = documentation  # 指標說明
+        self.label_names = label_names  # 標籤名稱
+        self.buckets = tuple(sorted(buckets))  # 分桶上限
+        self._series: dict[LabelValues, list[float]] = {}  # 各標籤組合的 [各分桶次數..., 總和, 次數]
+        self._lock = threading.Lock()  # 執行緒鎖
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)  # 標籤值
+        index = bisect.bisect_left(self.buckets, value)  # 第一個容納此值的分桶
+        with self._lock:
+            series = self._series.get(key)  # 讀取序列
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)  # 建立序列
+                self._series[key] = series  # 登記
+            if index < len(self.buckets):
+                series[index] += 1  # 累計分桶（輸出時再累加成 le 形式）
+            series[-2] += value  # 累計總和
+            series[-1] += 1  # 累計次數
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()  # 開始計時
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)  # 記錄耗時
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())  # 複製目前數值
+        lines: list[str] = []  # 輸出行
+        for key, series in series_items:
+            labels = dict(zip(self.label_names, key))  # 標籤
+            cumulative = 0.0  # 累計次數
+            for bound, count in zip(self.buckets, series):
+                cumulative += count  # le 為累計值
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {_format_value(series[-1])}")  # 全部次數
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")  # 總和
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(series[-1])}")  # 次數
+        return lines  # 回傳輸出行
+
+
+class CallbackMetric:
+    def __init__(self, name: str, documentation: str, metric_type: str, callback: Callable[[], list[Sample]]) -> None:
+        self.name = name  # 指標名稱
+        self.documentation = documentation  # 指標說明
+        self.metric_type = metric_type  # 指標類型（counter / gauge）
+        self.callback = callback  # 讀取時才呼叫的統計函式
+
+    def collect(self) -> list[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in self.callback()]  # 輸出現有統計
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | CallbackMetric] = {}  # 已登記的指標
+        self._lock = threading.Lock()  # 執行緒鎖
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric  # 依名稱登記（重複登記時覆蓋）
+        return metric  # 回傳指標方便直接指定
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))  # 建立並登記計數器
+
+    def histogram(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names))  # 建立並登記直方圖
+
+    def callback(self, name: str, documentation: str, metric_type: str, callback: Callable[[], list[Sample]]) -> None:
+        self.register(CallbackMetric(name, documentation, metric_type, callback))  # 登記讀取時計算的指標
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())  # 複製指標清單
+        lines: list[str] = []  # 輸出行
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")  # 說明
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")  # 類型
+            lines.extend(metric.collect())  # 數值
+        return "\n".join(lines) + "\n"  # Prometheus 文字格式
+
+
+registry = MetricsRegistry()  # 全域指標登記表
+
+webhook_seconds = registry.histogram("fanfan_webhook_seconds", "LINE webhook 請求處理耗時（秒）")  # webhook 端點耗時
+event_seconds = registry.histogram("fanfan_event_handle_seconds", "單一 LINE 事件處理耗時（秒）", ("event_type",))  # 事件處理耗時
+events_total = registry.counter("fanfan_events_total", "依類型統計的 LINE 事件數", ("event_type",))  # 事件數
+webhook_duplicates_total = registry.counter(
+    "fanfan_webhook_duplicates_total", "依 webhookEventId 丟棄的重複事件數", ("event_type", "redelivery")
+)  # 重複事件數
+db_query_seconds = registry.histogram("fanfan_db_query_seconds", "資料庫查詢耗時（秒）", ("operation",))  # 資料庫耗時
+db_pool_wait_seconds = registry.histogram("fanfan_db_pool_wait_seconds", "取得資料庫連線等待時間（秒）", ("engine",))  # 連線池等待
+sqlite_write_wait_seconds = registry.histogram("fanfan_sqlite_write_wait_seconds", "SQLite 單一寫入者排隊時間（秒）")  # 寫入排隊
+db_pool_events_total = registry.counter(
+    "fanfan_db_pool_events_total", "資料庫連線池事件數（新建 / 作廢 / 逾時 / ping 失敗）", ("engine", "event")
+)  # 連線池事件
+provider_seconds = registry.histogram(
+    "fanfan_provider_request_seconds", "翻譯 API 呼叫耗時（秒）", ("provider", "target", "outcome")
+)  # 翻譯 API 耗時
+line_reply_seconds = registry.histogram("fanfan_line_reply_seconds", "LINE 回覆 API 耗時（秒）", ("outcome",))  # LINE 回覆耗時
+command_hits_total = registry.counter("fanfan_command_hits_total", "指令命中次數", ("command",))  # 指令命中
+translation_fallbacks_total = registry.counter(
+    "fanfan_translation_fallbacks_total", "翻譯改用備援或回傳原文的次數", ("reason",)
+)  # 翻譯備援次數
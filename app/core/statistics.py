@@ -0,0 +1,5 @@
+def percentile(sorted_values: list[float], ratio: float) -> float:
+    if not sorted_values:
+        return 0.0  # 無資料時回傳 0
+    index = min(len(sorted_values) - 1, int(round(ratio * (len(sorted_values) - 1))))  # 計算索引
+    return sorted_values[index]  # 回傳百分位數值
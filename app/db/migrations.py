@@ -0,0 +1,82 @@
+from datetime import datetime  # 匯入時間型別
+from typing import Callable  # 匯入型別提示
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, text  # 匯入 SQL 工具
+from sqlalchemy.engine import Connection, Engine  # 匯入連線型別
+
+from app.db.base import Base  # 匯入 Base
+from app.db import models  # noqa: F401  # 載入模型以建立資料表
+
+
+MIGRATION_LOCK_ID = 46_812_001  # Postgres advisory lock 代號（避免多 worker 同時遷移）
+
+migration_metadata = MetaData()  # 遷移紀錄專用 metadata
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(128), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)  # 已套用的遷移版本
+
+
+def _create_base_tables(connection: Connection) -> None:
+    Base.metadata.create_all(bind=connection)  # 建立尚不存在的資料表（既有資料表不變）
+
+
+def _create_tables(*table_names: str) -> Callable[[Connection], None]:
+    def _apply(connection: Connection) -> None:
+        tables = [Base.metadata.tables[name] for name in table_names]  # 指定的新資料表
+        Base.metadata.create_all(bind=connection, tables=tables)  # 既有資料庫補建資料表
+    return _apply
+
+
+def _create_indexes(*index_names: str) -> Callable[[Connection], None]:
+    def _apply(connection: Connection) -> None:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in index_names:
+                    index.create(bind=connection, checkfirst=True)  # 既有資料庫補建索引
+    return _apply
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "建立基礎資料表", _create_base_tables),
+    (
+        2,
+        "熱門查詢索引",
+        _create_indexes(
+            "ix_group_language_selections_lookup",
+            "ix_user_profiles_is_admin",
+            "ix_translation_memory_last_used_at",
+        ),
+    ),
+    (3, "翻譯字元用量", _create_tables("translation_usage")),
+    (4, "webhook 事件去重", _create_tables("processed_webhook_events")),
+]  # 依版本排序的遷移清單
+
+
+def applied_versions(connection: Connection) -> set[int]:
+    migration_metadata.create_all(bind=connection)  # 確保紀錄表存在
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())  # 已套用版本
+
+
+def current_version(engine: Engine) -> int:
+    with engine.begin() as connection:
+        versions = applied_versions(connection)  # 讀取已套用版本
+    return max(versions, default=0)  # 回傳目前版本
+
+
+def run_migrations(engine: Engine) -> list[int]:
+    applied: list[int] = []  # 本次套用的版本
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})  # 交易內鎖定，提交後自動釋放
+        done = applied_versions(connection)  # 讀取已套用版本
+        for version, name, apply in MIGRATIONS:
+            if version in done:
+                continue  # 已套用就略過
+            apply(connection)  # 執行遷移
+            connection.execute(insert(schema_migrations).values(version=version, name=name, applied_at=datetime.utcnow()))  # 記錄版本
+            applied.append(version)  # 累計本次版本
+    return applied  # 回傳本次套用版本
@@ -1,13 +1,24 @@
 from datetime import datetime  # 匯入時間型別
 
-from sqlalchemy import String, DateTime, Boolean, UniqueConstraint, ForeignKey  # 匯入欄位型別
+from sqlalchemy import String, Text, Integer, DateTime, Boolean, UniqueConstraint, ForeignKey, Sequence, Index  # 匯入欄位型別
 from sqlalchemy.orm import Mapped, mapped_column  # 匯入欄位映射
 
 from app.db.base import Base  # 匯入 Base
 
 
+member_code_sequence = Sequence("member_code_seq", metadata=Base.metadata)  # FAN 編號序列（僅支援序列的資料庫會建立）
+
+
+class IdCounter(Base):
+    __tablename__ = "id_counters"  # 不支援序列時的計數列
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)  # 計數器名稱
+    value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # 目前已配發的最大值
+
+
 class UserProfile(Base):
     __tablename__ = "user_profiles"  # 使用者資料表
+    __table_args__ = (Index("ix_user_profiles_is_admin", "is_admin", "id"),)  # 管理員清單查詢索引
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)  # 主鍵
     line_user_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)  # LINE ID
@@ -32,9 +43,51 @@ class GroupLanguageSelection(Base):
     __tablename__ = "group_language_selections"  # 群組多語設定表
     __table_args__ = (
         UniqueConstraint("line_group_id", "language_code", name="uq_group_language_pair"),
-    )  # 群組與語言唯一
+        Index("ix_group_language_selections_lookup", "line_group_id", "id", "language_code"),
+    )  # 群組與語言唯一、依群組排序讀取的覆蓋索引
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)  # 主鍵
     line_group_id: Mapped[str] = mapped_column(String(64), ForeignKey("group_settings.line_group_id"), nullable=False)  # 群組 ID
     language_code: Mapped[str] = mapped_column(String(16), nullable=False)  # 語言代碼
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)  # 建立時間
+
+
+class TranslationMemory(Base):
+    __tablename__ = "translation_memory"  # 跨程序共用翻譯記憶表
+    __table_args__ = (
+        UniqueConstraint("text_hash", "target_language", name="uq_translation_memory_key"),
+        Index("ix_translation_memory_last_used_at", "last_used_at", "id"),
+    )  # 原文雜湊與目標語言唯一、整理用索引
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)  # 主鍵
+    text_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # 原文 SHA-256
+    target_language: Mapped[str] = mapped_column(String(16), nullable=False)  # 目標語言
+    provider: Mapped[str] = mapped_column(String(16), nullable=False)  # 翻譯來源
+    source_text: Mapped[str] = mapped_column(Text, nullable=False)  # 原文（供管理工具檢視）
+    translated_text: Mapped[str] = mapped_column(Text, nullable=False)  # 譯文
+    hit_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 命中次數
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)  # 建立時間
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)  # 最近使用時間
+
+
+class TranslationUsage(Base):
+    __tablename__ = "translation_usage"  # 翻譯字元用量表
+    __table_args__ = (UniqueConstraint("scope", "subject", "period", name="uq_translation_usage_key"),)  # 同一對象每月一筆
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)  # 主鍵
+    scope: Mapped[str] = mapped_column(String(16), nullable=False)  # 統計類型（provider / group）
+    subject: Mapped[str] = mapped_column(String(64), nullable=False)  # 翻譯來源名稱或群組 ID
+    period: Mapped[str] = mapped_column(String(7), nullable=False)  # 統計月份（YYYY-MM，UTC）
+    characters: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 累計字元數
+    requests: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 累計請求數
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)  # 最近更新時間
+
+
+class ProcessedWebhookEvent(Base):
+    __tablename__ = "processed_webhook_events"  # 已處理的 webhook 事件（跨 worker 去重）
+    __table_args__ = (Index("ix_processed_webhook_events_expires_at", "expires_at"),)  # 清除過期資料用索引
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)  # 主鍵
+    event_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)  # LINE webhookEventId
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # 到期時間（UTC）
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)  # 建立時間
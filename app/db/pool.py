@@ -0,0 +1,190 @@
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from collections import deque  # 匯入固定長度佇列
+from typing import Any  # 匯入型別提示
+
+from sqlalchemy import event, exc  # 匯入事件掛勾與例外
+from sqlalchemy.engine import Engine, make_url  # 匯入引擎型別與 URL 解析
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool  # 匯入連線池
+
+from app.core.config import settings  # 匯入設定
+from app.core.metrics import db_pool_events_total, db_pool_wait_seconds  # 匯入連線池指標
+from app.core.statistics import percentile  # 匯入百分位數工具
+
+
+PING_ALWAYS = "always"  # 每次取出連線都先 ping（多一次往返）
+PING_IDLE = "idle"  # 只 ping 閒置超過門檻的連線
+PING_OFF = "off"  # 不 ping，靠 recycle 與斷線時自動作廢
+
+
+class PoolMonitor:
+    def __init__(self, name: str) -> None:
+        self.name = name  # 引擎名稱（sync / async）
+        self.pool = None  # 目前使用中的連線池
+        self._lock = threading.Lock()  # 統計用鎖
+        self._recent_waits: deque[float] = deque(maxlen=1000)  # 最近取得連線等待時間（秒）
+        self.checkouts = 0  # 取出次數
+        self.connects = 0  # 新建連線數
+        self.invalidations = 0  # 作廢連線數
+        self.soft_invalidations = 0  # 標記下次回收的連線數
+        self.timeouts = 0  # 等待連線逾時次數
+        self.ping_failures = 0  # 閒置 ping 失敗次數
+        self.max_checked_out = 0  # 觀察到的最大同時使用數
+        self._max_wait = 0.0  # 最大等待時間
+
+    def record_wait(self, waited: float, timed_out: bool = False) -> None:
+        db_pool_wait_seconds.observe(waited, engine=self.name)  # 記錄等待時間
+        with self._lock:
+            self._max_wait = max(self._max_wait, waited)  # 更新最大等待時間
+            self._recent_waits.append(waited)  # 保留最近等待時間
+            if timed_out:
+                self.timeouts += 1  # 累計逾時
+        if timed_out:
+            db_pool_events_total.inc(engine=self.name, event="timeouts")  # 累計逾時事件
+
+    def record(self, event_name: str) -> None:
+        with self._lock:
+            setattr(self, event_name, getattr(self, event_name) + 1)  # 累計對應事件
+        db_pool_events_total.inc(engine=self.name, event=event_name)  # 累計事件指標
+
+    def on_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1  # 累計取出
+            if self.pool is not None:
+                self.max_checked_out = max(self.max_checked_out, self.pool.checkedout())  # 更新最大同時使用數
+
+    def connection_samples(self) -> list[tuple[dict[str, str], float]]:
+        pool = self.pool  # 目前連線池
+        if not isinstance(pool, QueuePool):
+            return []  # 非佇列型連線池沒有可用數字
+        return [
+            ({"engine": self.name, "state": "checked_out"}, pool.checkedout()),
+            ({"engine": self.name, "state": "idle"}, pool.checkedin()),
+            ({"engine": self.name, "state": "overflow"}, max(0, pool.overflow())),
+        ]  # 使用中 / 閒置 / 超額連線數
+
+    def stats(self) -> dict[str, Any]:
+        pool = self.pool  # 目前連線池
+        with self._lock:
+            recent = sorted(self._recent_waits)  # 排序後計算百分位數
+            waits = len(recent)  # 最近樣本數
+            snapshot = {
+                "pool": type(pool).__name__ if pool is not None else None,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "timeouts": self.timeouts,
+                "ping_failures": self.ping_failures,
+                "max_checked_out": self.max_checked_out,
+                "wait_avg_ms": round(sum(recent) / waits * 1000, 3) if waits else 0.0,  # 最近樣本平均
+                "wait_max_ms": round(self._max_wait * 1000, 3),
+            }  # 連線池統計快照
+        snapshot["wait_p50_ms"] = round(percentile(recent, 0.50) * 1000, 3)  # 最近等待時間中位數
+        snapshot["wait_p95_ms"] = round(percentile(recent, 0.95) * 1000, 3)  # 最近等待時間 p95
+        if isinstance(pool, QueuePool):
+            snapshot.update(
+                {
+                    "size": pool.size(),
+                    "max_overflow": pool._max_overflow,
+                    "checked_out": pool.checkedout(),
+                    "idle": pool.checkedin(),
+                    "overflow": max(0, pool.overflow()),
+                }
+            )  # 即時連線數
+        return snapshot  # 回傳統計
+
+
+class _TimedPoolMixin:
+    monitor: PoolMonitor  # 由 timed_pool_class 指定
+
+    def _do_get(self):
+        started = time.perf_counter()  # 開始等待連線
+        try:
+            record = super()._do_get()  # 取得閒置連線或新建連線
+        except exc.TimeoutError:
+            self.monitor.record_wait(time.perf_counter() - started, timed_out=True)  # 連線池已滿且等待逾時
+            raise
+        self.monitor.record_wait(time.perf_counter() - started)  # 記錄等待時間
+        return record
+
+
+def timed_pool_class(base: type[QueuePool], monitor: PoolMonitor) -> type[QueuePool]:
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"monitor": monitor})  # 連線池重建時沿用同一個統計
+
+
+def _uses_queue_pool(db_url: str) -> bool:
+    url = make_url(db_url)  # 解析 URL
+    return not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"))  # 記憶體 SQLite 使用單一連線池
+
+
+def engine_options(db_url: str, monitor: PoolMonitor) -> dict[str, Any]:
+    options: dict[str, Any] = {
+        "pool_pre_ping": settings.db_pool_pre_ping == PING_ALWAYS,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }  # 共用引擎參數
+    if _uses_queue_pool(db_url):
+        is_async = make_url(db_url).get_dialect().is_async  # 是否為 asyncio driver
+        options.update(
+            {
+                "poolclass": timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, monitor),
+                "pool_size": settings.db_pool_size,
+                "max_overflow": settings.db_max_overflow,
+                "pool_timeout": settings.db_pool_timeout,
+            }
+        )  # 連線數上限與等待逾時
+    connect_args = _statement_timeout_args(db_url, settings.db_statement_timeout_ms)  # 查詢逾時
+    if connect_args:
+        options["connect_args"] = connect_args  # 連線時設定
+    return options  # 回傳 create_engine 參數
+
+
+def _statement_timeout_args(db_url: str, timeout_ms: int) -> dict[str, Any]:
+    url = make_url(db_url)  # 解析 URL
+    if timeout_ms <= 0 or url.get_backend_name() != "postgresql":
+        return {}  # 未設定或非 Postgres
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(timeout_ms)}}  # asyncpg 以 server_settings 設定
+    return {"options": f"-c statement_timeout={timeout_ms}"}  # psycopg2 以啟動參數設定
+
+
+def instrument_pool(target: Engine, monitor: PoolMonitor) -> None:
+    monitor.pool = target.pool  # 記錄連線池供統計讀取
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        monitor.record("connects")  # 新建連線
+
+    @event.listens_for(target, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        if settings.db_pool_pre_ping == PING_IDLE:
+            _ping_if_idle(dbapi_connection, connection_record, monitor)  # 閒置過久才確認連線仍有效
+        monitor.pool = target.pool  # dispose 後連線池會重建
+        monitor.on_checkout()  # 累計取出
+
+    @event.listens_for(target, "checkin")
+    def _on_checkin(dbapi_connection, connection_record) -> None:
+        connection_record.info["checked_in_at"] = time.monotonic()  # 記錄歸還時間
+
+    @event.listens_for(target, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        monitor.record("invalidations")  # 連線作廢
+
+    @event.listens_for(target, "soft_invalidate")
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception) -> None:
+        monitor.record("soft_invalidations")  # 標記下次回收
+
+
+def _ping_if_idle(dbapi_connection, connection_record, monitor: PoolMonitor) -> None:
+    checked_in_at = connection_record.info.get("checked_in_at")  # 上次歸還時間（新連線沒有）
+    if checked_in_at is None or time.monotonic() - checked_in_at < settings.db_pool_ping_idle_seconds:
+        return  # 新連線或剛用過的連線不需 ping
+    try:
+        cursor = dbapi_connection.cursor()  # 建立游標
+        try:
+            cursor.execute("SELECT 1")  # 確認連線仍有效
+        finally:
+            cursor.close()  # 關閉游標
+    except Exception as error:
+        monitor.record("ping_failures")  # 閒置連線已被伺服器關閉
+        raise exc.DisconnectionError("閒置連線已失效") from error  # 連線池會作廢並改取新連線
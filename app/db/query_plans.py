@@ -0,0 +1,64 @@
+from sqlalchemy import select, text  # 匯入 SQL 工具
+from sqlalchemy.engine import Engine  # 匯入引擎型別
+from sqlalchemy.sql import Select  # 匯入查詢型別
+
+from app.db.models import GroupLanguageSelection, GroupSetting, TranslationMemory, UserProfile  # 匯入模型
+from app.repositories.chat_context_repository import CHAT_CONTEXT_ANCHOR, chat_context_query  # 匯入每則訊息的對話情境查詢
+
+
+ONE_ROW_SOURCES = {CHAT_CONTEXT_ANCHOR}  # 單列子查詢（SQLite 以 co-routine 掃描，只有一列不算全表掃描）
+
+
+def hot_queries() -> dict[str, Select]:
+    return {
+        "get_user_by_line_id": select(UserProfile).where(UserProfile.line_user_id == "U0"),
+        "get_user_by_member_code": select(UserProfile).where(UserProfile.member_code == "FAN000001"),
+        "list_admin_users": select(UserProfile).where(UserProfile.is_admin.is_(True)).order_by(UserProfile.id.asc()),
+        "get_group": select(GroupSetting).where(GroupSetting.line_group_id == "G0"),
+        "load_group_with_languages": select(GroupSetting, GroupLanguageSelection.language_code)
+        .outerjoin(GroupLanguageSelection, GroupLanguageSelection.line_group_id == GroupSetting.line_group_id)
+        .where(GroupSetting.line_group_id == "G0")
+        .order_by(GroupLanguageSelection.id.asc()),
+        "load_chat_context": chat_context_query("U0", "G0"),
+        "get_translation_memory": select(TranslationMemory).where(
+            TranslationMemory.text_hash == "0" * 64,
+            TranslationMemory.target_language == "en",
+        ),
+    }  # 熱門路徑查詢（參數值只用於產生查詢計畫）
+
+
+def _sequential_scans(plan_lines: list[str], dialect_name: str) -> list[str]:
+    if dialect_name == "postgresql":
+        return [line.strip() for line in plan_lines if "Seq Scan" in line]  # Postgres 循序掃描
+    return [
+        line.strip()
+        for line in plan_lines
+        if line.strip().startswith("SCAN ")
+        and "USING" not in line
+        and "CONSTANT ROW" not in line
+        and line.strip().split()[1] not in ONE_ROW_SOURCES
+    ]  # SQLite 全表掃描
+
+
+def explain_hot_queries(engine: Engine) -> dict[str, list[str]]:
+    plans: dict[str, list[str]] = {}  # 查詢名稱 -> 查詢計畫
+    dialect = engine.dialect  # 資料庫方言
+    with engine.connect() as connection:
+        if dialect.name == "postgresql":
+            connection.execute(text("SET LOCAL enable_seqscan = off"))  # 小表也強制評估索引可用性
+        for name, query in hot_queries().items():
+            compiled = str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))  # 產生 SQL
+            prefix = "EXPLAIN" if dialect.name == "postgresql" else "EXPLAIN QUERY PLAN"  # 查詢計畫語法
+            rows = connection.execute(text(f"{prefix} {compiled}")).all()  # 取得查詢計畫
+            plans[name] = [str(row[-1]) for row in rows]  # 保留計畫描述欄位
+        connection.rollback()  # 還原 SET LOCAL
+    return plans  # 回傳查詢計畫
+
+
+def find_sequential_scans(engine: Engine) -> dict[str, list[str]]:
+    problems: dict[str, list[str]] = {}  # 有全表掃描的查詢
+    for name, plan_lines in explain_hot_queries(engine).items():
+        scans = _sequential_scans(plan_lines, engine.dialect.name)  # 找出全表掃描
+        if scans:
+            problems[name] = scans  # 記錄問題
+    return problems  # 回傳問題清單
@@ -1,15 +1,124 @@
-from sqlalchemy import create_engine  # 匯入引擎
+import importlib.util  # 匯入套件偵測工具
+import time  # 匯入計時工具
+
+from sqlalchemy import create_engine, event  # 匯入引擎與事件掛勾
+from sqlalchemy.engine import Engine  # 匯入引擎型別
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine  # 匯入 asyncio 引擎
 from sqlalchemy.orm import sessionmaker  # 匯入 Session 工廠
 
 from app.core.config import settings  # 匯入設定
-from app.core.database import normalize_database_url  # 匯入資料庫 URL 處理
+from app.core.database import async_database_url, async_driver_package, normalize_database_url  # 匯入資料庫 URL 處理
+from app.core.metrics import db_query_seconds  # 匯入資料庫耗時指標
 from app.db.base import Base  # 匯入 Base
 from app.db import models  # noqa: F401  # 載入模型以建立資料表
+from app.db.migrations import run_migrations  # 匯入遷移工具
+from app.db.pool import PoolMonitor, engine_options, instrument_pool  # 匯入連線池設定與統計
+from app.db.sqlite_profile import configure_sqlite_engine, sqlite_write_queue  # 匯入 SQLite 調校與單一寫入者
 
 
-engine = create_engine(normalize_database_url(settings.database_url), pool_pre_ping=True, future=True)  # 建立引擎
+pool_monitors = {"sync": PoolMonitor("sync"), "async": PoolMonitor("async")}  # 各引擎連線池統計
+_database_url = normalize_database_url(settings.database_url)  # 同步引擎 URL
+engine = create_engine(_database_url, future=True, **engine_options(_database_url, pool_monitors["sync"]))  # 建立引擎
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)  # 建立 Session
 
+_async_engine: AsyncEngine | None = None  # asyncio 引擎（首次使用時建立）
+_async_sessionmaker: async_sessionmaker[AsyncSession] | None = None  # asyncio Session 工廠
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())  # 記錄查詢開始時間
+
+
+def _record_query_time(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["query_started"].pop()  # 取出開始時間
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"  # SELECT / INSERT / UPDATE ...
+    db_query_seconds.observe(time.perf_counter() - started, operation=operation)  # 記錄查詢耗時
+
+
+def _discard_query_timer(context) -> None:
+    started = context.connection.info.get("query_started") if context.connection is not None else None  # 失敗查詢的開始時間
+    if started:
+        started.pop()  # 失敗時丟棄計時避免錯位
+
+
+def _instrument_engine(target: Engine) -> None:
+    event.listen(target, "before_cursor_execute", _start_query_timer)  # 查詢開始
+    event.listen(target, "after_cursor_execute", _record_query_time)  # 查詢結束
+    event.listen(target, "handle_error", _discard_query_timer)  # 查詢失敗
+
+
+_instrument_engine(engine)  # 同步引擎查詢耗時
+instrument_pool(engine, pool_monitors["sync"])  # 同步引擎連線池統計
+if engine.dialect.name == "sqlite":
+    configure_sqlite_engine(engine, sqlite_write_queue)  # SQLite 連線調校並依序寫入
+
+
+def async_db_available() -> bool:
+    package = async_driver_package(settings.database_url)  # 需要的 asyncio driver
+    return settings.async_db_enabled and package is not None and importlib.util.find_spec(package) is not None  # 啟用且已安裝 driver
+
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        url = async_database_url(settings.database_url)  # asyncio 引擎 URL
+        _async_engine = create_async_engine(url, **engine_options(url, pool_monitors["async"]))  # 建立 asyncio 引擎
+        _instrument_engine(_async_engine.sync_engine)  # asyncio 引擎同樣記錄查詢耗時
+        instrument_pool(_async_engine.sync_engine, pool_monitors["async"])  # asyncio 引擎連線池統計
+        if _async_engine.dialect.name == "sqlite":
+            configure_sqlite_engine(_async_engine.sync_engine)  # 只套用調校（事件迴圈上不可阻塞排隊，改靠 busy_timeout）
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)  # 提交後不需重新讀取屬性
+    return _async_sessionmaker  # 回傳 Session 工廠
+
+
+def pool_stats() -> dict:
+    stats = {"sync": pool_monitors["sync"].stats()}  # 同步引擎統計
+    if _async_engine is not None:
+        stats["async"] = pool_monitors["async"].stats()  # asyncio 引擎啟用後才有
+    return {
+        "config": {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "recycle_seconds": settings.db_pool_recycle_seconds,
+            "pre_ping": settings.db_pool_pre_ping,
+            "ping_idle_seconds": settings.db_pool_ping_idle_seconds,
+            "statement_timeout_ms": settings.db_statement_timeout_ms,
+        },
+        "engines": stats,
+    }  # 設定值與即時統計
+
+
+def sqlite_stats() -> dict:
+    if engine.dialect.name != "sqlite":
+        return {"sqlite": False}  # 非 SQLite 部署
+    with engine.connect() as connection:
+        pragmas = {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+        }  # 實際生效的設定
+    return {
+        "sqlite": True,
+        "tuning_enabled": settings.sqlite_tuning_enabled,
+        "pragmas": pragmas,
+        "write_queue": sqlite_write_queue.stats(),
+    }  # 調校參數與寫入排隊統計
+
+
+def pool_connection_samples() -> list[tuple[dict[str, str], float]]:
+    return [sample for monitor in pool_monitors.values() for sample in monitor.connection_samples()]  # 各引擎連線數
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()  # 關閉 asyncio 連線池
+    _async_engine = None  # 清除參照
+    _async_sessionmaker = None  # 清除參照
+
 
 def init_db() -> None:
+    if settings.auto_migrate:
+        run_migrations(engine)  # 啟動時套用尚未執行的遷移
+        return
     Base.metadata.create_all(bind=engine)  # 建立所有資料表
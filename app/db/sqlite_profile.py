@@ -0,0 +1,187 @@
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from collections import deque  # 匯入固定長度佇列
+from typing import Any  # 匯入型別提示
+
+from sqlalchemy import event  # 匯入事件掛勾
+from sqlalchemy.engine import Engine  # 匯入引擎型別
+
+from app.core.config import settings  # 匯入設定
+from app.core.metrics import sqlite_write_wait_seconds  # 匯入寫入排隊指標
+from app.core.statistics import percentile  # 匯入百分位數工具
+
+
+JOURNAL_MODES = {"delete", "truncate", "persist", "memory", "wal", "off"}  # 允許的 journal_mode
+SYNCHRONOUS_LEVELS = {"off", "normal", "full", "extra"}  # 允許的 synchronous
+WRITE_OPERATIONS = {"INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER"}  # 需要寫入鎖的語句
+_WRITE_HELD = "sqlite_write_held"  # 連線 info 內的持有標記
+
+
+def sqlite_pragmas() -> list[tuple[str, str | int]]:
+    journal_mode = settings.sqlite_journal_mode.lower()  # 日誌模式
+    synchronous = settings.sqlite_synchronous.lower()  # 同步等級
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"不支援的 SQLITE_JOURNAL_MODE：{settings.sqlite_journal_mode}")  # 設定錯誤
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"不支援的 SQLITE_SYNCHRONOUS：{settings.sqlite_synchronous}")  # 設定錯誤
+    return [
+        ("busy_timeout", int(settings.sqlite_busy_timeout_ms)),
+        ("journal_mode", journal_mode.upper()),
+        ("synchronous", synchronous.upper()),
+        ("mmap_size", int(settings.sqlite_mmap_size)),
+        ("cache_size", -int(settings.sqlite_cache_size_kib)),
+    ]  # 依序套用（先設 busy_timeout，切換 WAL 時遇到其他連線也會等待）
+
+
+def apply_sqlite_profile(dbapi_connection) -> None:
+    cursor = dbapi_connection.cursor()  # 建立游標
+    try:
+        for name, value in sqlite_pragmas():
+            cursor.execute(f"PRAGMA {name}={value}")  # 套用調校參數（數值已驗證或轉為整數）
+    finally:
+        cursor.close()  # 關閉游標
+
+
+class _Waiter:
+    __slots__ = ("ident", "started", "waited", "granted")
+
+    def __init__(self, ident: int, started: float) -> None:
+        self.ident = ident  # 排隊的執行緒
+        self.started = started  # 開始排隊時間
+        self.waited = 0.0  # 實際排隊秒數
+        self.granted = threading.Event()  # 輪到時由前一位寫入者設定
+
+
+class SQLiteWriteQueue:
+    def __init__(self, enabled: bool, timeout_seconds: float) -> None:
+        self.enabled = enabled  # 是否啟用單一寫入者
+        self.timeout_seconds = timeout_seconds  # 最多排隊秒數（逾時改交給 SQLite busy_timeout）
+        self._lock = threading.Lock()  # 保護排隊狀態
+        self._waiters: deque[_Waiter] = deque()  # 依到達順序排隊的寫入者
+        self._owner: int | None = None  # 目前持有寫入權的執行緒
+        self._holds = 0  # 同一執行緒重入次數
+        self._acquired_at = 0.0  # 取得寫入權的時間
+        self._recent_waits: deque[float] = deque(maxlen=1000)  # 最近排隊時間（秒）
+        self.acquired = 0  # 取得寫入權次數
+        self.reentered = 0  # 同一執行緒重入次數
+        self.timeouts = 0  # 排隊逾時次數
+        self.max_waiting = 0  # 觀察到的最大排隊數
+        self._total_hold = 0.0  # 累積持有時間
+        self._max_hold = 0.0  # 最長持有時間
+        self._max_wait = 0.0  # 最長排隊時間
+
+    def _grant(self, ident: int, started: float) -> float:
+        self._owner = ident  # 取得寫入權
+        self._holds = 1  # 持有次數
+        self._acquired_at = time.perf_counter()  # 記錄取得時間
+        waited = self._acquired_at - started  # 排隊時間
+        self.acquired += 1  # 累計取得
+        self._recent_waits.append(waited)  # 保留最近排隊時間
+        self._max_wait = max(self._max_wait, waited)  # 更新最長排隊時間
+        return waited  # 回傳排隊時間
+
+    def acquire(self) -> bool:
+        ident = threading.get_ident()  # 目前執行緒
+        started = time.perf_counter()  # 開始排隊
+        with self._lock:
+            if self._owner == ident:
+                self._holds += 1  # 同一執行緒的第二條連線不再排隊（避免自我死結）
+                self.reentered += 1  # 累計重入
+                return True
+            if self._owner is None and not self._waiters:
+                waited = self._grant(ident, started)  # 沒有人在寫入，直接取得
+                waiter = None  # 不需排隊
+            else:
+                waiter = _Waiter(ident, started)  # 排隊號碼
+                self._waiters.append(waiter)  # 排到隊尾
+                self.max_waiting = max(self.max_waiting, len(self._waiters))  # 更新最大排隊數
+        if waiter is not None:
+            if not waiter.granted.wait(self.timeout_seconds):
+                with self._lock:
+                    if not waiter.granted.is_set():
+                        self._waiters.remove(waiter)  # 放棄排隊
+                        self.timeouts += 1  # 累計逾時
+                        return False  # 交給 SQLite busy_timeout 處理
+            waited = waiter.waited  # 前一位寫入者已直接移交寫入權
+        sqlite_write_wait_seconds.observe(waited)  # 記錄排隊指標
+        return True  # 已取得寫入權
+
+    def release(self) -> None:
+        with self._lock:
+            if self._holds == 0:
+                return  # 沒有持有就略過
+            self._holds -= 1  # 減少持有次數
+            if self._holds:
+                return  # 同一執行緒仍有其他連線在寫入
+            held = time.perf_counter() - self._acquired_at  # 持有時間
+            self._total_hold += held  # 累積持有時間
+            self._max_hold = max(self._max_hold, held)  # 更新最長持有時間
+            self._owner = None  # 釋放寫入權
+            if self._waiters:
+                waiter = self._waiters.popleft()  # 隊首寫入者
+                waiter.waited = self._grant(waiter.ident, waiter.started)  # 直接移交，避免其他執行緒插隊
+                waiter.granted.set()  # 只喚醒下一位（不驚動整個佇列）
+
+    def waiting(self) -> int:
+        with self._lock:
+            return len(self._waiters)  # 目前排隊數
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent_waits)  # 排序後計算百分位數
+            snapshot = {
+                "enabled": self.enabled,
+                "waiting": len(self._waiters),
+                "max_waiting": self.max_waiting,
+                "acquired": self.acquired,
+                "reentered": self.reentered,
+                "timeouts": self.timeouts,
+                "hold_avg_ms": round(self._total_hold / self.acquired * 1000, 3) if self.acquired else 0.0,
+                "hold_max_ms": round(self._max_hold * 1000, 3),
+                "wait_max_ms": round(self._max_wait * 1000, 3),
+            }  # 寫入排隊統計
+        snapshot["wait_p50_ms"] = round(percentile(recent, 0.50) * 1000, 3)  # 最近排隊時間中位數
+        snapshot["wait_p95_ms"] = round(percentile(recent, 0.95) * 1000, 3)  # 最近排隊時間 p95
+        return snapshot  # 回傳統計
+
+
+def _is_write(statement: str) -> bool:
+    words = statement.lstrip().split(None, 1)  # 取第一個關鍵字
+    return bool(words) and words[0].upper() in WRITE_OPERATIONS  # 是否為寫入語句
+
+
+def _release(info: dict | None, write_queue: SQLiteWriteQueue) -> None:
+    if info is not None and info.pop(_WRITE_HELD, False):
+        write_queue.release()  # 交易結束並歸還連線後才讓下一位寫入
+
+
+def configure_sqlite_engine(target: Engine, write_queue: SQLiteWriteQueue | None = None) -> None:
+    if settings.sqlite_tuning_enabled:
+
+        @event.listens_for(target, "connect")
+        def _apply_profile(dbapi_connection, connection_record) -> None:
+            apply_sqlite_profile(dbapi_connection)  # 每條新連線套用調校
+
+    if write_queue is None or not write_queue.enabled:
+        return  # 不排隊寫入
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _queue_write(conn, cursor, statement, parameters, context, executemany) -> None:
+        if conn.info.get(_WRITE_HELD) or not _is_write(statement):
+            return  # 已持有寫入權或只是讀取
+        if write_queue.acquire():
+            conn.info[_WRITE_HELD] = True  # 持有到交易結束、連線歸還
+
+    @event.listens_for(target, "checkin")
+    def _release_on_checkin(dbapi_connection, connection_record) -> None:
+        _release(getattr(connection_record, "info", None), write_queue)  # 提交或回滾後歸還連線
+
+    @event.listens_for(target, "invalidate")
+    def _release_on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        _release(getattr(connection_record, "info", None), write_queue)  # 連線作廢時也要釋放
+
+
+sqlite_write_queue = SQLiteWriteQueue(
+    enabled=settings.sqlite_write_queue_enabled,
+    timeout_seconds=settings.sqlite_busy_timeout_ms / 1000,
+)  # 全域 SQLite 單一寫入者佇列
@@ -1,6 +1,20 @@
+import asyncio  # 匯入 asyncio 工具
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait  # 匯入執行緒池工具
+
+from app.core.config import settings  # 匯入設定
+from app.core.deadline import DeadlineExceeded, time_left  # 匯入事件期限工具
+from app.core.metrics import translation_fallbacks_total  # 匯入翻譯備援指標
 from app.fanfan_core.language_profile import get_language_display  # 匯入語言顯示工具
 
 
+_fanout_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.translation_fanout_workers),
+    thread_name_prefix="translate-fanout",
+)  # 多語翻譯共用執行緒池
+
+DEADLINE_MISSED_TEXT = "⌛ 翻譯逾時"  # 期限內未完成的語言顯示文字
+
+
 def format_language_updated(language_codes: list[str]) -> str:
     lines = ["✅ 已更新翻譯語言！", "", "目前設定語言："]  # 標題
     for code in language_codes:
@@ -9,12 +23,80 @@ def format_language_updated(language_codes: list[str]) -> str:
     return "\n".join(lines)  # 回傳完整訊息
 
 
-def format_translation_results(text: str, language_codes: list[str], translate_func) -> str:
-    rows: list[str] = []  # 翻譯結果行
-    for code in language_codes:
-        try:
-            translated = translate_func(text, code)  # 執行翻譯
-        except Exception:
-            translated = text  # 單語失敗時回原文
-        rows.append(f"[{code}] {translated}")  # 舊版格式
+def _safe_translate(translate_func, text: str, code: str, deadline: float | None = None) -> str:
+    try:
+        if deadline is None:
+            return translate_func(text, code)  # 執行翻譯
+        return translate_func(text, code, deadline=deadline)  # 帶入事件期限
+    except DeadlineExceeded:
+        return DEADLINE_MISSED_TEXT  # 期限內未完成
+    except Exception:
+        return text  # 單語失敗時回原文
+
+
+def _translate_concurrently(
+    text: str,
+    language_codes: list[str],
+    translate_func,
+    max_concurrency: int,
+    deadline: float | None = None,
+) -> list[str]:
+    results: list[str] = [DEADLINE_MISSED_TEXT] * len(language_codes)  # 依原順序存放結果（未完成者視為逾時）
+    pending: dict[Future, int] = {}  # 進行中的翻譯與其位置
+    for index, code in enumerate(language_codes):
+        if len(pending) >= max_concurrency:
+            done, _ = wait(pending, timeout=time_left(deadline), return_when=FIRST_COMPLETED)  # 達上限時等待任一完成
+            if not done:
+                return results  # 期限已到，其餘語言以部分結果回覆
+            for future in done:
+                results[pending.pop(future)] = future.result()  # 寫回對應位置
+        pending[_fanout_executor.submit(_safe_translate, translate_func, text, code, deadline)] = index  # 送出翻譯
+    done, _ = wait(pending, timeout=time_left(deadline))  # 在期限內收齊剩餘結果
+    for future in done:
+        results[pending[future]] = future.result()  # 寫回對應位置
+    return results  # 回傳與語言順序一致的結果
+
+
+def format_translation_results(
+    text: str,
+    language_codes: list[str],
+    translate_func,
+    max_concurrency: int | None = None,
+    deadline: float | None = None,
+) -> str:
+    limit = max_concurrency if max_concurrency is not None else settings.translation_fanout_per_group  # 單則訊息同時翻譯上限
+    if limit <= 1 or len(language_codes) <= 1:
+        translations = [_safe_translate(translate_func, text, code, deadline) for code in language_codes]  # 單語或不併發時逐一翻譯
+    else:
+        translations = _translate_concurrently(text, language_codes, translate_func, limit, deadline)  # 多語同時翻譯
+    missed = translations.count(DEADLINE_MISSED_TEXT)  # 逾時語言數
+    if missed:
+        translation_fallbacks_total.inc(missed, reason="deadline")  # 累計逾時
+    rows = [f"[{code}] {translated}" for code, translated in zip(language_codes, translations)]  # 舊版格式
+    return "\n".join(rows)  # 回傳多語結果
+
+
+async def format_translation_results_async(
+    text: str,
+    language_codes: list[str],
+    translate_func,
+    max_concurrency: int | None = None,
+    deadline: float | None = None,
+) -> str:
+    limit = max(1, max_concurrency if max_concurrency is not None else settings.translation_fanout_per_group)  # 單則訊息同時翻譯上限
+    semaphore = asyncio.Semaphore(limit)  # 限制同時請求數
+
+    async def _translate(code: str) -> str:
+        async with semaphore:
+            try:
+                if deadline is None:
+                    return await translate_func(text, code)  # 執行 asyncio 翻譯
+                return await asyncio.wait_for(translate_func(text, code, deadline=deadline), timeout=max(0.0, time_left(deadline)))  # 帶入事件期限
+            except (DeadlineExceeded, asyncio.TimeoutError):
+                return DEADLINE_MISSED_TEXT  # 期限內未完成
+            except Exception:
+                return text  # 單語失敗時回原文
+
+    translations = await asyncio.gather(*(_translate(code) for code in language_codes))  # 依原順序收集結果
+    rows = [f"[{code}] {translated}" for code, translated in zip(language_codes, translations)]  # 舊版格式
     return "\n".join(rows)  # 回傳多語結果
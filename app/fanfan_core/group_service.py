@@ -6,9 +6,8 @@ from app.repositories.group_repository import (
     create_group,
     get_group_languages,
     set_group_languages,
-    add_group_language,
-    remove_group_language,
     reset_group_languages,
+    toggle_group_language,
 )  # 匯入群組資料存取
 
 
@@ -22,11 +21,7 @@ def get_languages(db: Session, group_id: str) -> list[str]:
 
 def toggle_or_set_languages(db: Session, group_id: str, selected_codes: list[str], toggle_single: bool) -> list[str]:
     if toggle_single and len(selected_codes) == 1:
-        code = selected_codes[0]  # 單一語言切換
-        current = get_group_languages(db, group_id)  # 目前語言
-        if code in current:
-            return remove_group_language(db, group_id, code)  # 已存在則移除
-        return add_group_language(db, group_id, code)  # 不存在則加入
+        return toggle_group_language(db, group_id, selected_codes[0])  # 單一語言切換（已存在則移除、不存在則加入）
     return set_group_languages(db, group_id, selected_codes)  # 多語直接覆蓋
 
 
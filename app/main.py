@@ -1,16 +1,58 @@
+import logging  # 匯入日誌工具
+
 from fastapi import FastAPI, Request, HTTPException  # 匯入 FastAPI 與請求型別
+from fastapi.responses import PlainTextResponse  # 匯入純文字回應
+from fastapi.concurrency import run_in_threadpool  # 匯入執行緒池工具
+from linebot.v3.exceptions import InvalidSignatureError  # 匯入簽章錯誤
 
 from app.core.config import settings  # 匯入設定
-from app.db.session import init_db  # 匯入資料庫初始化
-from app.bot.handlers import line_handler  # 匯入 LINE 事件處理器
+from app.core.metrics import registry, webhook_seconds  # 匯入指標登記表
+from app.core.database import async_driver_package  # 匯入 asyncio driver 對照
+from app.db.sqlite_profile import sqlite_write_queue  # 匯入 SQLite 單一寫入者
+from app.db.session import async_db_available, dispose_async_engine, engine, init_db, pool_connection_samples, pool_stats, sqlite_stats  # 匯入資料庫初始化、asyncio 引擎、連線池與 SQLite 統計
+from app.bot.handlers import flex_card_cache, line_handler, line_reply_client  # 匯入 LINE 事件處理器、回覆客戶端與小卡快取
+from app.bot.event_queue import WebhookEventQueue  # 匯入背景事件佇列
+from app.ui.card_cache import warm_up_card_cache  # 匯入小卡預熱工具
+from app.repositories.group_repository import group_snapshot_cache  # 匯入群組設定快取
+from app.services.http_clients import close_async_provider_client  # 匯入 asyncio 連線池關閉工具
+from app.services.id_service import seed_member_code_counter  # 匯入編號計數器初始化
+from app.services.language_detection import detection_stats  # 匯入語言偵測統計
+from app.services.translation_service import provider_rate_limiter, provider_router, translation_cache, translation_flights  # 匯入翻譯快取、請求合併、來源路由與限速
+from app.services.usage_service import budget_settings, usage_tracker  # 匯入字元用量統計
+from app.services.webhook_dedup_service import webhook_event_store  # 匯入 webhook 事件去重
+
 
+logger = logging.getLogger(__name__)  # 模組日誌
 
 app = FastAPI(title="FanFan Translator Bot")  # 建立 FastAPI 應用
+async_webhook_enabled = async_db_available()  # 直接處理模式是否走 asyncio 資料庫引擎
+webhook_event_queue = WebhookEventQueue(
+    line_handler.dispatch_event,
+    worker_count=settings.webhook_queue_workers,
+    max_size=settings.webhook_queue_max_size,
+)  # 建立背景事件佇列
 
 
 @app.on_event("startup")
 def startup_event() -> None:
     init_db()  # 啟動時建立資料表
+    seed_member_code_counter(engine)  # 啟動時對齊既有最大編號，加好友時不必掃描使用者表
+    line_reply_client.open()  # 建立長期持有的 LINE API 連線
+    if settings.async_db_enabled and not async_webhook_enabled:
+        logger.warning("ASYNC_DB_ENABLED 已開啟但未安裝 %s，改用同步資料庫", async_driver_package(settings.database_url))  # 缺少 driver 時退回同步
+    if settings.card_cache_warm_up:
+        warm_up_card_cache(flex_card_cache)  # 預建常用小卡
+    if settings.webhook_queue_enabled:
+        webhook_event_queue.start()  # 啟動背景 worker
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    await run_in_threadpool(webhook_event_queue.stop)  # 處理完剩餘事件後停止 worker
+    await run_in_threadpool(usage_tracker.flush)  # 寫入尚未儲存的字元用量
+    await close_async_provider_client()  # 關閉翻譯 API 連線池
+    await dispose_async_engine()  # 關閉 asyncio 資料庫連線池
+    await line_reply_client.aclose()  # 關閉 LINE API 連線
 
 
 @app.get("/")
@@ -20,12 +62,147 @@ def health_check() -> dict[str, str]:
 
 @app.post("/webhook/line")
 async def line_webhook(request: Request) -> dict[str, str]:
+    with webhook_seconds.time():
+        return await _handle_line_webhook(request)  # 記錄 webhook 處理耗時
+
+
+async def _handle_line_webhook(request: Request) -> dict[str, str]:
     signature = request.headers.get("X-Line-Signature", "")  # 取得簽章
     body = (await request.body()).decode("utf-8")  # 讀取 body
     if not signature:
         raise HTTPException(status_code=400, detail="Missing signature")  # 缺少簽章
-    line_handler.handle(body, signature)  # 交給 LINE SDK 驗證與分派
-    return {"message": "ok"}  # 回傳成功
+    try:
+        if not settings.webhook_queue_enabled and not async_webhook_enabled:
+            line_handler.handle(body, signature)  # 交給 LINE SDK 驗證與分派
+            return {"message": "ok"}  # 回傳成功
+        payload = line_handler.parse(body, signature)  # 只驗證簽章與解析事件
+    except InvalidSignatureError as exc:
+        raise HTTPException(status_code=400, detail="Invalid signature") from exc  # 簽章錯誤
+    if not settings.webhook_queue_enabled:
+        await line_handler.handle_payload_async(payload)  # 在事件迴圈上查資料庫、翻譯與回覆
+        return {"message": "ok"}  # 回傳成功
+    if len(payload.events) > 1:
+        await run_in_threadpool(line_handler.prepare_events, payload.events)  # 批次預先建立加好友使用者
+    for event in payload.events:
+        queued = await run_in_threadpool(
+            webhook_event_queue.submit, event, payload.destination, settings.webhook_queue_submit_timeout_seconds
+        )  # 在該聊天室的佇列等待空位
+        if not queued:
+            raise HTTPException(status_code=503, detail="Webhook queue full")  # 不插隊直接處理，改讓 LINE 重送（已排入的事件由去重略過）
+    return {"message": "ok"}  # 立即回傳成功
+
+
+@app.get("/diagnostics/webhook-queue")
+def show_webhook_queue() -> dict:
+    return {"enabled": settings.webhook_queue_enabled, **webhook_event_queue.stats()}  # 佇列深度與等待時間
+
+
+@app.get("/diagnostics/webhook-dedup")
+def show_webhook_dedup() -> dict:
+    return webhook_event_store.stats()  # 重送事件去重統計
+
+
+@app.get("/diagnostics/db-pool")
+def show_db_pool() -> dict:
+    return pool_stats()  # 連線池設定、使用中連線與等待時間
+
+
+@app.get("/diagnostics/sqlite")
+def show_sqlite() -> dict:
+    return sqlite_stats()  # SQLite 實際生效參數與寫入排隊統計
+
+
+@app.get("/diagnostics/translation-cache")
+def show_translation_cache() -> dict:
+    return translation_cache.stats()  # 翻譯快取命中與淘汰統計
+
+
+@app.get("/diagnostics/line-reply")
+def show_line_reply() -> dict:
+    return line_reply_client.stats()  # LINE 回覆耗時與錯誤統計
+
+
+@app.get("/diagnostics/translation-single-flight")
+def show_translation_single_flight() -> dict:
+    return translation_flights.stats()  # 相同翻譯請求合併統計
+
+
+@app.get("/diagnostics/translation-providers")
+def show_translation_providers() -> dict:
+    return provider_router.stats()  # 各翻譯來源熔斷狀態、錯誤率與耗時
+
+
+@app.get("/diagnostics/translation-usage")
+def show_translation_usage() -> dict:
+    return {
+        **usage_tracker.stats(),
+        "budgets": budget_settings(),
+        "rate_limits": provider_rate_limiter.stats(),
+    }  # 當月字元用量、額度政策與限速統計
+
+
+@app.get("/diagnostics/language-detection")
+def show_language_detection() -> dict:
+    return detection_stats.snapshot()  # 語言偵測與同語言略過統計
+
+
+@app.get("/diagnostics/group-cache")
+def show_group_cache() -> dict:
+    return group_snapshot_cache.stats()  # 群組設定快取統計
+
+
+@app.get("/diagnostics/card-cache")
+def show_card_cache() -> dict:
+    return flex_card_cache.stats()  # Flex 小卡快取統計
+
+
+def _cache_samples() -> list[tuple[dict[str, str], float]]:
+    samples: list[tuple[dict[str, str], float]] = []  # 各快取命中統計
+    for cache_name, stats in (
+        ("translation", translation_cache.stats()),
+        ("group", group_snapshot_cache.stats()),
+        ("card", flex_card_cache.stats()),
+    ):
+        samples.append(({"cache": cache_name, "result": "hit"}, stats["hits"]))  # 命中
+        samples.append(({"cache": cache_name, "result": "miss"}, stats["misses"]))  # 未命中
+    samples.append(({"cache": "single_flight", "result": "hit"}, translation_flights.stats()["coalesced"]))  # 共用進行中請求
+    samples.append(({"cache": "single_flight", "result": "miss"}, translation_flights.stats()["executed"]))  # 實際送出請求
+    return samples  # 回傳樣本
+
+
+registry.callback("fanfan_cache_lookups_total", "快取查詢次數", "counter", _cache_samples)  # 讀取時彙整既有快取統計
+registry.callback(
+    "fanfan_webhook_queue_depth",
+    "背景事件佇列深度",
+    "gauge",
+    lambda: [({}, webhook_event_queue.stats()["depth"])],
+)  # 佇列深度
+registry.callback(
+    "fanfan_db_pool_connections",
+    "資料庫連線池連線數（使用中 / 閒置 / 超額）",
+    "gauge",
+    pool_connection_samples,
+)  # 連線池使用量
+registry.callback(
+    "fanfan_sqlite_write_queue_waiting",
+    "SQLite 排隊等待寫入的連線數",
+    "gauge",
+    lambda: [({}, sqlite_write_queue.waiting())],
+)  # 寫入排隊數
+registry.callback(
+    "fanfan_provider_breaker_open",
+    "翻譯來源是否熔斷（1 為熔斷中）",
+    "gauge",
+    lambda: [
+        ({"provider": name}, 0 if state["state"] == "closed" else 1)
+        for name, state in provider_router.stats()["providers"].items()
+    ],
+)  # 熔斷狀態
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def show_metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")  # Prometheus 文字格式
 
 
 @app.get("/config")
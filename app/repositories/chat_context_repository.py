@@ -0,0 +1,82 @@
+from dataclasses import dataclass  # 匯入資料類別
+
+from sqlalchemy import bindparam, literal, select  # 匯入 SQL 工具
+from sqlalchemy.orm import Session  # 匯入 Session
+from sqlalchemy.sql import Select  # 匯入查詢型別
+
+from app.core.languages import DEFAULT_LANGUAGE_CODE  # 匯入預設語言
+from app.db.models import GroupLanguageSelection, GroupSetting, UserProfile  # 匯入模型
+from app.repositories.group_cache import GroupSnapshot  # 匯入群組快照
+from app.repositories.group_repository import build_group_snapshot, group_snapshot_cache  # 匯入群組快照工具
+from app.repositories.user_repository import UserSnapshot  # 匯入使用者快照
+
+
+@dataclass(frozen=True)
+class ChatContext:
+    user_id: str | None  # 來源使用者 ID
+    group_id: str | None  # 來源群組 ID
+    user: UserSnapshot | None  # 使用者快照（尚未建立時為 None）
+    group: GroupSnapshot | None  # 群組快照（尚未建立時為 None）
+
+    @property
+    def inviter_user_id(self) -> str | None:
+        return self.group.inviter_user_id if self.group else None  # 邀請者代表 ID
+
+    @property
+    def group_language_codes(self) -> list[str]:
+        return list(self.group.language_codes) if self.group else [DEFAULT_LANGUAGE_CODE]  # 群組語言（未建立時為預設語言）
+
+    @property
+    def personal_language_code(self) -> str:
+        return self.user.target_language if self.user else DEFAULT_LANGUAGE_CODE  # 個人語言
+
+
+CHAT_CONTEXT_ANCHOR = "anchor"  # 單列錨點子查詢名稱（查詢計畫檢查用）
+_anchor = select(literal(1).label("anchor")).subquery(CHAT_CONTEXT_ANCHOR)  # 單列錨點，讓使用者與群組各自外部連結
+_CHAT_CONTEXT_QUERY = (
+    select(
+        UserProfile.line_user_id,
+        UserProfile.member_code,
+        UserProfile.target_language.label("user_language"),
+        UserProfile.is_admin,
+        GroupSetting.line_group_id,
+        GroupSetting.inviter_user_id,
+        GroupSetting.target_language.label("group_language"),
+        GroupLanguageSelection.language_code,
+    )
+    .select_from(_anchor)
+    .outerjoin(UserProfile, UserProfile.line_user_id == bindparam("line_user_id"))
+    .outerjoin(GroupSetting, GroupSetting.line_group_id == bindparam("line_group_id"))
+    .outerjoin(GroupLanguageSelection, GroupLanguageSelection.line_group_id == GroupSetting.line_group_id)
+    .order_by(GroupLanguageSelection.id.asc())
+)  # 預先建立的對話情境查詢（每則訊息只需綁定參數）
+
+
+def chat_context_query(line_user_id: str | None, line_group_id: str | None) -> Select:
+    return _CHAT_CONTEXT_QUERY.params(line_user_id=line_user_id, line_group_id=line_group_id)  # 綁定參數後的對話情境查詢
+
+
+def load_chat_context(db: Session, line_user_id: str | None, line_group_id: str | None) -> ChatContext:
+    group = group_snapshot_cache.get(line_group_id) if line_group_id else None  # 群組快取命中時只需查使用者
+    load_group = bool(line_group_id) and group is None  # 是否需要查詢群組
+    if not line_user_id and not load_group:
+        return ChatContext(user_id=line_user_id, group_id=line_group_id, user=None, group=group)  # 不需查詢資料庫
+
+    rows = db.execute(
+        _CHAT_CONTEXT_QUERY,
+        {"line_user_id": line_user_id, "line_group_id": line_group_id if load_group else None},
+    ).all()  # 一次讀取使用者、群組、邀請者與依序排列的群組語言（NULL 參數不會連結到任何列）
+    first = rows[0]  # 使用者與群組欄位在每一列都相同
+    user = None  # 使用者快照
+    if first.line_user_id is not None:
+        user = UserSnapshot(
+            line_user_id=first.line_user_id,
+            member_code=first.member_code,
+            target_language=first.user_language,
+            is_admin=bool(first.is_admin),
+        )  # 建立使用者快照
+    if load_group and first.line_group_id is not None:
+        stored_codes = [row.language_code for row in rows if row.language_code]  # 已存語言列
+        group = build_group_snapshot(line_group_id, first.inviter_user_id, first.group_language, stored_codes)  # 建立群組快照
+        group_snapshot_cache.set(group)  # 寫入群組快取
+    return ChatContext(user_id=line_user_id, group_id=line_group_id, user=user, group=group)  # 回傳不可變快照
@@ -0,0 +1,66 @@
+from sqlalchemy import Sequence, func, select, text, update  # 匯入 SQL 工具
+from sqlalchemy.exc import IntegrityError  # 匯入唯一約束錯誤
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.db.models import IdCounter  # 匯入計數列模型
+
+
+def supports_sequences(db: Session) -> bool:
+    return bool(db.get_bind().dialect.supports_sequences)  # 判斷資料庫是否支援序列
+
+
+def next_sequence_value(db: Session, sequence: Sequence) -> int:
+    return int(db.execute(select(sequence.next_value())).scalar_one())  # 一次往返取得下一個序號
+
+
+def next_sequence_values(db: Session, sequence: Sequence, count: int) -> list[int]:
+    if count <= 1:
+        return [next_sequence_value(db, sequence)] if count == 1 else []  # 單筆沿用一般取號
+    series = func.generate_series(1, count).table_valued("n")  # 取號次數
+    return [int(value) for value in db.execute(select(sequence.next_value()).select_from(series)).scalars()]  # 一次往返取得多個序號
+
+
+def advance_sequence(db: Session, sequence: Sequence, minimum: int) -> None:
+    db.execute(
+        text(f"SELECT setval('{sequence.name}', GREATEST(:minimum, (SELECT last_value FROM {sequence.name})))"),
+        {"minimum": minimum},
+    )  # 讓序列不低於既有最大值（不會倒退）
+
+
+def ensure_counter_at_least(db: Session, name: str, minimum: int) -> None:
+    if db.get(IdCounter, name) is None:
+        try:
+            with db.begin_nested():
+                db.add(IdCounter(name=name, value=minimum))  # 首次建立計數列
+            return
+        except IntegrityError:
+            pass  # 其他 worker 已建立
+    db.execute(update(IdCounter).where(IdCounter.name == name, IdCounter.value < minimum).values(value=minimum))  # 只往上調整
+
+
+def next_counter_value(db: Session, name: str) -> int:
+    statement = update(IdCounter).where(IdCounter.name == name).values(value=IdCounter.value + 1)  # 原子遞增
+    if db.get_bind().dialect.update_returning:
+        return int(db.execute(statement.returning(IdCounter.value)).scalar_one())  # 一次往返取回新值
+    db.execute(statement)  # 遞增（交易內持有寫入鎖）
+    return int(db.execute(select(IdCounter.value).where(IdCounter.name == name)).scalar_one())  # 讀回新值
+
+
+def next_counter_values(db: Session, name: str, count: int) -> list[int]:
+    if count <= 0:
+        return []  # 不需取號
+    statement = update(IdCounter).where(IdCounter.name == name).values(value=IdCounter.value + count)  # 一次保留連續區段
+    if db.get_bind().dialect.update_returning:
+        last = int(db.execute(statement.returning(IdCounter.value)).scalar_one())  # 一次往返取回區段結尾
+    else:
+        db.execute(statement)  # 遞增（交易內持有寫入鎖）
+        last = int(db.execute(select(IdCounter.value).where(IdCounter.name == name)).scalar_one())  # 讀回區段結尾
+    return list(range(last - count + 1, last + 1))  # 回傳區段內所有值
+
+
+def highest_number_suffix(db: Session, column, prefix_length: int) -> int:
+    value = db.execute(
+        select(column).order_by(func.length(column).desc(), column.desc()).limit(1)
+    ).scalar_one_or_none()  # 依長度與字串排序取最大編號
+    suffix = (value or "")[prefix_length:]  # 去除前綴
+    return int(suffix) if suffix.isdigit() else 0  # 解析數字部分
@@ -0,0 +1,61 @@
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from dataclasses import dataclass  # 匯入資料類別
+
+
+@dataclass(frozen=True)
+class GroupSnapshot:
+    line_group_id: str  # 群組 ID
+    inviter_user_id: str | None  # 邀請者代表 ID
+    language_codes: tuple[str, ...]  # 依設定順序的語言代碼
+
+
+class GroupSnapshotCache:
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(0, max_entries)  # 最多快取群組數（0 代表停用）
+        self.ttl_seconds = ttl_seconds  # 存活秒數（多 worker 時的最長不一致時間）
+        self._entries: dict[str, tuple[GroupSnapshot, float]] = {}  # 群組 ID -> (快照, 到期時間)
+        self._lock = threading.Lock()  # 執行緒鎖
+        self.hits = 0  # 命中數
+        self.misses = 0  # 未命中數
+        self.invalidations = 0  # 失效次數
+
+    def get(self, line_group_id: str) -> GroupSnapshot | None:
+        if self.max_entries <= 0:
+            return None  # 停用時一律未命中
+        with self._lock:
+            entry = self._entries.get(line_group_id)  # 讀取快取
+            if entry is None or entry[1] <= time.monotonic():
+                self._entries.pop(line_group_id, None)  # 移除過期資料
+                self.misses += 1  # 未命中
+                return None
+            self.hits += 1  # 命中
+            return entry[0]  # 回傳快照
+
+    def set(self, snapshot: GroupSnapshot) -> None:
+        if self.max_entries <= 0:
+            return  # 停用時不寫入
+        with self._lock:
+            if len(self._entries) >= self.max_entries and snapshot.line_group_id not in self._entries:
+                self._entries.pop(next(iter(self._entries)))  # 淘汰最早寫入的群組
+            self._entries[snapshot.line_group_id] = (snapshot, time.monotonic() + self.ttl_seconds)  # 寫入快照
+
+    def invalidate(self, line_group_id: str) -> None:
+        with self._lock:
+            self._entries.pop(line_group_id, None)  # 移除群組快照
+            self.invalidations += 1  # 累計失效
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()  # 清空快取
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }  # 快取統計
@@ -1,7 +1,23 @@
+from sqlalchemy import insert, or_  # 匯入批次新增與條件組合
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert  # 匯入 Postgres upsert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # 匯入 SQLite upsert
+from sqlalchemy.exc import IntegrityError  # 匯入唯一約束錯誤
 from sqlalchemy.orm import Session  # 匯入 Session
 
 from app.db.models import GroupSetting, GroupLanguageSelection  # 匯入群組模型
+from app.core.config import settings  # 匯入設定
 from app.core.languages import DEFAULT_LANGUAGE_CODE  # 匯入預設語言
+from app.repositories.group_cache import GroupSnapshot, GroupSnapshotCache  # 匯入群組快照快取
+
+
+group_snapshot_cache = GroupSnapshotCache(
+    max_entries=settings.group_cache_max_entries,
+    ttl_seconds=settings.group_cache_ttl_seconds,
+)  # 程序內群組設定快取
+
+
+def invalidate_group_snapshot(line_group_id: str) -> None:
+    group_snapshot_cache.invalidate(line_group_id)  # 群組設定變更時清除快取
 
 
 def get_group(db: Session, line_group_id: str) -> GroupSetting | None:
@@ -12,6 +28,7 @@ def create_group(db: Session, line_group_id: str) -> GroupSetting:
     group = GroupSetting(line_group_id=line_group_id)  # 建立群組設定
     db.add(group)  # 新增
     db.commit()  # 提交
+    invalidate_group_snapshot(line_group_id)  # 清除群組快取
     db.refresh(group)  # 重新讀取
     return group  # 回傳
 
@@ -19,6 +36,7 @@ def create_group(db: Session, line_group_id: str) -> GroupSetting:
 def update_group_language(db: Session, group: GroupSetting, target_language: str) -> GroupSetting:
     group.target_language = target_language  # 更新群組語言
     db.commit()  # 提交
+    invalidate_group_snapshot(group.line_group_id)  # 清除群組快取
     db.refresh(group)  # 重新讀取
     return group  # 回傳
 
@@ -27,6 +45,7 @@ def bind_group_inviter(db: Session, group: GroupSetting, inviter_user_id: str) -
     if not group.inviter_user_id:
         group.inviter_user_id = inviter_user_id  # 首次綁定邀請者代表
         db.commit()  # 提交
+        invalidate_group_snapshot(group.line_group_id)  # 清除群組快取
         db.refresh(group)  # 重新讀取
     return group  # 回傳
 
@@ -34,54 +53,189 @@ def bind_group_inviter(db: Session, group: GroupSetting, inviter_user_id: str) -
 def set_group_inviter(db: Session, group: GroupSetting, inviter_user_id: str) -> GroupSetting:
     group.inviter_user_id = inviter_user_id  # 直接覆寫邀請者代表
     db.commit()  # 提交
+    invalidate_group_snapshot(group.line_group_id)  # 清除群組快取
     db.refresh(group)  # 重新讀取
     return group  # 回傳
 
 
-def get_group_languages(db: Session, line_group_id: str) -> list[str]:
+def _update_group_inviter(db: Session, line_group_id: str, inviter_user_id: str, only_if_unbound: bool) -> bool:
+    query = db.query(GroupSetting).filter(GroupSetting.line_group_id == line_group_id)  # 目標群組
+    if only_if_unbound:
+        query = query.filter(
+            or_(GroupSetting.inviter_user_id.is_(None), GroupSetting.inviter_user_id == inviter_user_id)
+        )  # 只在尚未綁定（或已是本人）時更新
+    if query.update({GroupSetting.inviter_user_id: inviter_user_id}, synchronize_session=False):
+        return True  # 單一 UPDATE 完成
+    if get_group(db, line_group_id) is not None:
+        return False  # 群組存在但已被他人綁定
+    db.add(GroupSetting(line_group_id=line_group_id, inviter_user_id=inviter_user_id))  # 群組尚未建立時直接帶入邀請者
+    try:
+        db.flush()  # 寫入新群組
+    except IntegrityError:
+        db.rollback()  # 其他請求同時建立了群組
+        return _update_group_inviter(db, line_group_id, inviter_user_id, only_if_unbound)  # 改以 UPDATE 重試
+    return True  # 建立完成
+
+
+def try_bind_group_inviter(db: Session, line_group_id: str, inviter_user_id: str) -> bool:
+    bound = _update_group_inviter(db, line_group_id, inviter_user_id, only_if_unbound=True)  # 條件式綁定（不先讀取群組）
+    db.commit()  # 提交
+    if bound:
+        invalidate_group_snapshot(line_group_id)  # 清除群組快取
+    return bound  # 回傳是否綁定成功
+
+
+def replace_group_inviter(db: Session, line_group_id: str, inviter_user_id: str) -> None:
+    _update_group_inviter(db, line_group_id, inviter_user_id, only_if_unbound=False)  # 直接覆寫（不先讀取群組）
+    db.commit()  # 提交
+    invalidate_group_snapshot(line_group_id)  # 清除群組快取
+
+
+def _load_group_with_languages(db: Session, line_group_id: str) -> tuple[GroupSetting | None, list[str]]:
     rows = (
-        db.query(GroupLanguageSelection)
-        .filter(GroupLanguageSelection.line_group_id == line_group_id)
+        db.query(GroupSetting, GroupLanguageSelection.language_code)
+        .outerjoin(GroupLanguageSelection, GroupLanguageSelection.line_group_id == GroupSetting.line_group_id)
+        .filter(GroupSetting.line_group_id == line_group_id)
         .order_by(GroupLanguageSelection.id.asc())
         .all()
-    )  # 讀取群組多語設定
-    if rows:
-        return [row.language_code for row in rows]  # 回傳多語清單
+    )  # 一次讀取群組與多語設定
+    if not rows:
+        return None, []  # 群組尚未建立
+    return rows[0][0], [code for _, code in rows if code]  # 回傳群組與已存語言列
+
 
-    group = get_group(db, line_group_id)  # 退回舊欄位
-    if group and group.target_language:
-        return [group.target_language]  # 沒有多語資料時沿用舊欄位
+def _effective_language_codes(group: GroupSetting | None, stored_codes: list[str]) -> list[str]:
+    return _resolve_language_codes(group.target_language if group else None, stored_codes)  # 套用舊欄位回退
+
+
+def _resolve_language_codes(legacy_language: str | None, stored_codes: list[str]) -> list[str]:
+    if stored_codes:
+        return list(stored_codes)  # 回傳多語清單
+    if legacy_language:
+        return [legacy_language]  # 沒有多語資料時沿用舊欄位
     return [DEFAULT_LANGUAGE_CODE]  # 最終回退預設語言
 
 
-def set_group_languages(db: Session, line_group_id: str, language_codes: list[str]) -> list[str]:
-    unique_codes: list[str] = []  # 去重後語言
-    for code in language_codes:
-        if code not in unique_codes:
-            unique_codes.append(code)  # 保留原順序去重
+def build_group_snapshot(
+    line_group_id: str,
+    inviter_user_id: str | None,
+    legacy_language: str | None,
+    stored_codes: list[str],
+) -> GroupSnapshot:
+    return GroupSnapshot(
+        line_group_id=line_group_id,
+        inviter_user_id=inviter_user_id,
+        language_codes=tuple(_resolve_language_codes(legacy_language, stored_codes)),
+    )  # 由查詢結果建立群組快照
 
-    final_codes = unique_codes if unique_codes else [DEFAULT_LANGUAGE_CODE]  # 至少保留一個語言
-    db.query(GroupLanguageSelection).filter(GroupLanguageSelection.line_group_id == line_group_id).delete()  # 清掉舊多語
-    for code in final_codes:
-        db.add(GroupLanguageSelection(line_group_id=line_group_id, language_code=code))  # 逐筆寫入
 
-    group = get_group(db, line_group_id) or create_group(db, line_group_id)  # 取得群組資料
-    group.target_language = final_codes[0]  # 維持舊欄位相容
-    db.commit()  # 提交變更
+def get_group_languages(db: Session, line_group_id: str) -> list[str]:
+    group, stored_codes = _load_group_with_languages(db, line_group_id)  # 讀取群組多語設定
+    return _effective_language_codes(group, stored_codes)  # 套用舊欄位回退
+
+
+def get_group_snapshot(db: Session, line_group_id: str) -> GroupSnapshot | None:
+    cached = group_snapshot_cache.get(line_group_id)  # 先查程序內快取
+    if cached:
+        return cached  # 命中時不需查詢資料庫
+
+    group, stored_codes = _load_group_with_languages(db, line_group_id)  # 讀取群組與多語設定
+    if not group:
+        return None  # 群組尚未建立
+    snapshot = build_group_snapshot(line_group_id, group.inviter_user_id, group.target_language, stored_codes)  # 建立群組快照
+    group_snapshot_cache.set(snapshot)  # 寫入快取
+    return snapshot  # 回傳快照
+
+
+def _insert_language_rows(db: Session, line_group_id: str, language_codes: list[str]) -> None:
+    if not language_codes:
+        return  # 無新增語言
+    rows = [{"line_group_id": line_group_id, "language_code": code} for code in language_codes]  # 批次資料
+    dialect_name = db.get_bind().dialect.name  # 資料庫種類
+    if dialect_name == "postgresql":
+        statement = postgresql_insert(GroupLanguageSelection).on_conflict_do_nothing(
+            index_elements=["line_group_id", "language_code"]
+        )  # Postgres 重複時略過
+    elif dialect_name == "sqlite":
+        statement = sqlite_insert(GroupLanguageSelection).on_conflict_do_nothing(
+            index_elements=["line_group_id", "language_code"]
+        )  # SQLite 重複時略過
+    else:
+        statement = insert(GroupLanguageSelection)  # 其他資料庫一般批次寫入
+    db.execute(statement, rows)  # 一次寫入所有新增語言
+
+
+def _apply_group_languages(
+    db: Session,
+    line_group_id: str,
+    group: GroupSetting | None,
+    stored_codes: list[str],
+    language_codes: list[str],
+) -> list[str]:
+    final_codes: list[str] = []  # 去重後語言
+    for code in language_codes:
+        if code not in final_codes:
+            final_codes.append(code)  # 保留原順序去重
+    if not final_codes:
+        final_codes = [DEFAULT_LANGUAGE_CODE]  # 至少保留一個語言
+
+    if group is None:
+        group = GroupSetting(line_group_id=line_group_id, target_language=final_codes[0])  # 同一交易內建立群組
+        db.add(group)  # 新增
+        db.flush()  # 先寫入群組以滿足外鍵
+    elif group.target_language != final_codes[0]:
+        group.target_language = final_codes[0]  # 維持舊欄位相容
+
+    kept_codes = [code for code in stored_codes if code in final_codes]  # 保留的既有語言
+    added_codes = [code for code in final_codes if code not in stored_codes]  # 需新增的語言
+    removed_codes = [code for code in stored_codes if code not in final_codes]  # 需刪除的語言
+    if kept_codes + added_codes == final_codes:
+        if removed_codes:
+            db.query(GroupLanguageSelection).filter(
+                GroupLanguageSelection.line_group_id == line_group_id,
+                GroupLanguageSelection.language_code.in_(removed_codes),
+            ).delete(synchronize_session=False)  # 批次刪除取消的語言
+        _insert_language_rows(db, line_group_id, added_codes)  # 批次新增語言
+    else:
+        db.query(GroupLanguageSelection).filter(
+            GroupLanguageSelection.line_group_id == line_group_id
+        ).delete(synchronize_session=False)  # 順序改變時整批重寫
+        _insert_language_rows(db, line_group_id, final_codes)  # 依新順序寫入
+
+    if db.new or db.dirty or removed_codes or added_codes or kept_codes != final_codes:
+        db.commit()  # 單一交易提交
+        invalidate_group_snapshot(line_group_id)  # 清除群組快取
     return final_codes  # 回傳更新後清單
 
 
+def set_group_languages(db: Session, line_group_id: str, language_codes: list[str]) -> list[str]:
+    group, stored_codes = _load_group_with_languages(db, line_group_id)  # 讀取目前設定
+    return _apply_group_languages(db, line_group_id, group, stored_codes, language_codes)  # 套用差異
+
+
 def add_group_language(db: Session, line_group_id: str, language_code: str) -> list[str]:
-    current = get_group_languages(db, line_group_id)  # 讀取目前設定
+    group, stored_codes = _load_group_with_languages(db, line_group_id)  # 讀取目前設定
+    current = _effective_language_codes(group, stored_codes)  # 目前生效語言
     if language_code not in current:
         current.append(language_code)  # 新增語言
-    return set_group_languages(db, line_group_id, current)  # 寫回設定
+    return _apply_group_languages(db, line_group_id, group, stored_codes, current)  # 套用差異
 
 
 def remove_group_language(db: Session, line_group_id: str, language_code: str) -> list[str]:
-    current = get_group_languages(db, line_group_id)  # 讀取目前設定
+    group, stored_codes = _load_group_with_languages(db, line_group_id)  # 讀取目前設定
+    current = _effective_language_codes(group, stored_codes)  # 目前生效語言
     next_codes = [code for code in current if code != language_code]  # 移除指定語言
-    return set_group_languages(db, line_group_id, next_codes)  # 寫回設定
+    return _apply_group_languages(db, line_group_id, group, stored_codes, next_codes)  # 套用差異
+
+
+def toggle_group_language(db: Session, line_group_id: str, language_code: str) -> list[str]:
+    group, stored_codes = _load_group_with_languages(db, line_group_id)  # 只讀取一次目前設定
+    current = _effective_language_codes(group, stored_codes)  # 目前生效語言
+    if language_code in current:
+        next_codes = [code for code in current if code != language_code]  # 已存在則移除
+    else:
+        next_codes = current + [language_code]  # 不存在則加入
+    return _apply_group_languages(db, line_group_id, group, stored_codes, next_codes)  # 套用差異
 
 
 def reset_group_languages(db: Session, line_group_id: str) -> list[str]:
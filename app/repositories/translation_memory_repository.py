@@ -0,0 +1,103 @@
+from datetime import datetime  # 匯入時間型別
+
+from sqlalchemy import func  # 匯入 SQL 函式
+from sqlalchemy.exc import IntegrityError  # 匯入唯一約束錯誤
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.db.models import TranslationMemory  # 匯入翻譯記憶模型
+
+
+def get_translation_memory(db: Session, text_hash: str, target_language: str) -> TranslationMemory | None:
+    return (
+        db.query(TranslationMemory)
+        .filter(TranslationMemory.text_hash == text_hash, TranslationMemory.target_language == target_language)
+        .one_or_none()
+    )  # 依原文雜湊與目標語言查詢
+
+
+def save_translation_memory(
+    db: Session,
+    text_hash: str,
+    target_language: str,
+    provider: str,
+    source_text: str,
+    translated_text: str,
+) -> None:
+    entry = get_translation_memory(db, text_hash, target_language)  # 查詢既有資料
+    now = datetime.utcnow()  # 目前時間
+    if entry:
+        entry.provider = provider  # 更新翻譯來源
+        entry.translated_text = translated_text  # 更新譯文
+        entry.last_used_at = now  # 更新使用時間
+    else:
+        db.add(
+            TranslationMemory(
+                text_hash=text_hash,
+                target_language=target_language,
+                provider=provider,
+                source_text=source_text,
+                translated_text=translated_text,
+                created_at=now,
+                last_used_at=now,
+            )
+        )  # 新增翻譯記憶
+    try:
+        db.commit()  # 提交
+    except IntegrityError:
+        db.rollback()  # 其他 worker 已寫入相同 key
+
+
+def touch_translation_memory(db: Session, text_hash: str, target_language: str) -> None:
+    db.query(TranslationMemory).filter(
+        TranslationMemory.text_hash == text_hash,
+        TranslationMemory.target_language == target_language,
+    ).update(
+        {
+            TranslationMemory.hit_count: TranslationMemory.hit_count + 1,
+            TranslationMemory.last_used_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )  # 累計命中並更新使用時間
+    db.commit()  # 提交
+
+
+def count_translation_memory(db: Session) -> int:
+    return db.query(TranslationMemory).count()  # 計算翻譯記憶筆數
+
+
+def translation_memory_size(db: Session) -> int:
+    total = db.query(
+        func.coalesce(func.sum(func.length(TranslationMemory.source_text) + func.length(TranslationMemory.translated_text)), 0)
+    ).scalar()  # 加總原文與譯文長度
+    return int(total or 0)  # 回傳字元數
+
+
+def list_top_translation_memory(db: Session, limit: int) -> list[TranslationMemory]:
+    return (
+        db.query(TranslationMemory)
+        .order_by(TranslationMemory.hit_count.desc(), TranslationMemory.id.asc())
+        .limit(limit)
+        .all()
+    )  # 依命中次數列出熱門翻譯
+
+
+def prune_translation_memory(db: Session, max_entries: int) -> int:
+    stale_ids = [
+        row_id
+        for (row_id,) in db.query(TranslationMemory.id)
+        .order_by(TranslationMemory.last_used_at.desc(), TranslationMemory.id.desc())
+        .offset(max(0, max_entries))
+        .all()
+    ]  # 超過上限的最久未使用資料
+    deleted = 0  # 已刪除筆數
+    for start in range(0, len(stale_ids), 500):
+        chunk = stale_ids[start : start + 500]  # 分批刪除避免參數過多
+        deleted += db.query(TranslationMemory).filter(TranslationMemory.id.in_(chunk)).delete(synchronize_session=False)  # 刪除舊資料
+    db.commit()  # 提交
+    return deleted  # 回傳刪除筆數
+
+
+def purge_translation_memory(db: Session) -> int:
+    deleted = db.query(TranslationMemory).delete(synchronize_session=False)  # 清空翻譯記憶
+    db.commit()  # 提交
+    return deleted  # 回傳刪除筆數
@@ -0,0 +1,57 @@
+from datetime import datetime  # 匯入時間型別
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert  # 匯入 Postgres upsert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # 匯入 SQLite upsert
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.db.models import TranslationUsage  # 匯入翻譯用量模型
+
+
+def add_translation_usage(db: Session, usage: dict[tuple[str, str, str], tuple[int, int]]) -> None:
+    if not usage:
+        return  # 無新增用量
+    now = datetime.utcnow()  # 目前時間
+    rows = [
+        {"scope": scope, "subject": subject, "period": period, "characters": characters, "requests": requests, "updated_at": now}
+        for (period, scope, subject), (characters, requests) in usage.items()
+    ]  # 批次資料（每筆依記錄時的月份寫入，跨月也不會算到新月份）
+    dialect_name = db.get_bind().dialect.name  # 資料庫種類
+    if dialect_name in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert  # 依資料庫選擇 upsert
+        statement = insert(TranslationUsage)  # 新增語句
+        statement = statement.on_conflict_do_update(
+            index_elements=["scope", "subject", "period"],
+            set_={
+                "characters": TranslationUsage.characters + statement.excluded.characters,
+                "requests": TranslationUsage.requests + statement.excluded.requests,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )  # 已存在時累加
+        db.execute(statement, rows)  # 一次寫入
+    else:
+        for row in rows:
+            entry = (
+                db.query(TranslationUsage)
+                .filter(
+                    TranslationUsage.scope == row["scope"],
+                    TranslationUsage.subject == row["subject"],
+                    TranslationUsage.period == row["period"],
+                )
+                .one_or_none()
+            )  # 查詢既有資料
+            if entry:
+                entry.characters += row["characters"]  # 累加字元數
+                entry.requests += row["requests"]  # 累加請求數
+                entry.updated_at = now  # 更新時間
+            else:
+                db.add(TranslationUsage(**row))  # 新增
+    db.commit()  # 單一交易提交
+
+
+def load_translation_usage(db: Session, period: str) -> dict[tuple[str, str], int]:
+    rows = (
+        db.query(TranslationUsage.scope, TranslationUsage.subject, TranslationUsage.characters)
+        .filter(TranslationUsage.period == period)
+        .all()
+    )  # 讀取當月用量
+    return {(scope, subject): characters for scope, subject, characters in rows}  # 回傳 (類型, 對象) → 字元數
@@ -1,8 +1,40 @@
+from dataclasses import dataclass  # 匯入資料類別
+from datetime import datetime  # 匯入時間型別
+
+from sqlalchemy import select  # 匯入查詢建構
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert  # 匯入 Postgres upsert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # 匯入 SQLite upsert
+from sqlalchemy.exc import IntegrityError  # 匯入唯一約束錯誤
 from sqlalchemy.orm import Session  # 匯入 Session
 
 from app.db.models import UserProfile  # 匯入使用者模型
 
 
+@dataclass(frozen=True)
+class UserSnapshot:
+    line_user_id: str  # LINE ID
+    member_code: str  # FAN 編號
+    target_language: str  # 個人翻譯語言
+    is_admin: bool  # 管理員旗標
+
+
+_SNAPSHOT_COLUMNS = (
+    UserProfile.line_user_id,
+    UserProfile.member_code,
+    UserProfile.target_language,
+    UserProfile.is_admin,
+)  # 建立使用者快照所需欄位
+
+
+def _snapshot_from_row(row) -> UserSnapshot:
+    return UserSnapshot(
+        line_user_id=row.line_user_id,
+        member_code=row.member_code,
+        target_language=row.target_language,
+        is_admin=bool(row.is_admin),
+    )  # 由查詢結果建立使用者快照
+
+
 def get_user_by_line_id(db: Session, line_user_id: str) -> UserProfile | None:
     return db.query(UserProfile).filter(UserProfile.line_user_id == line_user_id).one_or_none()  # 查詢使用者
 
@@ -15,6 +47,55 @@ def list_admin_users(db: Session) -> list[UserProfile]:
     return db.query(UserProfile).filter(UserProfile.is_admin.is_(True)).order_by(UserProfile.id.asc()).all()  # 查詢所有管理員
 
 
+def get_user_snapshots(db: Session, line_user_ids: list[str]) -> dict[str, UserSnapshot]:
+    if not line_user_ids:
+        return {}  # 無查詢對象
+    rows = db.execute(select(*_SNAPSHOT_COLUMNS).where(UserProfile.line_user_id.in_(line_user_ids))).all()  # 一次查詢多位使用者
+    return {row.line_user_id: _snapshot_from_row(row) for row in rows}  # LINE ID -> 使用者快照
+
+
+def insert_users_if_missing(db: Session, users: list[tuple[str, str]], target_language: str) -> dict[str, UserSnapshot]:
+    if not users:
+        return {}  # 無新增對象
+    now = datetime.utcnow()  # 建立時間
+    rows = [
+        {
+            "line_user_id": line_user_id,
+            "member_code": member_code,
+            "target_language": target_language,
+            "is_admin": False,
+            "created_at": now,
+        }
+        for line_user_id, member_code in users
+    ]  # 批次資料
+    dialect_name = db.get_bind().dialect.name  # 資料庫種類
+    if dialect_name in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert  # 依資料庫選擇 upsert
+        statement = (
+            insert(UserProfile)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["line_user_id"])
+            .returning(*_SNAPSHOT_COLUMNS)
+        )  # 已存在就略過，並直接取回新增的資料（不需 refresh）
+        inserted = {row.line_user_id: _snapshot_from_row(row) for row in db.execute(statement).all()}  # 實際新增的使用者
+    else:
+        inserted = {}  # 其他資料庫逐筆嘗試新增
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.add(UserProfile(**row))  # 新增
+                inserted[row["line_user_id"]] = UserSnapshot(
+                    line_user_id=row["line_user_id"],
+                    member_code=row["member_code"],
+                    target_language=target_language,
+                    is_admin=False,
+                )  # 以寫入值建立快照
+            except IntegrityError:
+                pass  # 其他 worker 已建立
+    db.commit()  # 單一交易提交
+    return inserted  # 回傳新增的使用者（同時建立而落敗的不在其中）
+
+
 def count_users(db: Session) -> int:
     return db.query(UserProfile).count()  # 計算使用者數量
 
@@ -34,6 +115,14 @@ def update_user_language(db: Session, user: UserProfile, target_language: str) -
     return user  # 回傳更新後資料
 
 
+def set_user_language(db: Session, line_user_id: str, target_language: str) -> None:
+    db.query(UserProfile).filter(UserProfile.line_user_id == line_user_id).update(
+        {UserProfile.target_language: target_language},
+        synchronize_session=False,
+    )  # 直接更新語言（不需先載入使用者）
+    db.commit()  # 提交
+
+
 def update_user_admin_flag(db: Session, user: UserProfile, is_admin: bool) -> UserProfile:
     user.is_admin = is_admin  # 更新管理員旗標
     db.commit()  # 提交
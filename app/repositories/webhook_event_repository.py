@@ -0,0 +1,52 @@
+from datetime import datetime  # 匯入時間型別
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert  # 匯入 Postgres upsert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert  # 匯入 SQLite upsert
+from sqlalchemy.exc import IntegrityError  # 匯入唯一約束錯誤
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.db.models import ProcessedWebhookEvent  # 匯入已處理事件模型
+
+
+def claim_webhook_event(db: Session, event_id: str, expires_at: datetime, now: datetime) -> bool:
+    dialect_name = db.get_bind().dialect.name  # 資料庫種類
+    if dialect_name in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert  # 依資料庫選擇 upsert
+        statement = insert(ProcessedWebhookEvent).values(event_id=event_id, expires_at=expires_at, created_at=now)  # 新增語句
+        statement = statement.on_conflict_do_update(
+            index_elements=["event_id"],
+            set_={"expires_at": statement.excluded.expires_at, "created_at": statement.excluded.created_at},
+            where=ProcessedWebhookEvent.expires_at <= now,
+        )  # 只接手已過期的舊紀錄
+        claimed = db.execute(statement).rowcount == 1  # 新增或接手成功才算取得
+        db.commit()  # 提交
+        return claimed  # 回傳是否取得
+    entry = db.query(ProcessedWebhookEvent).filter(ProcessedWebhookEvent.event_id == event_id).one_or_none()  # 查詢既有紀錄
+    if entry is not None and entry.expires_at > now:
+        return False  # 仍在有效期內
+    if entry is not None:
+        entry.expires_at = expires_at  # 接手過期紀錄
+        entry.created_at = now  # 更新建立時間
+    else:
+        db.add(ProcessedWebhookEvent(event_id=event_id, expires_at=expires_at, created_at=now))  # 新增紀錄
+    try:
+        db.commit()  # 提交
+    except IntegrityError:
+        db.rollback()  # 其他 worker 已取得相同事件
+        return False
+    return True  # 取得成功
+
+
+def release_webhook_event(db: Session, event_id: str) -> None:
+    db.query(ProcessedWebhookEvent).filter(ProcessedWebhookEvent.event_id == event_id).delete(synchronize_session=False)  # 刪除紀錄
+    db.commit()  # 提交
+
+
+def prune_webhook_events(db: Session, now: datetime) -> int:
+    removed = (
+        db.query(ProcessedWebhookEvent)
+        .filter(ProcessedWebhookEvent.expires_at <= now)
+        .delete(synchronize_session=False)
+    )  # 刪除過期紀錄
+    db.commit()  # 提交
+    return removed  # 回傳刪除筆數
@@ -0,0 +1,65 @@
+import importlib.util  # 匯入套件偵測工具
+
+import httpx  # 匯入 asyncio HTTP 客戶端
+import requests  # 匯入 HTTP 請求工具
+from requests.adapters import HTTPAdapter  # 匯入連線池設定
+
+from app.core.config import settings  # 匯入設定
+from app.core.deadline import bounded_timeout  # 匯入期限換算工具
+
+
+def provider_timeout(deadline: float | None = None) -> tuple[float, float]:
+    return (
+        bounded_timeout(settings.provider_connect_timeout, deadline),
+        bounded_timeout(settings.provider_read_timeout, deadline),
+    )  # (連線逾時, 讀取逾時)，不超過事件剩餘時間
+
+
+def async_provider_timeout(deadline: float | None = None) -> httpx.Timeout:
+    connect_timeout, read_timeout = provider_timeout(deadline)  # 依期限換算逾時
+    return httpx.Timeout(read_timeout, connect=connect_timeout)  # asyncio 客戶端逾時設定
+
+
+def build_provider_session() -> requests.Session:
+    session = requests.Session()  # 建立 keep-alive Session
+    adapter = HTTPAdapter(
+        pool_connections=settings.provider_pool_connections,
+        pool_maxsize=settings.provider_pool_maxsize,
+        max_retries=0,
+    )  # 設定連線池大小（重試交給上層備援處理）
+    session.mount("https://", adapter)  # HTTPS 使用連線池
+    session.mount("http://", adapter)  # HTTP 使用連線池
+    return session  # 回傳 Session
+
+
+def _http2_enabled() -> bool:
+    return settings.provider_http2 and importlib.util.find_spec("h2") is not None  # 需安裝 h2 才能啟用 HTTP/2
+
+
+def build_async_provider_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.provider_pool_maxsize,
+            max_keepalive_connections=settings.provider_pool_maxsize,
+        ),
+        timeout=async_provider_timeout(),
+    )  # 建立 asyncio 共用連線池
+
+
+provider_session = build_provider_session()  # DeepL 與 Google 共用同步連線池
+_async_client: httpx.AsyncClient | None = None  # asyncio 連線池（首次使用時建立）
+
+
+def get_async_provider_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = build_async_provider_client()  # 延遲建立以綁定目前事件迴圈
+    return _async_client  # 回傳共用 asyncio 客戶端
+
+
+async def close_async_provider_client() -> None:
+    global _async_client
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()  # 關閉連線池
+    _async_client = None  # 清除參照
@@ -1,12 +1,69 @@
+import threading  # 匯入執行緒工具
+
+from sqlalchemy.engine import Engine  # 匯入引擎型別
 from sqlalchemy.orm import Session  # 匯入 Session
 
-from app.repositories.user_repository import count_users, get_user_by_member_code  # 匯入資料操作
+from app.db.models import UserProfile, member_code_sequence  # 匯入模型與編號序列
+from app.repositories.counter_repository import (
+    advance_sequence,
+    ensure_counter_at_least,
+    highest_number_suffix,
+    next_counter_value,
+    next_counter_values,
+    next_sequence_value,
+    next_sequence_values,
+    supports_sequences,
+)  # 匯入計數器資料操作
+
+
+MEMBER_CODE_PREFIX = "FAN"  # 編號前綴
+MEMBER_CODE_COUNTER = "member_code"  # 不支援序列時使用的計數列名稱
+
+_seed_lock = threading.Lock()  # 初始化計數器用鎖
+_seeded_binds: set[tuple] = set()  # 已初始化的資料庫
+
+
+def format_member_code(number: int) -> str:
+    return f"{MEMBER_CODE_PREFIX}{number:06d}"  # 產生 FAN000001 格式
+
+
+def _database_key(bind: Engine) -> tuple:
+    url = bind.url  # 連線 URL
+    return (url.get_backend_name(), url.host, url.port, url.database)  # 同一資料庫的同步與 asyncio 引擎共用初始化狀態
+
+
+def seed_member_code_counter(bind: Engine) -> None:
+    bind_key = _database_key(bind)  # 以資料庫區分
+    if bind_key in _seeded_binds:
+        return  # 本程序已初始化
+    with _seed_lock:
+        if bind_key in _seeded_binds:
+            return  # 其他執行緒已初始化
+        with Session(bind=bind, autoflush=False) as seed_db, seed_db.begin():
+            highest = highest_number_suffix(seed_db, UserProfile.member_code, len(MEMBER_CODE_PREFIX))  # 既有最大編號（全表掃描，每個程序啟動時做一次）
+            if supports_sequences(seed_db):
+                if highest > 0:
+                    advance_sequence(seed_db, member_code_sequence, highest)  # 序列接續既有編號
+            else:
+                ensure_counter_at_least(seed_db, MEMBER_CODE_COUNTER, highest)  # 計數列接續既有編號
+        _seeded_binds.add(bind_key)  # 獨立連線已提交，標記完成
+
+
+def _seed_member_code_counter(db: Session) -> None:
+    seed_member_code_counter(db.get_bind())  # 啟動時未初始化才補做（獨立連線提交，不提交呼叫端交易；SQLite 呼叫端不可已有未提交寫入）
 
 
 def generate_member_code(db: Session) -> str:
-    base_number = count_users(db) + 1  # 從目前總數往後編號
-    while True:
-        code = f"FAN{base_number:06d}"  # 產生 FAN000001 格式
-        if not get_user_by_member_code(db, code):
-            return code  # 找到未使用編號就回傳
-        base_number += 1  # 若碰撞則遞增
+    _seed_member_code_counter(db)  # 每個程序僅首次需要對齊既有資料
+    if supports_sequences(db):
+        return format_member_code(next_sequence_value(db, member_code_sequence))  # Postgres 序列一次往返
+    return format_member_code(next_counter_value(db, MEMBER_CODE_COUNTER))  # SQLite 計數列原子遞增
+
+
+def generate_member_codes(db: Session, count: int) -> list[str]:
+    _seed_member_code_counter(db)  # 每個程序僅首次需要對齊既有資料
+    if supports_sequences(db):
+        numbers = next_sequence_values(db, member_code_sequence, count)  # Postgres 序列一次取多個
+    else:
+        numbers = next_counter_values(db, MEMBER_CODE_COUNTER, count)  # SQLite 計數列一次保留區段
+    return [format_member_code(number) for number in numbers]  # 批次產生編號
@@ -0,0 +1,132 @@
+import threading  # 匯入執行緒工具
+import unicodedata  # 匯入 Unicode 工具
+
+
+SCRIPT_RANGES = (
+    ("thai", 0x0E00, 0x0E7F),
+    ("myanmar", 0x1000, 0x109F),
+    ("myanmar", 0xA9E0, 0xA9FF),
+    ("myanmar", 0xAA60, 0xAA7F),
+    ("hangul", 0x1100, 0x11FF),
+    ("hangul", 0x3130, 0x318F),
+    ("hangul", 0xAC00, 0xD7AF),
+    ("kana", 0x3040, 0x30FF),
+    ("kana", 0x31F0, 0x31FF),
+    ("kana", 0xFF66, 0xFF9D),
+    ("han", 0x3400, 0x4DBF),
+    ("han", 0x4E00, 0x9FFF),
+    ("han", 0xF900, 0xFAFF),
+    ("cyrillic", 0x0400, 0x04FF),
+    ("latin", 0x0041, 0x005A),
+    ("latin", 0x0061, 0x007A),
+    ("latin", 0x00C0, 0x024F),
+    ("latin", 0x1E00, 0x1EFF),
+)  # 文字區段對照
+
+SCRIPT_LANGUAGE = {
+    "thai": "th",
+    "myanmar": "my",
+    "hangul": "ko",
+    "kana": "ja",
+    "cyrillic": "ru",
+}  # 可直接由文字判斷的語言
+
+TRADITIONAL_CHARS = "這們個來說時會為國對沒過還與發見讓麼樣嗎請謝應該問題現經東車書長門開關間買賣銀電話號碼學習愛歡聽讀寫錢飯機場點鐘頭腦網線紅綠藍黃漢語詞認識記難幫邊遠進運動勞務辦級給結約紙總統覺親視觀業產員華專區醫藥療體參隊陽陰雲氣風飛馬魚鳥雞鴨龍實際寶單雙當歲歷壓廣廠慶戰態憶戶擔據擇換掃揮數斷條極樂標樓權橋歸殘況測濟準滿漲潔無燈熱爺牆狀獎獨環畫盡監盤確禮種稱穩窮簡籃糧紀純細終組綜維緊練編縣績繼續罰義職聯聲腳臉興舊藝節範葉蘭處術衛補裝製複覽規計訂討訓設許診試詢誠誤課調談論講證變豐負財貨質費資賓購賽贊趕跡躍軍軟較輕輸轉農連達違選遲郵鄉釋針鈔鋼錄錯鍋鎮鏡鐵閉閱階隨險離雜靈響頁頂項順須預領頻顏顧顯飲館驗驚鬧麥黨齊齒圖團園圓塊壞夢奪奮婦媽孫寧尋導層屬島帶師幣幾庫張彈從憂懷擊擁擴擺敵於楊樹橫檢歐殺減湯溫滅煙煩營爭爾猶獲畢異眾筆簽絕絲緣縮繞繩羅聖聞膽舉蓋蘋蟲觸訊詩誰譯護貓貴貿賀賴贈軌輛輪辭鍵鎖閃閣陣陳陸雖霧靜韓顆類駕騎騙鹽麗齡"  # 常見繁體字
+SIMPLIFIED_CHARS = "这们个来说时会为国对没过还与发见让么样吗请谢应该问题现经东车书长门开关间买卖银电话号码学习爱欢听读写钱饭机场点钟头脑网线红绿蓝黄汉语词认识记难帮边远进运动劳务办级给结约纸总统觉亲视观业产员华专区医药疗体参队阳阴云气风飞马鱼鸟鸡鸭龙实际宝单双当岁历压广厂庆战态忆户担据择换扫挥数断条极乐标楼权桥归残况测济准满涨洁无灯热爷墙状奖独环画尽监盘确礼种称稳穷简篮粮纪纯细终组综维紧练编县绩继续罚义职联声脚脸兴旧艺节范叶兰处术卫补装制复览规计订讨训设许诊试询诚误课调谈论讲证变丰负财货质费资宾购赛赞赶迹跃军软较轻输转农连达违选迟邮乡释针钞钢录错锅镇镜铁闭阅阶随险离杂灵响页顶项顺须预领频颜顾显饮馆验惊闹麦党齐齿图团园圆块坏梦夺奋妇妈孙宁寻导层属岛带师币几库张弹从忧怀击拥扩摆敌于杨树横检欧杀减汤温灭烟烦营争尔犹获毕异众笔签绝丝缘缩绕绳罗圣闻胆举盖苹虫触讯诗谁译护猫贵贸贺赖赠轨辆轮辞键锁闪阁阵陈陆虽雾静韩颗类驾骑骗盐丽龄"  # 與上方逐字對應的簡體字
+TRADITIONAL_ONLY_CHARS = set(TRADITIONAL_CHARS) - set(SIMPLIFIED_CHARS)  # 出現時才視為繁中的字
+SIMPLIFIED_ONLY_CHARS = set(SIMPLIFIED_CHARS) - set(TRADITIONAL_CHARS)  # 出現時需轉為繁中的字
+JAPANESE_ONLY_CHARS = set("駅円気広図読売県芸伝転発団検険験実沢沖価払戦単労営桜渋塩鉄乗剤帰歳斉様")  # 日文新字體（不是繁中）
+VIETNAMESE_CHARS = set("ăâđêôơưĂÂĐÊÔƠƯ")  # 越南文特有字母
+ENGLISH_WORDS = {
+    "the", "is", "are", "was", "you", "i", "to", "and", "of", "it", "this", "that", "what", "where", "when",
+    "how", "why", "ok", "okay", "thanks", "thank", "hello", "hi", "yes", "no", "please", "good", "morning",
+    "night", "we", "they", "he", "she", "my", "your", "have", "has", "will", "can", "do", "not", "for", "with",
+}  # 英文常用字
+INDONESIAN_WORDS = {
+    "yang", "dan", "tidak", "saya", "apa", "ini", "itu", "ada", "terima", "kasih", "kamu", "aku", "sudah",
+    "belum", "dengan", "untuk", "di", "ke", "dari", "bisa", "mau", "tolong", "selamat", "pagi", "malam",
+    "siang", "bagus", "kami", "kita", "mereka", "juga", "sekarang", "besok", "nanti", "iya", "ya",
+}  # 印尼文常用字
+
+MIN_DOMINANT_RATIO = 0.6  # 主要文字比例門檻
+
+
+class DetectionStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()  # 統計用鎖
+        self.detected: dict[str, int] = {}  # 各語言偵測次數
+        self.undetermined = 0  # 無法判斷次數
+        self.skipped = 0  # 同語言略過翻譯次數
+
+    def record_detection(self, language_code: str | None) -> None:
+        with self._lock:
+            if language_code is None:
+                self.undetermined += 1  # 無法判斷
+            else:
+                self.detected[language_code] = self.detected.get(language_code, 0) + 1  # 累計語言
+
+    def record_skip(self) -> None:
+        with self._lock:
+            self.skipped += 1  # 累計略過次數
+
+    def snapshot(self) -> dict[str, int | dict[str, int]]:
+        with self._lock:
+            return {
+                "detected": dict(self.detected),
+                "undetermined": self.undetermined,
+                "same_language_skips": self.skipped,
+            }  # 偵測統計
+
+
+detection_stats = DetectionStats()  # 全域偵測統計
+
+
+def _script_of(char: str) -> str | None:
+    code_point = ord(char)  # 取得字元碼
+    for script, start, end in SCRIPT_RANGES:
+        if start <= code_point <= end:
+            return script  # 找到對應文字區段
+    return None  # 標點、數字、表情符號等不計入
+
+
+def _detect_latin_language(text: str) -> str | None:
+    if any(char in VIETNAMESE_CHARS or 0x1EA0 <= ord(char) <= 0x1EF9 for char in text):
+        return "vi"  # 越南文特有字母或聲調
+    words = ["".join(char for char in word if char.isalpha()) for word in text.lower().split()]  # 切詞並去除符號
+    english_hits = sum(1 for word in words if word in ENGLISH_WORDS)  # 英文常用字命中數
+    indonesian_hits = sum(1 for word in words if word in INDONESIAN_WORDS)  # 印尼文常用字命中數
+    if indonesian_hits > english_hits:
+        return "id"  # 印尼文
+    if english_hits > indonesian_hits:
+        return "en"  # 英文
+    return None  # 無法判斷時交給翻譯 API
+
+
+def _detect_han_language(text: str) -> str | None:
+    if any(char in SIMPLIFIED_ONLY_CHARS or char in JAPANESE_ONLY_CHARS for char in text):
+        return None  # 簡體中文或日文漢字仍需翻成繁中
+    if any(char in TRADITIONAL_ONLY_CHARS for char in text):
+        return "zh-TW"  # 含繁體字且無簡體字
+    return None  # 繁簡同形（例如「了解」）無法判斷，交給翻譯 API
+
+
+def detect_language(text: str) -> str | None:
+    counts: dict[str, int] = {}  # 各文字區段字數
+    for char in unicodedata.normalize("NFC", text):
+        script = _script_of(char)  # 判斷文字區段
+        if script:
+            counts[script] = counts.get(script, 0) + 1  # 累計字數
+    total = sum(counts.values())  # 有效字數
+    if not total:
+        return None  # 沒有可判斷的文字
+
+    if counts.get("kana") and counts.get("kana", 0) + counts.get("han", 0) >= total * MIN_DOMINANT_RATIO:
+        return "ja"  # 含假名的漢字文句視為日文
+    script, count = max(counts.items(), key=lambda item: item[1])  # 主要文字區段
+    if count < total * MIN_DOMINANT_RATIO:
+        return None  # 混合語言不判斷
+    if script == "han":
+        return _detect_han_language(text)  # 有繁體字證據才視為繁中
+    if script == "latin":
+        return _detect_latin_language(text)  # 拉丁字母再細分
+    return SCRIPT_LANGUAGE.get(script)  # 回傳對應語言
@@ -1,5 +1,7 @@
 from app.core.config import settings  # 匯入設定
 from app.db.models import UserProfile, GroupSetting  # 匯入模型
+from app.repositories.group_cache import GroupSnapshot  # 匯入群組快照
+from app.repositories.user_repository import UserSnapshot  # 匯入使用者快照
 
 
 def is_owner(user_id: str | None) -> bool:
@@ -8,11 +10,15 @@ def is_owner(user_id: str | None) -> bool:
     return user_id in settings.owner_user_ids  # 判斷是否為所有者
 
 
-def can_manage_group(group: GroupSetting, user: UserProfile | None, user_id: str | None) -> bool:
+def can_manage_group(
+    group: GroupSetting | GroupSnapshot | None,
+    user: UserProfile | UserSnapshot | None,
+    user_id: str | None,
+) -> bool:
     if is_owner(user_id):
         return True  # 所有者可管理
     if user and user.is_admin:
         return True  # 全域管理員可管理
-    if group.inviter_user_id and user_id and group.inviter_user_id == user_id:
-        return True  # 群組邀請者代表可管理
+    if group and group.inviter_user_id and user_id and group.inviter_user_id == user_id:
+        return True  # 群組邀請者代表可管理（群組尚未建立時無邀請者）
     return False  # 其他人不可管理
@@ -0,0 +1,182 @@
+import logging  # 匯入日誌工具
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from collections import deque  # 匯入固定長度佇列
+from typing import Any, Awaitable, Callable  # 匯入型別提示
+
+from app.core.statistics import percentile  # 匯入百分位數工具
+
+
+logger = logging.getLogger(__name__)  # 模組日誌
+
+CLOSED = "closed"  # 正常
+OPEN = "open"  # 熔斷中（不送請求）
+PROBING = "probing"  # 背景探測中
+
+
+class ProviderHealth:
+    def __init__(self, name: str, window_size: int) -> None:
+        self.name = name  # 翻譯來源名稱
+        self.samples: deque[tuple[bool, float]] = deque(maxlen=max(1, window_size))  # 最近 (成功, 耗時)
+        self.state = CLOSED  # 熔斷器狀態
+        self.opened_at = 0.0  # 熔斷開始時間
+        self.consecutive_failures = 0  # 連續失敗次數
+        self.calls = 0  # 總呼叫次數
+        self.failures = 0  # 總失敗次數
+        self.times_opened = 0  # 熔斷次數
+        self.probes = 0  # 探測次數
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0  # 無資料
+        return sum(1 for ok, _ in self.samples if not ok) / len(self.samples)  # 最近錯誤率
+
+    def latency(self, ratio: float) -> float:
+        return percentile(sorted(latency for _, latency in self.samples), ratio)  # 最近耗時百分位數
+
+
+class ProviderRouter:
+    def __init__(
+        self,
+        window_size: int,
+        min_samples: int,
+        error_rate_threshold: float,
+        consecutive_failure_threshold: int,
+        cooldown_seconds: float,
+        slow_latency_seconds: float,
+    ) -> None:
+        self.window_size = window_size  # 滾動視窗大小
+        self.min_samples = min_samples  # 計算錯誤率的最少樣本數
+        self.error_rate_threshold = error_rate_threshold  # 錯誤率熔斷門檻
+        self.consecutive_failure_threshold = consecutive_failure_threshold  # 連續失敗熔斷門檻
+        self.cooldown_seconds = cooldown_seconds  # 熔斷後多久開始探測
+        self.slow_latency_seconds = slow_latency_seconds  # p90 超過此秒數視為變慢
+        self._lock = threading.Lock()  # 狀態鎖
+        self._providers: dict[str, ProviderHealth] = {}  # 翻譯來源健康狀態
+        self._probes: dict[str, Callable[[], bool]] = {}  # 探測函式
+        self.hedges = 0  # 對沖請求次數
+
+    def _health(self, name: str) -> ProviderHealth:
+        health = self._providers.get(name)  # 讀取狀態
+        if health is None:
+            health = ProviderHealth(name, self.window_size)  # 首次使用時建立
+            self._providers[name] = health  # 登記
+        return health  # 回傳狀態
+
+    def register_probe(self, name: str, probe: Callable[[], bool]) -> None:
+        with self._lock:
+            self._health(name)  # 建立狀態
+            self._probes[name] = probe  # 登記探測函式
+
+    def route(self, candidates: list[str]) -> list[str]:
+        now = time.monotonic()  # 目前時間
+        available: list[str] = []  # 可用來源
+        to_probe: list[str] = []  # 需要背景探測的來源
+        with self._lock:
+            for name in candidates:
+                health = self._health(name)  # 讀取狀態
+                if health.state == CLOSED:
+                    available.append(name)  # 正常來源
+                elif health.state == OPEN and now - health.opened_at >= self.cooldown_seconds:
+                    health.state = PROBING  # 冷卻結束，改由背景探測
+                    to_probe.append(name)  # 排入探測
+            if len(available) > 1:
+                first = self._providers[available[0]]  # 原本優先的來源
+                if first.latency(0.9) > self.slow_latency_seconds and len(first.samples) >= self.min_samples:
+                    faster = min(available[1:], key=lambda name: self._providers[name].latency(0.9))  # 其他較快來源
+                    if self._providers[faster].latency(0.9) < first.latency(0.9):
+                        available.remove(faster)  # 變慢時改用較快來源
+                        available.insert(0, faster)
+        for name in to_probe:
+            threading.Thread(target=self._probe, args=(name,), name=f"provider-probe-{name}", daemon=True).start()  # 背景探測
+        return available or list(candidates)  # 全部熔斷時仍依原順序嘗試
+
+    def _probe(self, name: str) -> None:
+        probe = self._probes.get(name)  # 取得探測函式
+        started = time.perf_counter()  # 開始計時
+        try:
+            healthy = bool(probe()) if probe else True  # 無探測函式時直接恢復
+        except Exception:
+            healthy = False  # 探測失敗
+        elapsed = time.perf_counter() - started  # 探測耗時
+        with self._lock:
+            health = self._health(name)  # 讀取狀態
+            health.probes += 1  # 累計探測
+            if healthy:
+                health.state = CLOSED  # 恢復正常
+                health.consecutive_failures = 0  # 重設連續失敗
+                health.samples.clear()  # 清除熔斷前樣本
+                health.samples.append((True, elapsed))  # 記錄探測結果
+            else:
+                health.state = OPEN  # 繼續熔斷
+                health.opened_at = time.monotonic()  # 重新計算冷卻
+        logger.info("翻譯來源 %s 探測結果：%s", name, "恢復" if healthy else "仍異常")  # 記錄探測
+
+    def record(self, name: str, ok: bool, elapsed: float) -> None:
+        with self._lock:
+            health = self._health(name)  # 讀取狀態
+            health.calls += 1  # 累計呼叫
+            health.samples.append((ok, elapsed))  # 記錄樣本
+            if ok:
+                health.consecutive_failures = 0  # 成功時重設
+                return
+            health.failures += 1  # 累計失敗
+            health.consecutive_failures += 1  # 累計連續失敗
+            too_many_errors = len(health.samples) >= self.min_samples and health.error_rate() >= self.error_rate_threshold  # 錯誤率過高
+            if health.state == CLOSED and (too_many_errors or health.consecutive_failures >= self.consecutive_failure_threshold):
+                health.state = OPEN  # 熔斷
+                health.opened_at = time.monotonic()  # 記錄熔斷時間
+                health.times_opened += 1  # 累計熔斷次數
+                logger.warning("翻譯來源 %s 已熔斷", name)  # 記錄熔斷
+
+    def latency_percentile(self, name: str, ratio: float) -> float | None:
+        with self._lock:
+            health = self._health(name)  # 讀取狀態
+            if len(health.samples) < self.min_samples:
+                return None  # 樣本不足
+            return percentile(sorted(latency for ok, latency in health.samples if ok), ratio) or None  # 成功請求的耗時百分位數
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedges += 1  # 累計對沖次數
+
+    def call(self, name: str, func: Callable[[], Any]) -> Any:
+        started = time.perf_counter()  # 開始計時
+        try:
+            result = func()  # 呼叫翻譯來源
+        except Exception:
+            self.record(name, False, time.perf_counter() - started)  # 記錄失敗
+            raise
+        self.record(name, bool(result), time.perf_counter() - started)  # 空結果視為失敗
+        return result  # 回傳結果
+
+    async def call_async(self, name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()  # 開始計時
+        try:
+            result = await func()  # 呼叫翻譯來源
+        except Exception:
+            self.record(name, False, time.perf_counter() - started)  # 記錄失敗
+            raise
+        self.record(name, bool(result), time.perf_counter() - started)  # 空結果視為失敗
+        return result  # 回傳結果
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()  # 目前時間
+        with self._lock:
+            providers = {
+                name: {
+                    "state": health.state,
+                    "calls": health.calls,
+                    "failures": health.failures,
+                    "error_rate": round(health.error_rate(), 4),
+                    "latency_p50_ms": round(health.latency(0.5) * 1000, 2),
+                    "latency_p90_ms": round(health.latency(0.9) * 1000, 2),
+                    "samples": len(health.samples),
+                    "consecutive_failures": health.consecutive_failures,
+                    "times_opened": health.times_opened,
+                    "probes": health.probes,
+                    "open_for_seconds": round(now - health.opened_at, 1) if health.state != CLOSED else 0.0,
+                }
+                for name, health in self._providers.items()
+            }  # 各翻譯來源狀態
+            return {"hedges": self.hedges, "providers": providers}  # 對沖次數與各來源狀態
@@ -0,0 +1,67 @@
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from typing import Any  # 匯入型別提示
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int) -> None:
+        self.rate = rate_per_second  # 每秒補充的請求數（0 為不限）
+        self.capacity = max(1, burst)  # 桶子容量（可瞬間送出的請求數）
+        self._tokens = float(self.capacity)  # 目前可用額度
+        self._updated = time.monotonic()  # 上次補充時間
+        self._lock = threading.Lock()  # 執行緒鎖
+        self.granted = 0  # 直接取得額度次數
+        self.delayed = 0  # 需等待額度次數
+        self.rejected = 0  # 超過等待上限而拒絕次數
+
+    def reserve(self, max_wait: float = 0.0) -> float | None:
+        if self.rate <= 0:
+            return 0.0  # 不限速
+        with self._lock:
+            now = time.monotonic()  # 目前時間
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)  # 依經過時間補充額度
+            self._updated = now  # 更新補充時間
+            if self._tokens >= 1:
+                self._tokens -= 1  # 取得額度
+                self.granted += 1  # 累計直接取得
+                return 0.0  # 不需等待
+            wait_seconds = (1 - self._tokens) / self.rate  # 等到下一個額度的秒數
+            if wait_seconds > max_wait:
+                self.rejected += 1  # 累計拒絕
+                return None  # 超過可等待時間
+            self._tokens -= 1  # 預先保留額度（等待後使用）
+            self.delayed += 1  # 累計等待
+            return wait_seconds  # 呼叫端需等待的秒數
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.capacity,
+                "tokens": round(max(0.0, self._tokens), 2),
+                "granted": self.granted,
+                "delayed": self.delayed,
+                "rejected": self.rejected,
+            }  # 限速統計
+
+
+class ProviderRateLimiter:
+    def __init__(self, limits: dict[str, tuple[float, int]]) -> None:
+        self._buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}  # 各翻譯來源的權杖桶
+
+    def reserve(self, name: str, max_wait: float = 0.0) -> float | None:
+        bucket = self._buckets.get(name)  # 讀取權杖桶
+        if bucket is None:
+            return 0.0  # 未設定限速的來源
+        return bucket.reserve(max_wait)  # 取得額度或需等待秒數
+
+    def acquire(self, name: str, max_wait: float = 0.0) -> bool:
+        wait_seconds = self.reserve(name, max_wait)  # 取得額度
+        if wait_seconds is None:
+            return False  # 額度不足
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)  # 等待額度補充
+        return True  # 可送出請求
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: bucket.stats() for name, bucket in self._buckets.items()}  # 各來源限速統計
@@ -0,0 +1,97 @@
+import asyncio  # 匯入 asyncio 工具
+import threading  # 匯入執行緒工具
+from concurrent.futures import Future  # 匯入執行緒 Future
+from typing import Any, Awaitable, Callable, Hashable  # 匯入型別提示
+
+from app.core.deadline import DeadlineExceeded, time_left  # 匯入事件期限工具
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()  # 執行緒鎖
+        self._calls: dict[Hashable, Future] = {}  # 進行中的同步請求
+        self._async_calls: dict[tuple[int, Hashable], asyncio.Task] = {}  # 進行中的 asyncio 請求（依事件迴圈區分）
+        self.executed = 0  # 實際執行次數
+        self.coalesced = 0  # 共用既有請求次數
+        self.retried = 0  # 首位呼叫端逾時後等待者重新請求次數
+
+    def do(self, key: Hashable, func: Callable[[], Any], deadline: float | None = None) -> Any:
+        while True:
+            with self._lock:
+                future = self._calls.get(key)  # 查詢是否已有相同請求
+                leader = future is None or future.done()  # 是否由本執行緒發出請求（已結束的請求不再共用）
+                if leader:
+                    future = Future()  # 建立共用結果
+                    self._calls[key] = future  # 登記進行中請求
+                    self.executed += 1  # 累計執行
+                else:
+                    self.coalesced += 1  # 累計共用
+            if leader:
+                break  # 由本執行緒執行
+            try:
+                return future.result(timeout=_wait_seconds(deadline))  # 依自己的期限等待同一請求的結果
+            except TimeoutError:
+                raise DeadlineExceeded() from None  # 自己的期限已到
+            except DeadlineExceeded:
+                if _expired(deadline):
+                    raise  # 自己也已逾時
+                self.retried += 1  # 首位呼叫端的期限較短，自己仍有時間就重新請求
+
+        try:
+            result = func()  # 執行實際請求
+        except BaseException as exc:
+            future.set_exception(exc)  # 讓等待者收到相同例外
+            raise
+        else:
+            future.set_result(result)  # 通知等待者
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]  # 移除進行中登記（不動後來重新發出的請求）
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[Any]], deadline: float | None = None) -> Any:
+        loop_key = (id(asyncio.get_running_loop()), key)  # 同一事件迴圈內才能共用 Task
+        while True:
+            with self._lock:
+                task = self._async_calls.get(loop_key)  # 查詢是否已有相同請求
+                leader = task is None or task.done()  # 是否由本協程發出請求（已結束的請求不再共用）
+                if leader:
+                    task = asyncio.ensure_future(func())  # 建立共用 Task
+                    self._async_calls[loop_key] = task  # 登記進行中請求
+                    task.add_done_callback(lambda done, task_key=loop_key: self._forget_async(task_key, done))  # 完成後移除登記
+                    self.executed += 1  # 累計執行
+                else:
+                    self.coalesced += 1  # 累計共用
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), timeout=_wait_seconds(deadline))  # 依自己的期限等待（取消時不影響其他等待者）
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded() from None  # 自己的期限已到
+            except DeadlineExceeded:
+                if leader or _expired(deadline):
+                    raise  # 自己發出的請求或自己也已逾時
+                self.retried += 1  # 首位呼叫端的期限較短，自己仍有時間就重新請求
+
+    def _forget_async(self, loop_key: tuple[int, Hashable], task: asyncio.Task) -> None:
+        with self._lock:
+            if self._async_calls.get(loop_key) is task:
+                del self._async_calls[loop_key]  # 移除進行中登記（不動後來重新發出的請求）
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._async_calls),
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "retried": self.retried,
+            }  # 共用統計
+
+
+def _wait_seconds(deadline: float | None) -> float | None:
+    left = time_left(deadline)  # 剩餘秒數
+    return None if left is None else max(0.0, left)  # 無期限時一直等待
+
+
+def _expired(deadline: float | None) -> bool:
+    left = time_left(deadline)  # 剩餘秒數
+    return left is not None and left <= 0  # 是否已超過期限
@@ -0,0 +1,90 @@
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+import unicodedata  # 匯入 Unicode 正規化工具
+from collections import OrderedDict  # 匯入有序字典（LRU 用）
+
+
+CacheKey = tuple[str, str, str]  # (正規化文字, 目標語言, 翻譯來源)
+
+
+def normalize_cache_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text.strip())  # 統一 Unicode 形式與首尾空白
+
+
+class TranslationCache:
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float) -> None:
+        self.max_entries = max(0, max_entries)  # 最多筆數（0 代表停用）
+        self.max_bytes = max(0, max_bytes)  # 最多位元組
+        self.ttl_seconds = ttl_seconds  # 存活秒數
+        self._entries: OrderedDict[CacheKey, tuple[str, float, int]] = OrderedDict()  # key -> (譯文, 到期時間, 大小)
+        self._lock = threading.Lock()  # 執行緒鎖
+        self._bytes = 0  # 目前總位元組
+        self.hits = 0  # 命中數
+        self.misses = 0  # 未命中數
+        self.evictions = 0  # 因容量淘汰數
+        self.expirations = 0  # 因過期淘汰數
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0  # 是否啟用快取
+
+    def get(self, text: str, target_language_code: str, provider: str) -> str | None:
+        if not self.enabled:
+            return None  # 停用時一律未命中
+        key = (normalize_cache_text(text), target_language_code, provider)  # 組合快取 key
+        now = time.monotonic()  # 目前時間
+        with self._lock:
+            entry = self._entries.get(key)  # 讀取快取
+            if entry is None:
+                self.misses += 1  # 未命中
+                return None
+            value, expires_at, size = entry  # 拆解快取資料
+            if expires_at <= now:
+                del self._entries[key]  # 過期移除
+                self._bytes -= size  # 扣除大小
+                self.expirations += 1  # 累計過期
+                self.misses += 1  # 視為未命中
+                return None
+            self._entries.move_to_end(key)  # 標記為最近使用
+            self.hits += 1  # 命中
+            return value  # 回傳譯文
+
+    def set(self, text: str, target_language_code: str, provider: str, value: str) -> None:
+        if not self.enabled:
+            return  # 停用時不寫入
+        key = (normalize_cache_text(text), target_language_code, provider)  # 組合快取 key
+        size = len(key[0].encode("utf-8")) + len(value.encode("utf-8"))  # 估算佔用位元組
+        if size > self.max_bytes:
+            return  # 單筆超過上限就不快取
+        with self._lock:
+            previous = self._entries.pop(key, None)  # 移除舊資料
+            if previous is not None:
+                self._bytes -= previous[2]  # 扣除舊大小
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)  # 寫入新資料
+            self._bytes += size  # 累加大小
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)  # 淘汰最久未使用
+                self._bytes -= evicted_size  # 扣除大小
+                self.evictions += 1  # 累計淘汰
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()  # 清空快取
+            self._bytes = 0  # 歸零大小
+
+    def stats(self) -> dict[str, int | float | bool]:
+        with self._lock:
+            lookups = self.hits + self.misses  # 總查詢次數
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }  # 快取統計
@@ -0,0 +1,101 @@
+import hashlib  # 匯入雜湊工具
+import logging  # 匯入日誌工具
+import threading  # 匯入執行緒工具
+from concurrent.futures import ThreadPoolExecutor  # 匯入背景執行緒池
+
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.core.config import settings  # 匯入設定
+from app.db.session import SessionLocal, get_async_sessionmaker  # 匯入資料庫 Session
+from app.repositories.translation_memory_repository import (
+    get_translation_memory,
+    prune_translation_memory,
+    save_translation_memory,
+    touch_translation_memory,
+)  # 匯入翻譯記憶存取
+from app.services.translation_cache import normalize_cache_text  # 匯入快取文字正規化
+
+
+logger = logging.getLogger(__name__)  # 模組日誌
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation-memory")  # 單一背景寫入執行緒
+_write_lock = threading.Lock()  # 寫入計數鎖
+_writes_since_prune = 0  # 上次整理後的寫入次數
+
+
+def hash_source_text(text: str) -> str:
+    return hashlib.sha256(normalize_cache_text(text).encode("utf-8")).hexdigest()  # 原文 SHA-256
+
+
+def recall_translation(text: str, target_language_code: str) -> tuple[str, str] | None:
+    if not settings.translation_memory_enabled:
+        return None  # 停用時不查詢
+    text_hash = hash_source_text(text)  # 計算雜湊
+    try:
+        with SessionLocal() as db:
+            result = _read_memory(db, text_hash, target_language_code)  # 查詢翻譯記憶
+    except Exception:
+        logger.exception("讀取翻譯記憶失敗")  # 記錄錯誤
+        return None  # 讀取失敗時直接走翻譯 API
+    if result:
+        _writer.submit(_touch, text_hash, target_language_code)  # 背景更新命中資訊
+    return result  # 回傳命中結果
+
+
+async def recall_translation_async(text: str, target_language_code: str) -> tuple[str, str] | None:
+    if not settings.translation_memory_enabled:
+        return None  # 停用時不查詢
+    text_hash = hash_source_text(text)  # 計算雜湊
+    try:
+        async with get_async_sessionmaker()() as db:
+            result = await db.run_sync(_read_memory, text_hash, target_language_code)  # 以 asyncio driver 查詢翻譯記憶
+    except Exception:
+        logger.exception("讀取翻譯記憶失敗")  # 記錄錯誤
+        return None  # 讀取失敗時直接走翻譯 API
+    if result:
+        _writer.submit(_touch, text_hash, target_language_code)  # 背景更新命中資訊
+    return result  # 回傳命中結果
+
+
+def _read_memory(db: Session, text_hash: str, target_language_code: str) -> tuple[str, str] | None:
+    entry = get_translation_memory(db, text_hash, target_language_code)  # 查詢翻譯記憶
+    if not entry:
+        return None  # 未命中
+    return entry.provider, entry.translated_text  # 取出來源與譯文
+
+
+def remember_translation(text: str, target_language_code: str, provider: str, translated_text: str) -> None:
+    if not settings.translation_memory_enabled:
+        return  # 停用時不寫入
+    _writer.submit(_save, normalize_cache_text(text), target_language_code, provider, translated_text)  # 背景寫入
+
+
+def _touch(text_hash: str, target_language_code: str) -> None:
+    try:
+        with SessionLocal() as db:
+            touch_translation_memory(db, text_hash, target_language_code)  # 更新命中次數
+    except Exception:
+        logger.exception("更新翻譯記憶命中失敗")  # 記錄錯誤
+
+
+def _save(source_text: str, target_language_code: str, provider: str, translated_text: str) -> None:
+    global _writes_since_prune
+    try:
+        with SessionLocal() as db:
+            save_translation_memory(
+                db,
+                hash_source_text(source_text),
+                target_language_code,
+                provider,
+                source_text,
+                translated_text,
+            )  # 寫入翻譯記憶
+            with _write_lock:
+                _writes_since_prune += 1  # 累計寫入次數
+                should_prune = _writes_since_prune >= settings.translation_memory_prune_interval  # 是否到整理時間
+                if should_prune:
+                    _writes_since_prune = 0  # 重設計數
+            if should_prune:
+                prune_translation_memory(db, settings.translation_memory_max_entries)  # 依筆數上限整理
+    except Exception:
+        logger.exception("寫入翻譯記憶失敗")  # 記錄錯誤
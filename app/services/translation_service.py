@@ -1,6 +1,18 @@
-import requests  # 匯入 HTTP 請求工具
+import asyncio  # 匯入 asyncio 工具
+import time  # 匯入計時工具
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait  # 匯入執行緒池工具
 
 from app.core.config import settings  # 匯入設定
+from app.core.deadline import DeadlineExceeded, bounded_timeout, check_deadline, time_left  # 匯入事件期限工具
+from app.core.metrics import provider_seconds, translation_fallbacks_total  # 匯入翻譯 API 指標
+from app.services.language_detection import detect_language, detection_stats  # 匯入離線語言偵測
+from app.services.http_clients import async_provider_timeout, get_async_provider_client, provider_session, provider_timeout  # 匯入共用連線池
+from app.services.provider_router import ProviderRouter  # 匯入翻譯來源熔斷路由
+from app.services.rate_limiter import ProviderRateLimiter  # 匯入翻譯來源限速
+from app.services.single_flight import SingleFlight  # 匯入相同請求合併工具
+from app.services.translation_cache import TranslationCache, normalize_cache_text  # 匯入翻譯快取
+from app.services.translation_memory_service import recall_translation, recall_translation_async, remember_translation  # 匯入翻譯記憶
+from app.services.usage_service import allowed_providers, usage_tracker  # 匯入字元用量與額度政策
 
 
 DEEPL_LANGUAGE_MAP = {
@@ -14,48 +26,121 @@ DEEPL_LANGUAGE_MAP = {
     "ru": "RU",
 }  # DeepL 支援的語言映射
 
+GOOGLE_TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"  # Google 非官方翻譯端點
 
-google_session = requests.Session()  # Google 翻譯共用連線
 
+translation_cache = TranslationCache(
+    max_entries=settings.translation_cache_max_entries,
+    max_bytes=settings.translation_cache_max_bytes,
+    ttl_seconds=settings.translation_cache_ttl_seconds,
+)  # 程序內翻譯快取
+translation_flights = SingleFlight()  # 合併同時進行的相同翻譯請求
+provider_router = ProviderRouter(
+    window_size=settings.provider_breaker_window,
+    min_samples=settings.provider_breaker_min_samples,
+    error_rate_threshold=settings.provider_breaker_error_rate,
+    consecutive_failure_threshold=settings.provider_breaker_consecutive_failures,
+    cooldown_seconds=settings.provider_breaker_cooldown_seconds,
+    slow_latency_seconds=settings.provider_slow_latency_seconds,
+)  # 依健康狀態選擇翻譯來源
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=max(2, settings.translation_fanout_workers * 2),
+    thread_name_prefix="translate-hedge",
+)  # 對沖請求用執行緒池（每個翻譯最多兩個來源同時進行）
+provider_rate_limiter = ProviderRateLimiter(
+    {
+        "deepl": (settings.deepl_rate_per_second, settings.deepl_rate_burst),
+        "google": (settings.google_rate_per_second, settings.google_rate_burst),
+    }
+)  # 各翻譯來源的權杖桶限速
+Served = tuple[str, str | None]  # (譯文, 實際送出請求的來源；快取命中或全部失敗時為 None)
+PROBE_TEXT = "hello"  # 背景探測用的短句
+PROBE_LANGUAGE = "ja"  # 背景探測用的目標語言
 
-def _translate_with_deepl(text: str, target_language_code: str) -> str | None:
+
+def _deepl_available(target_language_code: str) -> bool:
+    return bool(settings.deepl_api_key.strip()) and target_language_code in DEEPL_LANGUAGE_MAP  # 是否可使用 DeepL
+
+
+def _deepl_request(text: str, target_language_code: str) -> tuple[str, dict[str, str], dict[str, str]] | None:
     api_key = settings.deepl_api_key.strip()  # 讀取 DeepL 金鑰
     deepl_target = DEEPL_LANGUAGE_MAP.get(target_language_code)  # 轉換 DeepL 語言代碼
     if not api_key or not deepl_target:
         return None  # 無金鑰或語言不支援時回傳 None
 
-    endpoint = "https://api-free.deepl.com/v2/translate" if api_key.endswith(":fx") else "https://api.deepl.com/v2/translate"  # 選擇 Free/Pro 端點
-    try:
-        response = requests.post(
-            endpoint,
-            headers={"Authorization": f"DeepL-Auth-Key {api_key}"},
-            data={
-                "text": text,
-                "target_lang": deepl_target,
-            },
-            timeout=20,
-        )  # 呼叫 DeepL API
-        if response.status_code != 200:
-            return None  # DeepL 失敗時交給備援
-        payload = response.json()  # 解析回應
-        translations = payload.get("translations", [])  # 讀取翻譯結果
-        if not translations:
-            return None  # 無翻譯結果
-        return translations[0].get("text")  # 回傳第一筆翻譯
-    except Exception:
-        return None  # DeepL 例外時交給備援
+    endpoint = settings.deepl_api_url.strip() or (
+        "https://api-free.deepl.com/v2/translate" if api_key.endswith(":fx") else "https://api.deepl.com/v2/translate"
+    )  # 選擇 Free/Pro 端點（可改指向代理或本機替身）
+    headers = {"Authorization": f"DeepL-Auth-Key {api_key}"}  # 驗證標頭
+    data = {
+        "text": text,
+        "target_lang": deepl_target,
+    }  # 請求內容
+    return endpoint, headers, data  # 回傳請求參數
+
+
+def _parse_deepl_payload(payload: dict) -> str | None:
+    translations = payload.get("translations", [])  # 讀取翻譯結果
+    if not translations:
+        return None  # 無翻譯結果
+    return translations[0].get("text")  # 回傳第一筆翻譯
+
 
+def _google_url() -> str:
+    return settings.google_translate_url.strip() or GOOGLE_TRANSLATE_URL  # Google 端點（可改指向代理或本機替身）
 
-def _translate_with_fallback(text: str, target_language_code: str) -> str:
-    url = "https://translate.googleapis.com/translate_a/single"  # Google 非官方翻譯端點
-    params = {
+
+def _google_params(text: str, target_language_code: str) -> dict[str, str]:
+    return {
         "client": "gtx",
         "sl": "auto",
         "tl": target_language_code,
         "dt": "t",
         "q": text,
     }  # 參數設定
-    response = google_session.get(url, params=params, timeout=20)  # 呼叫 Google 翻譯
+
+
+def _translate_with_deepl(text: str, target_language_code: str, deadline: float | None = None) -> str | None:
+    request = _deepl_request(text, target_language_code)  # 組合 DeepL 請求
+    if not request:
+        return None  # 無金鑰或語言不支援
+    endpoint, headers, data = request  # 拆解請求參數
+    try:
+        response = provider_session.post(endpoint, headers=headers, data=data, timeout=provider_timeout(deadline))  # 呼叫 DeepL API（共用連線池）
+        if response.status_code != 200:
+            return None  # DeepL 失敗時交給備援
+        return _parse_deepl_payload(response.json())  # 解析回應
+    except Exception:
+        return None  # DeepL 例外時交給備援
+
+
+def _translate_with_fallback(text: str, target_language_code: str, deadline: float | None = None) -> str:
+    response = provider_session.get(_google_url(), params=_google_params(text, target_language_code), timeout=provider_timeout(deadline))  # 呼叫 Google 翻譯
+    response.raise_for_status()  # 檢查 HTTP 狀態
+    payload = response.json()  # 解析 JSON
+    return payload[0][0][0]  # 取回翻譯結果
+
+
+async def _translate_with_deepl_async(text: str, target_language_code: str, deadline: float | None = None) -> str | None:
+    request = _deepl_request(text, target_language_code)  # 組合 DeepL 請求
+    if not request:
+        return None  # 無金鑰或語言不支援
+    endpoint, headers, data = request  # 拆解請求參數
+    try:
+        response = await get_async_provider_client().post(endpoint, headers=headers, data=data, timeout=async_provider_timeout(deadline))  # 呼叫 DeepL API（asyncio 連線池）
+        if response.status_code != 200:
+            return None  # DeepL 失敗時交給備援
+        return _parse_deepl_payload(response.json())  # 解析回應
+    except Exception:
+        return None  # DeepL 例外時交給備援
+
+
+async def _translate_with_fallback_async(text: str, target_language_code: str, deadline: float | None = None) -> str:
+    response = await get_async_provider_client().get(
+        _google_url(),
+        params=_google_params(text, target_language_code),
+        timeout=async_provider_timeout(deadline),
+    )  # 呼叫 Google 翻譯
     response.raise_for_status()  # 檢查 HTTP 狀態
     payload = response.json()  # 解析 JSON
     return payload[0][0][0]  # 取回翻譯結果
@@ -68,21 +153,305 @@ def _is_non_translatable(text: str) -> bool:
     return compact.isdigit()  # 純數字不翻譯
 
 
-def translate_text(text: str, target_language_code: str) -> str:
+def _is_same_language(clean_text: str, target_language_code: str) -> bool:
+    if not settings.language_detection_enabled:
+        return False  # 停用時一律送翻譯
+    source_language = detect_language(clean_text)  # 離線判斷原文語言
+    detection_stats.record_detection(source_language)  # 記錄偵測結果
+    if source_language != target_language_code:
+        return False  # 語言不同才需要翻譯
+    detection_stats.record_skip()  # 記錄略過次數
+    return True  # 原文已是目標語言
+
+
+def _lookup_stored(clean_text: str, target_language_code: str, primary_provider: str) -> str | None:
+    cached = translation_cache.get(clean_text, target_language_code, primary_provider)  # 先查程序內快取
+    if cached:
+        return cached  # 快取命中
+    return _remembered(clean_text, target_language_code, primary_provider, recall_translation(clean_text, target_language_code))  # 再查共用翻譯記憶
+
+
+async def _lookup_stored_async(clean_text: str, target_language_code: str, primary_provider: str) -> str | None:
+    cached = translation_cache.get(clean_text, target_language_code, primary_provider)  # 先查程序內快取
+    if cached:
+        return cached  # 快取命中
+    remembered = await recall_translation_async(clean_text, target_language_code)  # 以 asyncio driver 查共用翻譯記憶
+    return _remembered(clean_text, target_language_code, primary_provider, remembered)  # 回填快取
+
+
+def _remembered(clean_text: str, target_language_code: str, primary_provider: str, remembered: tuple[str, str] | None) -> str | None:
+    if not remembered:
+        return None  # 都未命中
+    _, remembered_text = remembered  # 取出譯文
+    translation_cache.set(clean_text, target_language_code, primary_provider, remembered_text)  # 回填程序內快取
+    return remembered_text  # 翻譯記憶命中
+
+
+def translate_text(text: str, target_language_code: str, deadline: float | None = None, group_id: str | None = None) -> str:
     clean_text = text.strip()  # 清理空白
     if not clean_text:
         return ""  # 空字串直接回傳
     if _is_non_translatable(clean_text):
         return clean_text  # 數字/代碼類內容直接回傳
+    if _is_same_language(clean_text, target_language_code):
+        return clean_text  # 原文已是目標語言時不呼叫翻譯 API
 
+    providers = _provider_chain(target_language_code, group_id)  # 可用翻譯來源（已套用額度政策）
+    primary_provider = providers[0]  # 優先使用的翻譯來源
+    stored = _lookup_stored(clean_text, target_language_code, primary_provider)  # 查快取與翻譯記憶
+    if stored:
+        return stored  # 命中直接回傳
+    check_deadline(deadline)  # 已超過期限時不再呼叫翻譯 API
+
+    result, provider = translation_flights.do(
+        (normalize_cache_text(clean_text), target_language_code, tuple(providers)),
+        lambda: _translate_uncached(clean_text, target_language_code, providers, deadline),
+        deadline,
+    )  # 相同原文、語言與可用來源同時只送出一次請求（各呼叫端依自己的期限等待）
+    _record_group_usage(provider, group_id, clean_text)  # 共用結果的每個群組都要計入用量
+    return result  # 回傳譯文
+
+
+def _record_group_usage(provider: str | None, group_id: str | None, clean_text: str) -> None:
+    if provider and group_id:
+        usage_tracker.record(None, group_id, len(clean_text))  # 由翻譯 API 完成時累計群組字元用量
+
+
+def _provider_chain(target_language_code: str, group_id: str | None = None) -> list[str]:
+    if _deepl_available(target_language_code):
+        return allowed_providers(["deepl", "google"], group_id)  # DeepL 優先、Google 備援（套用字元額度政策）
+    return ["google"]  # 不支援 DeepL 時只用 Google
+
+
+def _rate_limit_wait(deadline: float | None) -> float:
+    return bounded_timeout(settings.provider_rate_limit_wait_seconds, deadline)  # 最後一個來源可等待限速額度的秒數
+
+
+def _hedge_delay(provider: str, deadline: float | None) -> float:
+    observed = provider_router.latency_percentile(provider, settings.provider_hedge_percentile)  # 該來源近期耗時百分位數
+    delay = observed if observed is not None else settings.provider_hedge_default_delay_seconds  # 樣本不足時使用預設值
+    return bounded_timeout(delay, deadline)  # 不超過事件剩餘時間
+
+
+def _call_provider(
+    provider: str,
+    clean_text: str,
+    target_language_code: str,
+    deadline: float | None,
+    max_wait: float = 0.0,
+) -> str | None:
+    if not provider_rate_limiter.acquire(provider, max_wait):
+        return None  # 超過限速時交給其他來源
+    started = time.perf_counter()  # 開始計時
     try:
-        deepl_result = _translate_with_deepl(clean_text, target_language_code)  # 優先使用 DeepL
-        if deepl_result:
-            return deepl_result  # DeepL 成功時直接回傳
+        result = provider_router.call(provider, lambda: SYNC_PROVIDERS[provider](clean_text, target_language_code, deadline))  # 呼叫並記錄耗時與成敗
     except Exception:
-        pass  # DeepL 發生任何錯誤時繼續走備援
+        result = None  # 失敗時交給其他來源
+    _observe_provider(provider, target_language_code, started, result)  # 記錄耗時分布
+    if result:
+        usage_tracker.record(provider, None, len(clean_text))  # 累計來源實際送出的字元用量（群組用量由每個呼叫端各自累計）
+    return result  # 回傳翻譯結果
+
+
+def _translate_hedged(
+    clean_text: str,
+    target_language_code: str,
+    candidates: list[str],
+    providers: list[str],
+    deadline: float | None,
+) -> Served:
+    primary_provider = candidates[0]  # 原本優先的來源
+    first, backup = providers[0], providers[1]  # 主要來源與對沖來源
+    futures: dict[Future, str] = {
+        _hedge_executor.submit(_call_provider, first, clean_text, target_language_code, deadline): first
+    }  # 先送出主要來源
+    done, _ = wait(futures, timeout=_hedge_delay(first, deadline))  # 等到該來源的慢速百分位數
+    for future in done:
+        result = future.result()  # 主要來源已回應
+        if result:
+            return _accept(clean_text, target_language_code, first, primary_provider, result), first  # 在對沖前就成功
+        futures.pop(future)  # 主要來源失敗
+
+    cached = translation_cache.get(clean_text, target_language_code, backup)  # 送出對沖前先查其快取
+    if cached:
+        return cached, None  # 快取命中直接回傳
+    if futures:
+        provider_router.record_hedge()  # 主要來源尚未回應時才算對沖
+    futures[
+        _hedge_executor.submit(
+            _call_provider, backup, clean_text, target_language_code, deadline, _rate_limit_wait(deadline)
+        )
+    ] = backup  # 送出對沖請求
+
+    while futures:
+        done, _ = wait(futures, timeout=time_left(deadline), return_when=FIRST_COMPLETED)  # 任一來源先回應即採用
+        if not done:
+            raise DeadlineExceeded()  # 兩個來源都未在期限內回應
+        for future in done:
+            provider = futures.pop(future)  # 回應的來源
+            result = future.result()  # 翻譯結果
+            if result:
+                return _accept(clean_text, target_language_code, provider, primary_provider, result), provider  # 先成功者勝出
+    translation_fallbacks_total.inc(reason="original_text")  # 所有來源失敗
+    return clean_text, None  # 所有來源失敗時回傳原文
+
+
+def _translate_uncached(
+    clean_text: str,
+    target_language_code: str,
+    candidates: list[str],
+    deadline: float | None = None,
+) -> Served:
+    primary_provider = candidates[0]  # 已查過快取的來源
+    providers = provider_router.route(candidates)  # 依健康狀態排列來源
+    if settings.provider_hedge_enabled and len(providers) > 1:
+        return _translate_hedged(clean_text, target_language_code, candidates, providers, deadline)  # 主要來源變慢時對沖備援
+
+    for index, provider in enumerate(providers):
+        if provider != primary_provider:
+            cached = translation_cache.get(clean_text, target_language_code, provider)  # 改走其他來源前先查其快取
+            if cached:
+                return cached, None  # 快取命中直接回傳
+        check_deadline(deadline)  # 已超過期限時不再嘗試下一個來源
+        max_wait = _rate_limit_wait(deadline) if index == len(providers) - 1 else 0.0  # 只有最後一個來源等待限速額度
+        result = _call_provider(provider, clean_text, target_language_code, deadline, max_wait)  # 呼叫翻譯來源
+        if result:
+            return _accept(clean_text, target_language_code, provider, primary_provider, result), provider  # 成功時直接回傳
+    translation_fallbacks_total.inc(reason="original_text")  # 所有來源失敗
+    return clean_text, None  # 所有來源失敗時回傳原文
+
+
+async def translate_text_async(
+    text: str,
+    target_language_code: str,
+    deadline: float | None = None,
+    group_id: str | None = None,
+) -> str:
+    clean_text = text.strip()  # 清理空白
+    if not clean_text:
+        return ""  # 空字串直接回傳
+    if _is_non_translatable(clean_text):
+        return clean_text  # 數字/代碼類內容直接回傳
+    if _is_same_language(clean_text, target_language_code):
+        return clean_text  # 原文已是目標語言時不呼叫翻譯 API
 
+    providers = _provider_chain(target_language_code, group_id)  # 可用翻譯來源（已套用額度政策）
+    primary_provider = providers[0]  # 優先使用的翻譯來源
+    stored = await _lookup_stored_async(clean_text, target_language_code, primary_provider)  # 查快取與翻譯記憶（asyncio driver）
+    if stored:
+        return stored  # 命中直接回傳
+    check_deadline(deadline)  # 已超過期限時不再呼叫翻譯 API
+
+    result, provider = await translation_flights.do_async(
+        (normalize_cache_text(clean_text), target_language_code, tuple(providers)),
+        lambda: _translate_uncached_async(clean_text, target_language_code, providers, deadline),
+        deadline,
+    )  # 相同原文、語言與可用來源同時只送出一次請求（各呼叫端依自己的期限等待）
+    _record_group_usage(provider, group_id, clean_text)  # 共用結果的每個群組都要計入用量
+    return result  # 回傳譯文
+
+
+async def _call_provider_async(
+    provider: str,
+    clean_text: str,
+    target_language_code: str,
+    deadline: float | None,
+    max_wait: float = 0.0,
+) -> str | None:
+    wait_seconds = provider_rate_limiter.reserve(provider, max_wait)  # 取得限速額度
+    if wait_seconds is None:
+        return None  # 超過限速時交給其他來源
+    if wait_seconds > 0:
+        await asyncio.sleep(wait_seconds)  # 等待額度補充
+    started = time.perf_counter()  # 開始計時
     try:
-        return _translate_with_fallback(clean_text, target_language_code)  # 不支援語言時改用備援
+        result = await provider_router.call_async(
+            provider, lambda: ASYNC_PROVIDERS[provider](clean_text, target_language_code, deadline)
+        )  # 呼叫並記錄耗時與成敗
     except Exception:
-        return clean_text  # 若翻譯失敗則回傳原文
+        result = None  # 失敗時交給其他來源
+    _observe_provider(provider, target_language_code, started, result)  # 記錄耗時分布
+    if result:
+        usage_tracker.record(provider, None, len(clean_text))  # 累計來源實際送出的字元用量（群組用量由每個呼叫端各自累計）
+    return result  # 回傳翻譯結果
+
+
+async def _translate_uncached_async(
+    clean_text: str,
+    target_language_code: str,
+    candidates: list[str],
+    deadline: float | None = None,
+) -> Served:
+    primary_provider = candidates[0]  # 已查過快取的來源
+    providers = provider_router.route(candidates)  # 依健康狀態排列來源
+    hedging = settings.provider_hedge_enabled and len(providers) > 1  # 是否對沖
+    tasks: dict[asyncio.Task, str] = {}  # 進行中的來源請求
+    try:
+        for index, provider in enumerate(providers):
+            if provider != primary_provider:
+                cached = translation_cache.get(clean_text, target_language_code, provider)  # 改走其他來源前先查其快取
+                if cached:
+                    return cached, None  # 快取命中直接回傳
+            check_deadline(deadline)  # 已超過期限時不再嘗試下一個來源
+            if tasks:
+                provider_router.record_hedge()  # 前一個來源尚未回應，送出對沖請求
+            is_last = index == len(providers) - 1  # 是否為最後一個來源
+            max_wait = _rate_limit_wait(deadline) if is_last else 0.0  # 只有最後一個來源等待限速額度
+            tasks[
+                asyncio.ensure_future(
+                    _call_provider_async(provider, clean_text, target_language_code, deadline, max_wait)
+                )
+            ] = provider  # 送出請求
+            timeout = time_left(deadline) if is_last or not hedging else _hedge_delay(provider, deadline)  # 等待秒數
+            while tasks:
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)  # 任一來源先回應即採用
+                if not done:
+                    break  # 逾時：對沖下一個來源或結束
+                for task in done:
+                    finished = tasks.pop(task)  # 回應的來源
+                    result = task.result()  # 翻譯結果
+                    if result:
+                        return _accept(clean_text, target_language_code, finished, primary_provider, result), finished  # 先成功者勝出
+                if not is_last and hedging:
+                    break  # 主要來源失敗時立即改用下一個來源
+            if tasks and (is_last or not hedging):
+                raise DeadlineExceeded()  # 期限內沒有任何來源回應
+        translation_fallbacks_total.inc(reason="original_text")  # 所有來源失敗
+        return clean_text, None  # 所有來源失敗時回傳原文
+    finally:
+        for task in tasks:
+            task.cancel()  # 取消尚未完成的請求
+
+
+def _observe_provider(provider: str, target_language_code: str, started: float, result: str | None) -> None:
+    provider_seconds.observe(
+        time.perf_counter() - started,
+        provider=provider,
+        target=target_language_code,
+        outcome="ok" if result else "error",
+    )  # 依來源與目標語言記錄耗時
+
+
+def _accept(clean_text: str, target_language_code: str, provider: str, primary_provider: str, result: str) -> str:
+    if provider != primary_provider:
+        translation_fallbacks_total.inc(reason=f"{primary_provider}_to_{provider}")  # 由備援來源完成
+    _store_translation(clean_text, target_language_code, provider, result)  # 寫入快取與翻譯記憶
+    return result  # 回傳譯文
+
+
+def _store_translation(text: str, target_language_code: str, provider: str, translated_text: str) -> None:
+    translation_cache.set(text, target_language_code, provider, translated_text)  # 寫入程序內快取
+    remember_translation(text, target_language_code, provider, translated_text)  # 背景寫入共用翻譯記憶
+
+
+SYNC_PROVIDERS = {
+    "deepl": _translate_with_deepl,
+    "google": _translate_with_fallback,
+}  # 同步翻譯來源
+ASYNC_PROVIDERS = {
+    "deepl": _translate_with_deepl_async,
+    "google": _translate_with_fallback_async,
+}  # 非同步翻譯來源
+
+for _name, _provider in SYNC_PROVIDERS.items():
+    provider_router.register_probe(_name, lambda provider=_provider: bool(provider(PROBE_TEXT, PROBE_LANGUAGE)))  # 熔斷後以短句背景探測
@@ -0,0 +1,172 @@
+import logging  # 匯入日誌工具
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from concurrent.futures import ThreadPoolExecutor  # 匯入背景執行緒池
+from datetime import datetime  # 匯入時間型別
+from typing import Any  # 匯入型別提示
+
+from app.core.config import settings  # 匯入設定
+from app.db.session import SessionLocal  # 匯入資料庫 Session
+from app.repositories.usage_repository import add_translation_usage, load_translation_usage  # 匯入用量存取
+
+
+logger = logging.getLogger(__name__)  # 模組日誌
+
+PROVIDER_SCOPE = "provider"  # 依翻譯來源統計
+GROUP_SCOPE = "group"  # 依群組統計
+BUDGET_ACTION_REROUTE = "reroute"  # 超量群組改用 Google
+BUDGET_ACTION_LIMIT = "limit"  # 超量群組限制翻譯語言數
+
+_flusher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation-usage")  # 單一背景寫入執行緒
+
+
+def current_period() -> str:
+    return datetime.utcnow().strftime("%Y-%m")  # 以 UTC 月份為計費週期
+
+
+class UsageTracker:
+    def __init__(self, flush_interval_seconds: float) -> None:
+        self.flush_interval_seconds = flush_interval_seconds  # 寫入資料庫間隔
+        self._lock = threading.Lock()  # 執行緒鎖
+        self._period = current_period()  # 目前統計月份
+        self._totals: dict[tuple[str, str], int] = {}  # 當月累計字元數（含尚未寫入）
+        self._pending: dict[tuple[str, str, str], tuple[int, int]] = {}  # (月份, 類型, 對象) → 尚未寫入的 (字元數, 請求數)
+        self._loaded = False  # 是否已讀取資料庫用量
+        self._flushing = False  # 是否已排入背景寫入
+        self._last_flush = time.monotonic()  # 上次寫入時間
+        self.flushes = 0  # 寫入次數
+
+    def _roll_period(self) -> None:
+        period = current_period()  # 目前月份
+        if period != self._period:
+            self._period = period  # 進入新月份
+            self._totals = {}  # 重設當月累計（待寫入用量帶有月份，仍寫入原月份）
+            self._loaded = False  # 重新讀取新月份用量
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            self._roll_period()  # 檢查是否跨月
+            if self._loaded:
+                return  # 已讀取
+            period = self._period  # 讀取月份
+        try:
+            with SessionLocal() as db:
+                stored = load_translation_usage(db, period)  # 讀取資料庫當月用量
+        except Exception:
+            logger.exception("讀取翻譯用量失敗")  # 記錄錯誤
+            stored = {}  # 讀取失敗時從 0 開始
+        with self._lock:
+            if self._loaded or period != self._period:
+                return  # 其他執行緒已讀取或已跨月
+            for key, characters in stored.items():
+                self._totals[key] = self._totals.get(key, 0) + characters  # 合併已存用量
+            self._loaded = True  # 標記已讀取
+
+    def record(self, provider: str | None, group_id: str | None, characters: int) -> None:
+        self._ensure_loaded()  # 首次使用時讀取資料庫用量
+        keys = ([(PROVIDER_SCOPE, provider)] if provider else []) + ([(GROUP_SCOPE, group_id)] if group_id else [])  # 需累計的對象
+        with self._lock:
+            self._roll_period()  # 檢查是否跨月
+            for key in keys:
+                self._totals[key] = self._totals.get(key, 0) + characters  # 累計當月字元數
+                pending_key = (self._period, *key)  # 記錄當下月份
+                pending_chars, pending_requests = self._pending.get(pending_key, (0, 0))  # 尚未寫入的用量
+                self._pending[pending_key] = (pending_chars + characters, pending_requests + 1)  # 累計待寫入用量
+            should_flush = not self._flushing and time.monotonic() - self._last_flush >= self.flush_interval_seconds  # 是否到寫入時間
+            if should_flush:
+                self._flushing = True  # 避免重複排入
+        if should_flush:
+            _flusher.submit(self.flush)  # 背景寫入資料庫
+
+    def usage(self, scope: str, subject: str) -> int:
+        self._ensure_loaded()  # 首次使用時讀取資料庫用量
+        with self._lock:
+            return self._totals.get((scope, subject), 0)  # 當月累計字元數
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}  # 取出待寫入用量
+            period = self._period  # 重新讀取的月份
+            self._last_flush = time.monotonic()  # 更新寫入時間
+        try:
+            if pending:
+                with SessionLocal() as db:
+                    add_translation_usage(db, pending)  # 一次寫入所有用量（各自寫入記錄時的月份）
+            with SessionLocal() as db:
+                stored = load_translation_usage(db, period)  # 重新讀取（含其他 worker 的用量）
+        except Exception:
+            logger.exception("寫入翻譯用量失敗")  # 記錄錯誤
+            with self._lock:
+                for key, (characters, requests) in pending.items():
+                    pending_chars, pending_requests = self._pending.get(key, (0, 0))  # 失敗期間新增的用量
+                    self._pending[key] = (pending_chars + characters, pending_requests + requests)  # 放回待寫入
+                self._flushing = False  # 允許下次重試
+            return 0  # 本次未寫入
+        with self._lock:
+            if period == self._period:
+                unflushed = {
+                    (scope, subject): characters
+                    for (pending_period, scope, subject), (characters, _) in self._pending.items()
+                    if pending_period == period
+                }  # 寫入期間新增的當月用量
+                self._totals = {key: stored.get(key, 0) + unflushed.get(key, 0) for key in {*stored, *unflushed}}  # 以資料庫總量為準
+                self._loaded = True  # 已同步資料庫
+            self._flushing = False  # 寫入完成
+            self.flushes += 1  # 累計寫入次數
+        return len(pending)  # 回傳寫入筆數
+
+    def stats(self, top_groups: int = 10) -> dict[str, Any]:
+        with self._lock:
+            providers = {subject: value for (scope, subject), value in self._totals.items() if scope == PROVIDER_SCOPE}  # 各來源用量
+            groups = sorted(
+                ((subject, value) for (scope, subject), value in self._totals.items() if scope == GROUP_SCOPE),
+                key=lambda item: item[1],
+                reverse=True,
+            )[:top_groups]  # 用量最高的群組
+            return {
+                "period": self._period,
+                "providers": providers,
+                "top_groups": [{"group_id": group_id, "characters": value} for group_id, value in groups],
+                "pending_keys": len(self._pending),
+                "flushes": self.flushes,
+            }  # 用量統計
+
+
+usage_tracker = UsageTracker(flush_interval_seconds=settings.usage_flush_interval_seconds)  # 程序內翻譯用量統計
+
+
+def provider_within_budget(provider: str) -> bool:
+    budget = settings.deepl_monthly_char_budget if provider == "deepl" else 0  # 目前只有 DeepL 有月額度
+    return budget <= 0 or usage_tracker.usage(PROVIDER_SCOPE, provider) < budget  # 未設定或尚未用完
+
+
+def group_over_budget(group_id: str | None) -> bool:
+    budget = settings.group_monthly_char_budget  # 每個群組每月字元上限
+    if not group_id or budget <= 0:
+        return False  # 未設定或非群組訊息
+    return usage_tracker.usage(GROUP_SCOPE, group_id) >= budget  # 是否已超量
+
+
+def allowed_providers(providers: list[str], group_id: str | None) -> list[str]:
+    rerouted = settings.group_budget_action == BUDGET_ACTION_REROUTE and group_over_budget(group_id)  # 超量群組改走免費來源
+    allowed = [
+        provider
+        for provider in providers
+        if provider_within_budget(provider) and not (rerouted and provider == "deepl")
+    ]  # 排除額度用完的來源
+    return allowed or providers[-1:]  # 至少保留最後的備援來源
+
+
+def limit_group_languages(group_id: str | None, language_codes: list[str]) -> list[str]:
+    if settings.group_budget_action != BUDGET_ACTION_LIMIT or not group_over_budget(group_id):
+        return language_codes  # 未超量時不限制
+    return language_codes[: max(1, settings.group_budget_max_languages)]  # 超量群組只翻譯前幾個語言
+
+
+def budget_settings() -> dict[str, Any]:
+    return {
+        "deepl_monthly_char_budget": settings.deepl_monthly_char_budget,
+        "group_monthly_char_budget": settings.group_monthly_char_budget,
+        "group_budget_action": settings.group_budget_action,
+        "group_budget_max_languages": settings.group_budget_max_languages,
+    }  # 目前額度政策
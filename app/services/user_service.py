@@ -0,0 +1,35 @@
+from sqlalchemy.ext.asyncio import AsyncSession  # 匯入 asyncio Session
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.core.languages import DEFAULT_LANGUAGE_CODE  # 匯入預設語言
+from app.repositories.user_repository import UserSnapshot, get_user_snapshots, insert_users_if_missing  # 匯入使用者存取
+from app.services.id_service import generate_member_codes  # 匯入編號服務
+
+
+def create_missing_users(db: Session, line_user_ids: list[str]) -> dict[str, UserSnapshot]:
+    user_ids = list(dict.fromkeys(user_id for user_id in line_user_ids if user_id))  # 去重並保留順序
+    if not user_ids:
+        return {}  # 無建立對象
+    member_codes = generate_member_codes(db, len(user_ids))  # 一次取得所有編號
+    users = insert_users_if_missing(db, list(zip(user_ids, member_codes)), DEFAULT_LANGUAGE_CODE)  # 單一 upsert 建立
+    raced = [user_id for user_id in user_ids if user_id not in users]  # 同時被其他 worker 建立的使用者
+    if raced:
+        users.update(get_user_snapshots(db, raced))  # 讀取對方建立的資料（其編號作廢）
+    return users  # LINE ID -> 使用者快照
+
+
+def provision_users(db: Session, line_user_ids: list[str]) -> dict[str, UserSnapshot]:
+    user_ids = list(dict.fromkeys(user_id for user_id in line_user_ids if user_id))  # 去重並保留順序
+    users = get_user_snapshots(db, user_ids)  # 先一次查詢既有使用者（避免已存在者也消耗編號）
+    missing = [user_id for user_id in user_ids if user_id not in users]  # 需建立的使用者
+    if missing:
+        users.update(create_missing_users(db, missing))  # 批次建立缺少的使用者
+    return users  # LINE ID -> 使用者快照
+
+
+def provision_user(db: Session, line_user_id: str) -> UserSnapshot:
+    return provision_users(db, [line_user_id])[line_user_id]  # 取得或建立單一使用者
+
+
+async def provision_users_async(db: AsyncSession, line_user_ids: list[str]) -> dict[str, UserSnapshot]:
+    return await db.run_sync(provision_users, line_user_ids)  # 查詢與建立走 asyncio driver
@@ -0,0 +1,172 @@
+import logging  # 匯入日誌工具
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from collections import OrderedDict  # 匯入有序字典（依到期順序淘汰）
+from datetime import datetime, timedelta  # 匯入時間型別
+from typing import Any  # 匯入型別提示
+
+from sqlalchemy.orm import Session  # 匯入 Session
+
+from app.core.config import settings  # 匯入設定
+from app.db.session import SessionLocal, get_async_sessionmaker  # 匯入資料庫 Session
+from app.repositories.webhook_event_repository import (
+    claim_webhook_event,
+    prune_webhook_events,
+    release_webhook_event,
+)  # 匯入已處理事件存取
+
+
+logger = logging.getLogger(__name__)  # 模組日誌
+
+DB_PRUNE_INTERVAL = 1000  # 每幾次資料庫登記清除一次過期紀錄
+
+
+class WebhookEventStore:
+    def __init__(self, enabled: bool, ttl_seconds: float, max_entries: int, use_database: bool) -> None:
+        self.enabled = enabled  # 是否啟用去重
+        self.ttl_seconds = ttl_seconds  # 事件 ID 保留秒數
+        self.max_entries = max(1, max_entries)  # 記憶體內上限
+        self.use_database = use_database  # 是否以資料庫跨 worker 共用
+        self._entries: OrderedDict[str, float] = OrderedDict()  # 事件 ID -> 到期時間（TTL 固定，插入順序即到期順序）
+        self._lock = threading.Lock()  # 執行緒鎖
+        self._db_claims = 0  # 資料庫登記次數（決定何時清除）
+        self.accepted = 0  # 首次出現的事件數
+        self.duplicates = 0  # 丟棄的重複事件數
+        self.redelivered_duplicates = 0  # 其中標記為重送的事件數
+        self.released = 0  # 處理失敗後釋放的事件數
+        self.db_errors = 0  # 資料庫存取失敗次數
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            expires_at = next(iter(self._entries.values()))  # 最早到期的事件
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                return  # 其餘皆未到期且未超量
+            self._entries.popitem(last=False)  # 移除過期或超量事件
+
+    def claim(self, event_id: str | None, is_redelivery: bool = False) -> bool:
+        if not self.enabled or not event_id:
+            return True  # 停用或沒有事件 ID 時一律處理
+        if not self._claim_in_memory(event_id, is_redelivery):
+            return False  # 同一 worker 已處理過
+        return self._finish_claim(not self.use_database or self._claim_in_database(event_id), is_redelivery)  # 跨 worker 登記
+
+    async def claim_async(self, event_id: str | None, is_redelivery: bool = False) -> bool:
+        if not self.enabled or not event_id:
+            return True  # 停用或沒有事件 ID 時一律處理
+        if not self._claim_in_memory(event_id, is_redelivery):
+            return False  # 同一 worker 已處理過
+        claimed = not self.use_database or await self._claim_in_database_async(event_id)  # 以 asyncio driver 跨 worker 登記
+        return self._finish_claim(claimed, is_redelivery)  # 回傳是否可處理
+
+    def _claim_in_memory(self, event_id: str, is_redelivery: bool) -> bool:
+        now = time.monotonic()  # 目前時間
+        with self._lock:
+            self._expire(now)  # 先清除過期事件
+            if event_id in self._entries:
+                self._count_duplicate(is_redelivery)  # 同一 worker 已處理過
+                return False
+            self._entries[event_id] = now + self.ttl_seconds  # 先在記憶體登記，擋住同時到達的重送
+        return True  # 記憶體登記成功
+
+    def _finish_claim(self, claimed: bool, is_redelivery: bool) -> bool:
+        with self._lock:
+            if not claimed:
+                self._count_duplicate(is_redelivery)  # 其他 worker 已處理過
+                return False
+            self.accepted += 1  # 累計首次事件
+        return True  # 可以處理
+
+    def _count_duplicate(self, is_redelivery: bool) -> None:
+        self.duplicates += 1  # 累計重複事件
+        if is_redelivery:
+            self.redelivered_duplicates += 1  # 累計重送事件
+
+    def _claim_window(self) -> tuple[datetime, datetime, bool]:
+        now = datetime.utcnow()  # 資料庫使用 UTC 時間
+        with self._lock:
+            self._db_claims += 1  # 累計登記次數
+            should_prune = self._db_claims % DB_PRUNE_INTERVAL == 0  # 是否該清除過期紀錄
+        return now, now + timedelta(seconds=self.ttl_seconds), should_prune  # (目前時間, 到期時間, 是否清除)
+
+    def _claim_in_database(self, event_id: str) -> bool:
+        now, expires_at, should_prune = self._claim_window()  # 登記時間與到期時間
+        try:
+            with SessionLocal() as db:
+                return _claim_and_prune(db, event_id, expires_at, now, should_prune)  # 跨 worker 登記
+        except Exception:
+            self._record_db_error("登記 webhook 事件失敗")  # 記錄錯誤
+            return True  # 資料庫異常時寧可處理，不丟棄事件
+
+    async def _claim_in_database_async(self, event_id: str) -> bool:
+        now, expires_at, should_prune = self._claim_window()  # 登記時間與到期時間
+        try:
+            async with get_async_sessionmaker()() as db:
+                return await db.run_sync(_claim_and_prune, event_id, expires_at, now, should_prune)  # 跨 worker 登記（不佔用事件迴圈）
+        except Exception:
+            self._record_db_error("登記 webhook 事件失敗")  # 記錄錯誤
+            return True  # 資料庫異常時寧可處理，不丟棄事件
+
+    def release(self, event_id: str | None) -> None:
+        if not self._release_in_memory(event_id) or not self.use_database:
+            return  # 沒有登記或不需更新資料庫
+        try:
+            with SessionLocal() as db:
+                release_webhook_event(db, event_id)  # 刪除資料庫紀錄
+        except Exception:
+            self._record_db_error("釋放 webhook 事件失敗")  # 記錄錯誤
+
+    async def release_async(self, event_id: str | None) -> None:
+        if not self._release_in_memory(event_id) or not self.use_database:
+            return  # 沒有登記或不需更新資料庫
+        try:
+            async with get_async_sessionmaker()() as db:
+                await db.run_sync(release_webhook_event, event_id)  # 以 asyncio driver 刪除資料庫紀錄
+        except Exception:
+            self._record_db_error("釋放 webhook 事件失敗")  # 記錄錯誤
+
+    def _release_in_memory(self, event_id: str | None) -> bool:
+        if not self.enabled or not event_id:
+            return False  # 沒有登記就不需釋放
+        with self._lock:
+            self._entries.pop(event_id, None)  # 讓 LINE 重送時可以重新處理
+            self.released += 1  # 累計釋放
+        return True  # 已釋放記憶體紀錄
+
+    def _record_db_error(self, message: str) -> None:
+        logger.exception(message)  # 記錄錯誤
+        with self._lock:
+            self.db_errors += 1  # 累計錯誤
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()  # 清空記憶體紀錄
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "use_database": self.use_database,
+                "ttl_seconds": self.ttl_seconds,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "accepted": self.accepted,
+                "duplicates": self.duplicates,
+                "redelivered_duplicates": self.redelivered_duplicates,
+                "released": self.released,
+                "db_errors": self.db_errors,
+            }  # 去重統計
+
+
+def _claim_and_prune(db: Session, event_id: str, expires_at: datetime, now: datetime, should_prune: bool) -> bool:
+    claimed = claim_webhook_event(db, event_id, expires_at, now)  # 跨 worker 登記
+    if should_prune:
+        prune_webhook_events(db, now)  # 順便清除過期紀錄
+    return claimed  # 回傳是否取得
+
+
+webhook_event_store = WebhookEventStore(
+    enabled=settings.webhook_dedup_enabled,
+    ttl_seconds=settings.webhook_dedup_ttl_seconds,
+    max_entries=settings.webhook_dedup_max_entries,
+    use_database=settings.webhook_dedup_db_enabled,
+)  # 全域 webhook 事件去重
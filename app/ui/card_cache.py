@@ -0,0 +1,88 @@
+import threading  # 匯入執行緒工具
+from collections import OrderedDict  # 匯入有序字典（LRU 用）
+from typing import Any, Callable  # 匯入型別提示
+
+from linebot.v3.messaging import FlexMessage  # 匯入 Flex 訊息
+
+from app.fanfan_core.language_profile import LEGACY_LANGUAGE_MENU_ITEMS  # 匯入舊版語言選單
+from app.fanfan_core.menu_builder import build_legacy_language_setting_card  # 匯入語言設定卡
+from app.ui.menu_cards import build_main_menu_card  # 匯入主選單小卡
+
+
+class PreparedMessage:
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self.payload = payload  # 已序列化的訊息 JSON（唯讀共用）
+
+    @property
+    def alt_text(self) -> str:
+        return self.payload.get("altText", "")  # 替代文字
+
+    def to_dict(self) -> dict[str, Any]:
+        return self.payload  # SDK 序列化時直接使用快取 JSON
+
+
+class FlexCardCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(0, max_entries)  # 最多快取小卡數（0 代表停用）
+        self._entries: OrderedDict[tuple, PreparedMessage] = OrderedDict()  # 小卡變體 -> 序列化結果
+        self._lock = threading.Lock()  # 執行緒鎖
+        self.hits = 0  # 命中數
+        self.misses = 0  # 未命中數
+
+    def get_or_build(self, key: tuple, builder: Callable[[], FlexMessage]) -> PreparedMessage:
+        with self._lock:
+            prepared = self._entries.get(key)  # 讀取快取
+            if prepared is not None:
+                self._entries.move_to_end(key)  # 標記為最近使用
+                self.hits += 1  # 命中
+                return prepared
+            self.misses += 1  # 未命中
+        prepared = PreparedMessage(builder().to_dict())  # 建立並序列化一次
+        if self.max_entries <= 0:
+            return prepared  # 停用時不寫入
+        with self._lock:
+            self._entries[key] = prepared  # 寫入快取
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)  # 淘汰最久未使用
+        return prepared  # 回傳序列化小卡
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }  # 快取統計
+
+
+def _main_menu_key(source_type: str, is_group_manager: bool) -> tuple:
+    is_group = source_type == "group"  # 小卡只區分群組與非群組
+    return ("main_menu", is_group, is_group and is_group_manager)  # 非群組時權限不影響內容
+
+
+def _language_card_key(selected_codes: list[str], source_type: str, can_manage_group: bool) -> tuple:
+    is_group = source_type == "group"  # 小卡只區分群組與非群組
+    return ("language_setting", tuple(selected_codes), is_group, (not is_group) or can_manage_group)  # 勾選順序會顯示在摘要中
+
+
+def get_main_menu_card(card_cache: FlexCardCache, source_type: str, is_group_manager: bool) -> PreparedMessage:
+    return card_cache.get_or_build(
+        _main_menu_key(source_type, is_group_manager),
+        lambda: build_main_menu_card(source_type=source_type, is_group_manager=is_group_manager),
+    )  # 取得主選單小卡
+
+
+def get_language_setting_card(card_cache: FlexCardCache, selected_codes: list[str], source_type: str, can_manage_group: bool) -> PreparedMessage:
+    return card_cache.get_or_build(
+        _language_card_key(selected_codes, source_type, can_manage_group),
+        lambda: build_legacy_language_setting_card(list(selected_codes), source_type, can_manage_group),
+    )  # 取得語言設定小卡
+
+
+def warm_up_card_cache(card_cache: FlexCardCache) -> int:
+    for source_type, is_manager in (("user", False), ("group", True), ("group", False)):
+        get_main_menu_card(card_cache, source_type, is_manager)  # 預建主選單
+        for _, _, _, code in LEGACY_LANGUAGE_MENU_ITEMS:
+            get_language_setting_card(card_cache, [code], source_type, is_manager)  # 預建單一語言設定卡
+    return card_cache.stats()["entries"]  # 回傳已快取數量
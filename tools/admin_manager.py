@@ -6,16 +6,24 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]  # 取得專案根目錄
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))  # 將專案根目錄加入模組搜尋路徑
 
-from app.core.languages import DEFAULT_LANGUAGE_CODE  # 匯入預設語言
-from app.db.session import SessionLocal, init_db  # 匯入資料庫工具
+from app.db.migrations import current_version, run_migrations  # 匯入遷移工具
+from app.db.query_plans import explain_hot_queries, find_sequential_scans  # 匯入查詢計畫檢查
+from app.db.session import SessionLocal, engine, init_db  # 匯入資料庫工具
 from app.repositories.user_repository import (  # 匯入使用者資料操作
-    create_user,
     get_user_by_line_id,
     get_user_by_member_code,
     list_admin_users,
     update_user_admin_flag,
 )
-from app.services.id_service import generate_member_code  # 匯入編號產生器
+from app.repositories.translation_memory_repository import (  # 匯入翻譯記憶資料操作
+    count_translation_memory,
+    list_top_translation_memory,
+    prune_translation_memory,
+    purge_translation_memory,
+    translation_memory_size,
+)
+from app.services.id_service import seed_member_code_counter  # 匯入編號計數器初始化
+from app.services.user_service import provision_user  # 匯入使用者建立服務
 
 
 def _find_user(line_user_id: str | None, member_code: str | None):
@@ -31,10 +39,10 @@ def _resolve_or_create_user(line_user_id: str | None, member_code: str | None, a
     with SessionLocal() as db:
         user = None  # 初始化 user
         if line_user_id:
-            user = get_user_by_line_id(db, line_user_id)  # 先用 LINE ID 查詢
-            if not user and auto_create:
-                new_member_code = generate_member_code(db)  # 產生新編號
-                user = create_user(db, line_user_id, new_member_code, DEFAULT_LANGUAGE_CODE)  # 自動建使用者
+            if auto_create:
+                user = provision_user(db, line_user_id)  # 查詢或以 upsert 建立使用者（不與 bot 同時建立衝突）
+            else:
+                user = get_user_by_line_id(db, line_user_id)  # 用 LINE ID 查詢
         elif member_code:
             user = get_user_by_member_code(db, member_code)  # 用 FAN 編號查詢
         return user  # 回傳查詢結果
@@ -82,6 +90,53 @@ def show_user(line_user_id: str | None, member_code: str | None) -> int:
     return 0  # 回傳成功
 
 
+def show_translation_memory(limit: int) -> int:
+    with SessionLocal() as db:
+        total = count_translation_memory(db)  # 總筆數
+        size = translation_memory_size(db)  # 總字元數
+        top_entries = list_top_translation_memory(db, limit)  # 熱門翻譯
+    print(f"翻譯記憶：{total} 筆，共 {size} 字元")  # 顯示統計
+    for entry in top_entries:
+        preview = entry.source_text.replace("\n", " ")[:30]  # 原文預覽
+        print(f"- [{entry.target_language}] {preview} | 命中 {entry.hit_count} | {entry.provider}")  # 逐筆輸出
+    return 0  # 正常結束
+
+
+def purge_translation_memory_entries(keep: int) -> int:
+    with SessionLocal() as db:
+        if keep > 0:
+            deleted = prune_translation_memory(db, keep)  # 只保留最近使用的 N 筆
+        else:
+            deleted = purge_translation_memory(db)  # 全部清除
+    print(f"已刪除 {deleted} 筆翻譯記憶。")  # 輸出結果
+    return 0  # 正常結束
+
+
+def migrate_database() -> int:
+    applied = run_migrations(engine)  # 套用尚未執行的遷移
+    if applied:
+        print(f"已套用遷移版本：{', '.join(str(version) for version in applied)}")  # 輸出本次版本
+    else:
+        print("資料庫已是最新版本。")  # 無需遷移
+    print(f"目前版本：{current_version(engine)}")  # 輸出目前版本
+    return 0  # 正常結束
+
+
+def check_query_plans(verbose: bool) -> int:
+    if verbose:
+        for name, plan_lines in explain_hot_queries(engine).items():
+            print(f"[{name}]")  # 查詢名稱
+            for line in plan_lines:
+                print(f"  {line}")  # 查詢計畫
+    problems = find_sequential_scans(engine)  # 找出全表掃描
+    if not problems:
+        print("熱門查詢皆使用索引。")  # 檢查通過
+        return 0  # 正常結束
+    for name, scans in problems.items():
+        print(f"全表掃描：{name} -> {' / '.join(scans)}")  # 輸出問題
+    return 1  # 回傳失敗
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="FanFan 管理員初始化工具")  # 建立 parser
     sub = parser.add_subparsers(dest="command", required=True)  # 建立子命令
@@ -100,12 +155,36 @@ def build_parser() -> argparse.ArgumentParser:
     show_parser.add_argument("--編號", "--member-code", dest="member_code", help="FAN 編號，例如 FAN000001")  # FAN 編號參數
 
     sub.add_parser("列出管理員", aliases=["list-admins"], help="列出所有管理員")  # 列表命令
+
+    memory_parser = sub.add_parser("查看翻譯記憶", aliases=["tm-stats"], help="查看翻譯記憶統計與熱門翻譯")  # 翻譯記憶統計
+    memory_parser.add_argument("--筆數", "--limit", dest="limit", type=int, default=10, help="列出熱門翻譯筆數")  # 列出筆數
+
+    purge_parser = sub.add_parser("清除翻譯記憶", aliases=["tm-purge"], help="清除或整理翻譯記憶")  # 翻譯記憶清除
+    purge_parser.add_argument("--保留", "--keep", dest="keep", type=int, default=0, help="只保留最近使用的 N 筆（預設全部清除）")  # 保留筆數
+
+    sub.add_parser("資料庫遷移", aliases=["migrate"], help="套用資料庫遷移")  # 遷移命令
+    plan_parser = sub.add_parser("檢查查詢計畫", aliases=["check-plans"], help="檢查熱門查詢是否使用索引")  # 查詢計畫檢查
+    plan_parser.add_argument("--詳細", "--verbose", dest="verbose", action="store_true", help="輸出完整查詢計畫")  # 詳細輸出
     return parser  # 回傳 parser
 
 
+NO_TARGET_COMMANDS = {
+    "列出管理員",
+    "list-admins",
+    "查看翻譯記憶",
+    "tm-stats",
+    "清除翻譯記憶",
+    "tm-purge",
+    "資料庫遷移",
+    "migrate",
+    "檢查查詢計畫",
+    "check-plans",
+}  # 不需指定使用者的命令
+
+
 def validate_identifier(args: argparse.Namespace) -> bool:
-    if args.command in {"列出管理員", "list-admins"}:
-        return True  # 列表不需要指定對象
+    if args.command in NO_TARGET_COMMANDS:
+        return True  # 列表、翻譯記憶與資料庫維護不需要指定對象
     if args.line_user_id or args.member_code:
         return True  # 有任何一個識別值即可
     print("請至少提供 --line-user-id 或 --member-code")  # 顯示參數錯誤
@@ -113,13 +192,19 @@ def validate_identifier(args: argparse.Namespace) -> bool:
 
 
 def main() -> int:
-    init_db()  # 確保資料表已建立
     parser = build_parser()  # 建立 parser
     args = parser.parse_args()  # 解析參數
 
     if not validate_identifier(args):
         return 1  # 參數不足
 
+    if args.command in {"資料庫遷移", "migrate"}:
+        return migrate_database()  # 遷移處理
+    init_db()  # 確保資料表已建立
+    seed_member_code_counter(engine)  # 對齊既有最大編號（建立使用者前）
+    if args.command in {"檢查查詢計畫", "check-plans"}:
+        return check_query_plans(args.verbose)  # 查詢計畫檢查
+
     if args.command in {"升級管理員", "promote"}:
         return promote_or_demote(args.line_user_id, args.member_code, True, args.auto_create)  # 升權處理
     if args.command in {"取消管理員", "demote"}:
@@ -128,6 +213,10 @@ def main() -> int:
         return show_user(args.line_user_id, args.member_code)  # 查詢處理
     if args.command in {"列出管理員", "list-admins"}:
         return list_admins()  # 列表處理
+    if args.command in {"查看翻譯記憶", "tm-stats"}:
+        return show_translation_memory(args.limit)  # 翻譯記憶統計
+    if args.command in {"清除翻譯記憶", "tm-purge"}:
+        return purge_translation_memory_entries(args.keep)  # 翻譯記憶清除
 
     print("不支援的命令")  # 防禦性分支
     return 1  # 回傳失敗
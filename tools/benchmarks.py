@@ -0,0 +1,306 @@
+import argparse  # 匯入命令列參數工具
+import itertools  # 匯入計數工具
+import json  # 匯入 JSON 工具
+import os  # 匯入環境變數工具
+import statistics  # 匯入統計工具
+import sys  # 匯入系統模組
+import tempfile  # 匯入暫存目錄工具
+import time  # 匯入計時工具
+from pathlib import Path  # 匯入路徑工具
+from typing import Callable, Iterator  # 匯入型別提示
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # 取得專案根目錄
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))  # 將專案根目錄加入模組搜尋路徑
+
+WORKDIR = tempfile.mkdtemp(prefix="fanfan-bench-")  # 基準測試專用暫存目錄
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/app.db"  # 與正式資料庫隔離
+os.environ["DEEPL_API_KEY"] = "bench:fx"  # 讓翻譯走 DeepL + Google 完整路徑（皆為假來源）
+os.environ["TRANSLATION_MEMORY_ENABLED"] = "false"  # 不寫入翻譯記憶避免背景 I/O 干擾
+os.environ["REPLY_DEADLINE_SECONDS"] = "0"  # 不受事件期限影響
+os.environ["CARD_CACHE_WARM_UP"] = "false"  # 小卡由基準測試自行控制
+os.environ["DEEPL_RATE_PER_SECOND"] = "0"  # 不受用戶端限速影響
+os.environ["GOOGLE_RATE_PER_SECOND"] = "0"  # 不受用戶端限速影響
+
+from linebot.v3.webhooks import DeliveryContext, GroupSource, MessageEvent, TextMessageContent, UserSource  # 匯入事件模型
+from sqlalchemy import create_engine, insert  # 匯入資料庫工具
+from sqlalchemy.orm import sessionmaker  # 匯入 Session 工廠
+
+from app.core.database import normalize_database_url  # 匯入資料庫 URL 處理
+from app.core.languages import SUPPORTED_LANGUAGES  # 匯入語言設定
+from app.db.migrations import run_migrations  # 匯入遷移工具
+from app.db.models import GroupLanguageSelection, GroupSetting, UserProfile  # 匯入模型
+from app.db.session import init_db  # 匯入資料庫初始化
+from app.fanfan_core.formatting import format_translation_results  # 匯入多語輸出
+from app.repositories.group_repository import get_group_languages, set_group_languages  # 匯入群組語言存取
+from app.services.id_service import format_member_code, generate_member_code, seed_member_code_counter  # 匯入編號服務
+from app.services import translation_service  # 匯入翻譯服務
+from app.ui.card_cache import FlexCardCache, get_language_setting_card, get_main_menu_card  # 匯入小卡快取
+from app.ui.menu_cards import build_language_setting_card, build_main_menu_card  # 匯入小卡建構函式
+import app.bot.handlers as handlers  # 匯入 LINE 事件處理器
+
+
+DEFAULT_BASELINE = PROJECT_ROOT / "tools" / "benchmark_baseline.json"  # 預設基準檔
+DEFAULT_THRESHOLD = 0.25  # 預設允許變慢比例
+MIN_REGRESSION_US = 5.0  # 校正後差距小於此微秒數時視為雜訊
+REPEATS = 7  # 每項重複量測次數（比較時取最小值，排除排程干擾）
+ALL_LANGUAGE_CODES = list(SUPPORTED_LANGUAGES.values())  # 全部 9 種語言
+GROUP_FIXTURE_SIZE = 1000  # 群組資料筆數
+
+Benchmark = tuple[str, Callable[[], object]]  # (名稱, 受測函式)
+
+
+def _mock_provider(text: str, target_language_code: str, deadline: float | None = None) -> str:
+    return f"[{target_language_code}] {text}"  # 假翻譯來源（不連網）
+
+
+def _session_factory(database_url: str):
+    engine = create_engine(normalize_database_url(database_url), future=True)  # 建立獨立引擎
+    run_migrations(engine)  # 建立資料表
+    return engine, sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)  # 回傳引擎與 Session 工廠
+
+
+def _reset_tables(engine) -> None:
+    with engine.begin() as connection:
+        for table in (GroupLanguageSelection.__table__, GroupSetting.__table__, UserProfile.__table__):
+            connection.execute(table.delete())  # 清空既有資料（Postgres 基準資料庫可重複使用）
+
+
+def _seed_groups(engine, count: int) -> list[str]:
+    group_ids = [f"Cbench{index:05d}" for index in range(count)]  # 群組 ID
+    with engine.begin() as connection:
+        connection.execute(insert(GroupSetting), [{"line_group_id": group_id, "target_language": "zh-TW"} for group_id in group_ids])  # 批次建立群組
+        connection.execute(
+            insert(GroupLanguageSelection),
+            [{"line_group_id": group_id, "language_code": code} for group_id in group_ids for code in ("zh-TW", "en", "th")],
+        )  # 每個群組三種語言
+    return group_ids  # 回傳群組 ID
+
+
+def _seed_users(engine, count: int) -> None:
+    rows = [
+        {"line_user_id": f"Ubench{number:07d}", "member_code": format_member_code(number), "target_language": "zh-TW", "is_admin": False}
+        for number in range(1, count + 1)
+    ]  # 既有使用者
+    with engine.begin() as connection:
+        for start in range(0, len(rows), 10000):
+            connection.execute(insert(UserProfile), rows[start : start + 10000])  # 分批寫入
+
+
+def translation_benchmarks() -> Iterator[Benchmark]:
+    translation_service.SYNC_PROVIDERS.update(deepl=_mock_provider, google=_mock_provider)  # 改用假來源
+    translation_service.translate_text("Good morning everyone", "ja")  # 預先寫入快取
+    yield "translate_text[cache_hit]", lambda: translation_service.translate_text("Good morning everyone", "ja")
+    counter = itertools.count()  # 讓每次原文不同
+    yield "translate_text[provider]", lambda: translation_service.translate_text(f"Meeting at {next(counter)} o'clock", "ja")
+    yield "translate_text[same_language]", lambda: translation_service.translate_text("今天晚上幾點集合", "zh-TW")
+
+
+def formatting_benchmarks() -> Iterator[Benchmark]:
+    for count in range(1, len(ALL_LANGUAGE_CODES) + 1):
+        codes = ALL_LANGUAGE_CODES[:count]  # 前 n 種語言
+        yield (
+            f"format_translation_results[{count}_languages]",
+            lambda codes=codes: format_translation_results("Good morning everyone", codes, _mock_provider),
+        )
+
+
+def group_benchmarks(label: str, database_url: str) -> Iterator[Benchmark]:
+    engine, session_factory = _session_factory(database_url)  # 獨立資料庫
+    _reset_tables(engine)  # 清空資料
+    group_ids = _seed_groups(engine, GROUP_FIXTURE_SIZE)  # 建立群組資料
+    db = session_factory()  # 共用 Session（模擬單一請求內多次查詢）
+    lookups = itertools.cycle(group_ids)  # 輪流讀取不同群組
+    yield f"get_group_languages[{label}]", lambda: get_group_languages(db, next(lookups))
+    toggles = itertools.cycle([["zh-TW", "en", "th"], ["zh-TW", "en", "ja"]])  # 交替設定觸發差異更新
+    yield f"set_group_languages[{label}]", lambda: set_group_languages(db, group_ids[0], next(toggles))
+    db.close()  # 關閉 Session
+    engine.dispose()  # 釋放連線
+
+
+def member_code_benchmarks(label: str, database_url: str, user_counts: list[int]) -> Iterator[Benchmark]:
+    for count in user_counts:
+        engine, session_factory = _session_factory(database_url.format(count=count))  # 每種規模使用獨立資料庫（SQLite）
+        _reset_tables(engine)  # 清空資料
+        _seed_users(engine, count)  # 建立既有使用者
+        db = session_factory()  # 共用 Session
+        seed_member_code_counter(engine)  # 與正式啟動相同，先對齊既有編號
+        yield f"generate_member_code[{label},{count}_users]", lambda db=db: generate_member_code(db)
+        db.close()  # 關閉 Session
+        engine.dispose()  # 釋放連線
+
+
+def card_benchmarks() -> Iterator[Benchmark]:
+    yield "build_main_menu_card[uncached]", lambda: build_main_menu_card("group", True).to_dict()
+    yield "build_language_setting_card[uncached]", lambda: build_language_setting_card(["zh-TW", "en", "th"], "group", True).to_dict()
+    card_cache = FlexCardCache(max_entries=64)  # 基準測試專用快取
+    yield "get_main_menu_card[cached]", lambda: get_main_menu_card(card_cache, "group", True).to_dict()
+    yield "get_language_setting_card[cached]", lambda: get_language_setting_card(card_cache, ["zh-TW", "en", "th"], "group", True).to_dict()
+
+
+_event_ids = itertools.count()  # 每個事件使用不同 webhookEventId（避免被去重丟棄）
+
+
+def _text_event(text: str, group_id: str | None, user_id: str) -> MessageEvent:
+    source = GroupSource(type="group", groupId=group_id, userId=user_id) if group_id else UserSource(type="user", userId=user_id)  # 事件來源
+    return MessageEvent(
+        type="message",
+        mode="active",
+        timestamp=int(time.time() * 1000),
+        source=source,
+        webhookEventId=f"bench{next(_event_ids)}",
+        deliveryContext=DeliveryContext(isRedelivery=False),
+        replyToken="bench",
+        message=TextMessageContent(type="text", id="1", text=text, quoteToken="q"),
+    )  # 文字訊息事件
+
+
+def dispatch_benchmarks() -> Iterator[Benchmark]:
+    translation_service.SYNC_PROVIDERS.update(deepl=_mock_provider, google=_mock_provider)  # 改用假來源
+    handlers._reply_messages = lambda reply_token, messages: None  # 不實際回覆 LINE
+    dispatch = handlers.line_handler.dispatch_event  # 事件分派
+    for text in ("綁定邀請者", "設定語言 中文,英文,泰文"):
+        dispatch(_text_event(text, "Cbenchdispatch", "Ubenchowner"))  # 建立群組設定
+    counter = itertools.count()  # 讓每次原文不同
+    yield "handle_text_message[group_3_languages]", lambda: dispatch(
+        _text_event(f"See you at {next(counter)}", "Cbenchdispatch", "Ubenchmember")
+    )
+    yield "handle_text_message[user]", lambda: dispatch(_text_event(f"Thanks {next(counter)}", None, "Ubenchmember"))
+    yield "handle_text_message[language_menu]", lambda: dispatch(_text_event("語言設定", "Cbenchdispatch", "Ubenchmember"))
+
+
+def _calibration_loop() -> int:
+    table: dict[str, int] = {}  # 固定份量的純 Python 工作（字串、字典、迴圈）
+    for index in range(2000):
+        key = f"k{index % 64}"  # 組字串
+        table[key] = table.get(key, 0) + index  # 字典讀寫
+    return sum(table.values())  # 回傳結果避免被省略
+
+
+def _calls_per_round(func: Callable[[], object], round_time: float) -> int:
+    func()  # 暖機
+    number = 1  # 每輪呼叫次數
+    while True:
+        if _time_round(func, number) >= round_time or number >= 1_000_000:
+            return number  # 每輪時間足夠
+        number *= 2  # 加倍呼叫次數
+
+
+def _time_round(func: Callable[[], object], number: int) -> float:
+    started = time.perf_counter()  # 開始計時
+    for _ in range(number):
+        func()  # 執行受測函式
+    return time.perf_counter() - started  # 本輪耗時
+
+
+def measure(func: Callable[[], object], min_time: float) -> dict[str, float]:
+    number = _calls_per_round(func, min_time / REPEATS)  # 受測函式每輪呼叫次數
+    calibration_number = _calls_per_round(_calibration_loop, min_time / REPEATS / 2)  # 校正迴圈每輪呼叫次數
+    samples: list[float] = []  # 每次呼叫平均耗時
+    calibrations: list[float] = []  # 同一輪校正迴圈每次平均耗時
+    for _ in range(REPEATS):
+        calibrations.append(_time_round(_calibration_loop, calibration_number) / calibration_number)  # 緊鄰受測前量測機器速度
+        samples.append(_time_round(func, number) / number)  # 記錄平均耗時
+    ratios = [sample / calibration for sample, calibration in zip(samples, calibrations)]  # 每輪相對校正迴圈的耗時
+    return {
+        "median_us": round(statistics.median(samples) * 1_000_000, 3),
+        "min_us": round(min(samples) * 1_000_000, 3),
+        "calls_per_round": number,
+        "calibration_us": round(min(calibrations) * 1_000_000, 3),
+        "relative": round(statistics.median(ratios), 6),
+    }  # 量測結果（共用主機的速度會隨時間浮動，比較時以 relative 為準）
+
+
+def normalized_us(result: dict[str, float], previous: dict[str, float]) -> float:
+    if not result.get("relative") or not previous.get("relative"):
+        return result["min_us"]  # 舊基準檔沒有校正值
+    return previous["min_us"] * result["relative"] / previous["relative"]  # 換算成錄製基準時的機器速度
+
+
+def collect_benchmarks(args) -> Iterator[Benchmark]:
+    init_db()  # 建立應用程式資料表
+    yield from translation_benchmarks()  # 翻譯服務
+    yield from formatting_benchmarks()  # 多語輸出
+    yield from card_benchmarks()  # 小卡
+    yield from group_benchmarks("sqlite", f"sqlite:///{WORKDIR}/groups.db")  # SQLite 群組語言
+    yield from member_code_benchmarks("sqlite", f"sqlite:///{WORKDIR}/members_{{count}}.db", args.user_counts)  # SQLite 編號
+    if args.postgres_url:
+        yield from group_benchmarks("postgres", args.postgres_url)  # Postgres 群組語言
+        yield from member_code_benchmarks("postgres", args.postgres_url, args.user_counts)  # Postgres 編號
+    yield from dispatch_benchmarks()  # 完整事件處理
+
+
+def _regressed(result: dict[str, float], previous: dict[str, float] | None, threshold: float) -> bool:
+    if not previous:
+        return False  # 新項目沒有基準
+    current = normalized_us(result, previous)  # 以同輪校正迴圈換算機器速度差異
+    return current > previous["min_us"] * (1 + threshold) and current - previous["min_us"] > MIN_REGRESSION_US  # 是否超過門檻
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    regressions: list[str] = []  # 變慢的項目
+    for name, result in results.items():
+        previous = baseline.get(name)  # 基準值
+        if not previous:
+            print(f"{name:55} {result['min_us']:>12.1f} µs  （新項目）")  # 無基準
+            continue
+        current = normalized_us(result, previous)  # 換算成錄製基準時的耗時
+        speed = result["calibration_us"] / previous["calibration_us"] if previous.get("calibration_us") else 1.0  # 本機相對速度
+        ratio = current / previous["min_us"] if previous["min_us"] else 1.0  # 相對基準（等同兩次 relative 的比值）
+        regressed = _regressed(result, previous, threshold)  # 是否超過門檻
+        marker = "  ⚠️ 變慢" if regressed else ""  # 標記
+        print(
+            f"{name:55} {current:>12.1f} µs  基準 {previous['min_us']:>10.1f} µs  {ratio:>6.2f}x  （校正 {speed:.2f}x）{marker}"
+        )  # 輸出比較（已換算的耗時）
+        if regressed:
+            regressions.append(name)  # 記錄變慢項目
+    return regressions  # 回傳變慢項目
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="翻翻君熱門函式基準測試（可作為效能回歸檢查）")  # 建立 parser
+    parser.add_argument("--基準檔", "--baseline", dest="baseline", default=str(DEFAULT_BASELINE), help="基準 JSON 路徑")
+    parser.add_argument("--儲存", "--save", dest="save", action="store_true", help="將本次結果寫入基準檔")
+    parser.add_argument("--門檻", "--threshold", dest="threshold", type=float, default=DEFAULT_THRESHOLD, help="允許變慢比例（0.25 = 25%%）")
+    parser.add_argument("--篩選", "--filter", dest="filter", default="", help="只執行名稱包含此字串的項目")
+    parser.add_argument("--最短秒數", "--min-time", dest="min_time", type=float, default=0.5, help="每項最短量測秒數")
+    parser.add_argument(
+        "--使用者數",
+        "--user-counts",
+        dest="user_counts",
+        type=lambda raw: [int(part) for part in raw.split(",") if part],
+        default=[10_000, 100_000],
+        help="產生編號前的既有使用者數（逗號分隔）",
+    )
+    parser.add_argument("--postgres-url", default="", help="另以 Postgres 執行資料庫項目（會清空 user/group 資料表，請使用測試資料庫）")
+    return parser  # 回傳 parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()  # 解析參數
+    baseline_path = Path(args.baseline)  # 基準檔
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}  # 讀取基準
+    results: dict[str, dict] = {}  # 本次結果
+    for name, func in collect_benchmarks(args):
+        if args.filter and args.filter not in name:
+            continue  # 略過未選取項目
+        result = measure(func, args.min_time)  # 量測（每輪搭配校正迴圈）
+        if not args.save and _regressed(result, baseline.get(name), args.threshold):
+            retry = measure(func, args.min_time)  # 疑似變慢時立即重測一次（排除短暫干擾）
+            result = min(result, retry, key=lambda item: item["relative"])  # 兩次都變慢才算回歸
+        results[name] = result  # 記錄結果
+    regressions = compare(results, baseline, args.threshold)  # 與基準比較
+    if args.save:
+        merged = {**baseline, **results}  # 保留未執行項目的基準
+        baseline_path.write_text(json.dumps(merged, ensure_ascii=False, indent=2, sort_keys=True) + "\n", encoding="utf-8")  # 寫入基準
+        print(f"已寫入基準：{baseline_path}")  # 提示
+        return 0  # 儲存模式不判定失敗
+    if regressions:
+        print(f"共有 {len(regressions)} 項變慢超過 {args.threshold:.0%}：{', '.join(regressions)}")  # 回歸摘要
+        return 1  # 回傳失敗
+    print("沒有超過門檻的效能回歸。")  # 通過
+    return 0  # 回傳成功
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())  # 以退出碼結束
@@ -0,0 +1,410 @@
+import argparse  # 匯入命令列參數工具
+import asyncio  # 匯入 asyncio 工具
+import base64  # 匯入 Base64 編碼
+import hashlib  # 匯入雜湊工具
+import hmac  # 匯入 HMAC 簽章
+import json  # 匯入 JSON 工具
+import os  # 匯入環境變數工具
+import random  # 匯入亂數工具
+import socket  # 匯入網路工具
+import subprocess  # 匯入子程序工具
+import sys  # 匯入系統模組
+import tempfile  # 匯入暫存目錄工具
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 匯入本機 HTTP 伺服器
+from pathlib import Path  # 匯入路徑工具
+from urllib.parse import parse_qs, urlparse  # 匯入網址解析
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # 取得專案根目錄
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))  # 將專案根目錄加入模組搜尋路徑
+
+import httpx  # 匯入 asyncio HTTP 客戶端
+
+from app.core.statistics import percentile  # 匯入百分位數工具
+
+
+CHANNEL_SECRET = "loadtest-secret"  # 壓測用 LINE Channel Secret
+DEFAULT_MIX = "group_text=70,user_text=20,follow=5,join=5"  # 預設事件比例
+EVENT_KINDS = ("group_text", "user_text", "follow", "join")  # 支援的事件種類
+SAMPLE_TEXTS = [
+    "今天晚上幾點集合？",
+    "Can you send me the schedule for tomorrow?",
+    "วันนี้ทำงานถึงกี่โมง",
+    "Hôm nay mấy giờ tan ca?",
+    "내일 회의는 몇 시예요?",
+    "明日は何時に出発しますか？",
+    "Besok kita berangkat jam berapa?",
+    "Во сколько завтра встреча?",
+]  # 多語測試句
+
+
+class StandInState:
+    def __init__(self, latency: dict[str, float], error_rate: dict[str, float], jitter: float) -> None:
+        self.latency = latency  # 各 API 模擬延遲（秒）
+        self.error_rate = error_rate  # 各 API 錯誤比例
+        self.jitter = jitter  # 延遲抖動比例
+        self.lock = threading.Lock()  # 統計鎖
+        self.calls = {name: 0 for name in latency}  # 各 API 呼叫次數
+        self.errors = {name: 0 for name in latency}  # 各 API 注入錯誤次數
+        self.replies: dict[str, float] = {}  # replyToken → 收到回覆的時間
+
+    def simulate(self, api: str) -> bool:
+        delay = self.latency[api] * (1 + random.uniform(-self.jitter, self.jitter))  # 加入抖動
+        if delay > 0:
+            time.sleep(delay)  # 模擬延遲
+        failed = random.random() < self.error_rate[api]  # 是否注入錯誤
+        with self.lock:
+            self.calls[api] += 1  # 累計呼叫
+            if failed:
+                self.errors[api] += 1  # 累計錯誤
+        return not failed  # 回傳是否成功
+
+
+def _make_stand_in_handler(state: StandInState) -> type[BaseHTTPRequestHandler]:
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支援 keep-alive
+
+        def log_message(self, format: str, *args) -> None:
+            pass  # 不輸出存取紀錄
+
+        def _send(self, status: int, payload) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")  # 序列化回應
+            self.send_response(status)  # 狀態碼
+            self.send_header("Content-Type", "application/json")  # 內容類型
+            self.send_header("Content-Length", str(len(body)))  # 內容長度
+            self.end_headers()  # 結束標頭
+            self.wfile.write(body)  # 寫出內容
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))  # 讀取請求內容
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)  # 解析網址
+            if url.path != "/translate_a/single":
+                self._send(404, {"message": "not found"})  # 未知路徑
+                return
+            query = parse_qs(url.query)  # 解析參數
+            if not state.simulate("google"):
+                self._send(500, {"message": "injected error"})  # 注入錯誤
+                return
+            text = query.get("q", [""])[0]  # 原文
+            target = query.get("tl", [""])[0]  # 目標語言
+            self._send(200, [[[f"[{target}] {text}", text, None, None]]])  # Google 格式回應
+
+        def do_POST(self) -> None:
+            url = urlparse(self.path)  # 解析網址
+            body = self._read_body()  # 讀取內容
+            if url.path == "/v2/translate":
+                form = parse_qs(body.decode("utf-8"))  # 解析表單
+                if not state.simulate("deepl"):
+                    self._send(429, {"message": "injected error"})  # 注入錯誤（模擬額度不足）
+                    return
+                text = form.get("text", [""])[0]  # 原文
+                target = form.get("target_lang", [""])[0]  # 目標語言
+                self._send(200, {"translations": [{"detected_source_language": "ZH", "text": f"[{target}] {text}"}]})  # DeepL 格式回應
+                return
+            if url.path == "/v2/bot/message/reply":
+                payload = json.loads(body or b"{}")  # 解析回覆請求
+                if not state.simulate("line"):
+                    self._send(500, {"message": "injected error"})  # 注入錯誤
+                    return
+                with state.lock:
+                    state.replies.setdefault(payload.get("replyToken", ""), time.monotonic())  # 記錄回覆時間
+                self._send(200, {"sentMessages": [{"id": "1", "quoteToken": "q"}]})  # LINE 格式回應
+                return
+            self._send(404, {"message": "not found"})  # 未知路徑
+
+    return StandInHandler  # 回傳處理器類別
+
+
+def start_stand_ins(state: StandInState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_stand_in_handler(state))  # 隨機埠啟動
+    server.daemon_threads = True  # 結束時不等待連線
+    threading.Thread(target=server.serve_forever, name="stand-ins", daemon=True).start()  # 背景執行
+    return server  # 回傳伺服器
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))  # 取得可用埠
+        return sock.getsockname()[1]  # 回傳埠號
+
+
+def start_app(stand_in_url: str, app_env: list[str], workdir: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()  # 應用程式埠號
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{workdir}/loadtest.db",
+        "LINE_CHANNEL_SECRET": CHANNEL_SECRET,
+        "LINE_CHANNEL_ACCESS_TOKEN": "loadtest-token",
+        "LINE_API_HOST": stand_in_url,
+        "DEEPL_API_KEY": "loadtest:fx",
+        "DEEPL_API_URL": f"{stand_in_url}/v2/translate",
+        "GOOGLE_TRANSLATE_URL": f"{stand_in_url}/translate_a/single",
+        "PYTHONPATH": str(PROJECT_ROOT),
+    }  # 指向本機替身的環境變數
+    for item in app_env:
+        key, _, value = item.partition("=")  # 解析 KEY=VALUE
+        env[key] = value  # 額外設定
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=env,
+    )  # 啟動應用程式
+    return process, f"http://127.0.0.1:{port}"  # 回傳程序與網址
+
+
+async def wait_until_ready(client: httpx.AsyncClient, base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout  # 等待期限
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/")).status_code == 200:
+                return  # 應用程式已就緒
+        except httpx.HTTPError:
+            pass  # 尚未啟動
+        await asyncio.sleep(0.2)  # 稍後重試
+    raise RuntimeError("應用程式未在時間內啟動")  # 啟動逾時
+
+
+def parse_mix(raw: str) -> dict[str, float]:
+    mix: dict[str, float] = {}  # 事件比例
+    for part in raw.split(","):
+        kind, _, weight = part.partition("=")  # 解析 kind=weight
+        kind = kind.strip()  # 清理空白
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"不支援的事件種類：{kind}")  # 防呆
+        mix[kind] = float(weight or 0)  # 記錄權重
+    return mix  # 回傳比例
+
+
+def _base_event(event_type: str, source: dict, reply_token: str, seq: int) -> dict:
+    return {
+        "type": event_type,
+        "mode": "active",
+        "timestamp": int(time.time() * 1000),
+        "source": source,
+        "webhookEventId": f"LT{seq:010d}",
+        "deliveryContext": {"isRedelivery": False},
+        "replyToken": reply_token,
+    }  # 共用事件欄位
+
+
+def build_event(kind: str, seq: int, group_id: str, user_id: str, text: str) -> dict:
+    reply_token = f"lt-{seq}"  # 唯一 replyToken（用於對應回覆時間）
+    if kind == "follow":
+        event = _base_event("follow", {"type": "user", "userId": user_id}, reply_token, seq)  # 加好友事件
+        event["follow"] = {"isUnblocked": False}  # 加好友細節
+        return event
+    if kind == "join":
+        return _base_event("join", {"type": "group", "groupId": group_id}, reply_token, seq)  # 加入群組事件
+    if kind == "group_text":
+        source = {"type": "group", "groupId": group_id, "userId": user_id}  # 群組來源
+    else:
+        source = {"type": "user", "userId": user_id}  # 個人來源
+    event = _base_event("message", source, reply_token, seq)  # 文字訊息事件
+    event["message"] = {"type": "text", "id": str(seq), "text": text, "quoteToken": f"q{seq}"}  # 訊息內容
+    return event
+
+
+def sign_body(body: bytes) -> str:
+    return base64.b64encode(hmac.new(CHANNEL_SECRET.encode("utf-8"), body, hashlib.sha256).digest()).decode("utf-8")  # LINE 簽章
+
+
+class LoadRunner:
+    def __init__(self, client: httpx.AsyncClient, base_url: str) -> None:
+        self.client = client  # HTTP 客戶端
+        self.base_url = base_url  # 應用程式網址
+        self.seq = 0  # 事件流水號
+        self.sent_at: dict[str, float] = {}  # replyToken → 送出時間
+        self.webhook_latencies: list[float] = []  # webhook 回應耗時
+        self.statuses: dict[str, int] = {}  # HTTP 狀態統計
+
+    def next_seq(self) -> int:
+        self.seq += 1  # 流水號遞增
+        return self.seq  # 回傳流水號
+
+    async def post_events(self, events: list[dict], measure: bool = True) -> None:
+        body = json.dumps({"destination": "Uloadtest", "events": events}, ensure_ascii=False).encode("utf-8")  # webhook 內容
+        started = time.monotonic()  # 送出時間
+        if measure:
+            for event in events:
+                self.sent_at[event["replyToken"]] = started  # 記錄送出時間
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/webhook/line",
+                content=body,
+                headers={"Content-Type": "application/json", "X-Line-Signature": sign_body(body)},
+            )  # 送出 webhook
+            status = str(response.status_code)  # HTTP 狀態
+        except httpx.HTTPError as exc:
+            status = type(exc).__name__  # 連線錯誤
+        if measure:
+            self.webhook_latencies.append(time.monotonic() - started)  # 記錄耗時
+            self.statuses[status] = self.statuses.get(status, 0) + 1  # 累計狀態
+
+
+async def prepare_groups(runner: LoadRunner, groups: list[str], owners: list[str], languages: str) -> None:
+    for group_id, owner in zip(groups, owners):
+        for kind, text in (("join", ""), ("group_text", "綁定邀請者"), ("group_text", f"設定語言 {languages}")):
+            await runner.post_events([build_event(kind, runner.next_seq(), group_id, owner, text)], measure=False)  # 依序建立群組設定
+
+
+async def run_load(args, runner: LoadRunner, state: StandInState) -> dict:
+    mix = parse_mix(args.mix)  # 事件比例
+    kinds, weights = list(mix), list(mix.values())  # 抽樣清單
+    groups = [f"Cloadtest{index:04d}" for index in range(args.groups)]  # 群組 ID
+    users = [f"Uloadtest{index:05d}" for index in range(args.users)]  # 使用者 ID
+    await prepare_groups(runner, groups, users[: len(groups)] or users, args.group_languages)  # 預先設定群組語言
+
+    total = int(args.rate * args.duration)  # 總 webhook 數
+    semaphore = asyncio.Semaphore(args.concurrency)  # 同時連線上限
+    tasks: list[asyncio.Task] = []  # 進行中的請求
+
+    async def _send(events: list[dict]) -> None:
+        async with semaphore:
+            await runner.post_events(events)  # 送出事件
+
+    started = time.monotonic()  # 壓測開始時間
+    for index in range(total):
+        delay = started + index / args.rate - time.monotonic()  # 依速率排程
+        if delay > 0:
+            await asyncio.sleep(delay)  # 等待下一個時間點
+        events = []  # 本次 webhook 事件
+        for _ in range(args.batch):
+            seq = runner.next_seq()  # 流水號
+            text = random.choice(SAMPLE_TEXTS)  # 隨機句子
+            if random.random() < args.unique_ratio:
+                text = f"{text} #{seq}"  # 讓部分訊息無法命中快取
+            events.append(build_event(random.choices(kinds, weights)[0], seq, random.choice(groups), random.choice(users), text))  # 依比例抽樣
+        tasks.append(asyncio.create_task(_send(events)))  # 非同步送出
+    await asyncio.gather(*tasks)  # 等待所有 webhook 回應
+    send_elapsed = time.monotonic() - started  # 送出耗時
+
+    drain_deadline = time.monotonic() + args.drain  # 等待回覆期限
+    while time.monotonic() < drain_deadline:
+        with state.lock:
+            received = sum(1 for token in runner.sent_at if token in state.replies)  # 已收到回覆數
+        if received >= len(runner.sent_at):
+            break  # 全部回覆完成
+        await asyncio.sleep(0.1)  # 稍後再檢查
+    elapsed = time.monotonic() - started  # 總耗時
+    return summarize(args, runner, state, send_elapsed, elapsed)  # 彙整結果
+
+
+def _latency_summary(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)  # 排序
+    return {
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 1),
+    }  # 百分位數摘要
+
+
+def summarize(args, runner: LoadRunner, state: StandInState, send_elapsed: float, elapsed: float) -> dict:
+    with state.lock:
+        reply_latencies = [state.replies[token] - sent for token, sent in runner.sent_at.items() if token in state.replies]  # 回覆耗時
+        calls, errors = dict(state.calls), dict(state.errors)  # 替身統計
+    events = len(runner.sent_at)  # 事件數
+    on_time = sum(1 for latency in reply_latencies if latency <= args.reply_token_ttl)  # 期限內回覆數
+    return {
+        "events": events,
+        "webhooks": len(runner.webhook_latencies),
+        "target_rate": args.rate * args.batch,
+        "send_rate": round(events / send_elapsed, 1) if send_elapsed else 0.0,
+        "reply_throughput": round(on_time / elapsed, 1) if elapsed else 0.0,
+        "http_statuses": runner.statuses,
+        "webhook_latency": _latency_summary(runner.webhook_latencies),
+        "replies": len(reply_latencies),
+        "replies_on_time": on_time,
+        "replies_missing": events - len(reply_latencies),
+        "reply_latency": _latency_summary(reply_latencies),
+        "stand_in_calls": calls,
+        "stand_in_errors": errors,
+    }  # 壓測結果
+
+
+def print_report(result: dict) -> None:
+    print(f"事件數：{result['events']}（webhook {result['webhooks']} 次）")  # 事件數
+    print(f"目標速率：{result['target_rate']} 事件/秒，實際送出：{result['send_rate']} 事件/秒")  # 速率
+    print(f"期限內回覆吞吐量：{result['reply_throughput']} 事件/秒")  # 吞吐量
+    print(f"HTTP 狀態：{result['http_statuses']}")  # 狀態
+    latency = result["webhook_latency"]  # webhook 耗時
+    print(f"webhook 回應耗時：p50 {latency['p50_ms']} / p90 {latency['p90_ms']} / p99 {latency['p99_ms']} / max {latency['max_ms']} ms")  # webhook 耗時
+    latency = result["reply_latency"]  # 回覆耗時
+    print(f"送出到回覆耗時：p50 {latency['p50_ms']} / p90 {latency['p90_ms']} / p99 {latency['p99_ms']} / max {latency['max_ms']} ms")  # 回覆耗時
+    print(f"回覆：{result['replies']}（期限內 {result['replies_on_time']}，未收到 {result['replies_missing']}）")  # 回覆數
+    print(f"替身呼叫：{result['stand_in_calls']}，注入錯誤：{result['stand_in_errors']}")  # 替身統計
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="翻翻君端對端壓測（本機 LINE / DeepL / Google 替身）")  # 建立 parser
+    parser.add_argument("--速率", "--rate", dest="rate", type=float, default=20.0, help="每秒 webhook 數")
+    parser.add_argument("--秒數", "--duration", dest="duration", type=float, default=10.0, help="壓測秒數")
+    parser.add_argument("--批次", "--batch", dest="batch", type=int, default=1, help="每個 webhook 的事件數")
+    parser.add_argument("--比例", "--mix", dest="mix", default=DEFAULT_MIX, help="事件比例，例如 group_text=70,user_text=20,follow=5,join=5")
+    parser.add_argument("--群組數", "--groups", dest="groups", type=int, default=20, help="模擬群組數")
+    parser.add_argument("--使用者數", "--users", dest="users", type=int, default=200, help="模擬使用者數")
+    parser.add_argument("--群組語言", "--group-languages", dest="group_languages", default="中文,英文,日文,泰文", help="群組翻譯語言")
+    parser.add_argument("--不重複比例", "--unique-ratio", dest="unique_ratio", type=float, default=0.8, help="無法命中快取的訊息比例")
+    parser.add_argument("--併發", "--concurrency", dest="concurrency", type=int, default=64, help="同時連線上限")
+    parser.add_argument("--等待回覆", "--drain", dest="drain", type=float, default=30.0, help="送完後等待回覆秒數")
+    parser.add_argument("--回覆期限", "--reply-token-ttl", dest="reply_token_ttl", type=float, default=60.0, help="replyToken 有效秒數")
+    parser.add_argument("--deepl-latency", type=float, default=0.15, help="DeepL 替身延遲秒數")
+    parser.add_argument("--google-latency", type=float, default=0.10, help="Google 替身延遲秒數")
+    parser.add_argument("--line-latency", type=float, default=0.05, help="LINE 替身延遲秒數")
+    parser.add_argument("--deepl-error-rate", type=float, default=0.0, help="DeepL 替身錯誤比例（回傳 429）")
+    parser.add_argument("--google-error-rate", type=float, default=0.0, help="Google 替身錯誤比例（回傳 500）")
+    parser.add_argument("--line-error-rate", type=float, default=0.0, help="LINE 替身錯誤比例（回傳 500）")
+    parser.add_argument("--jitter", type=float, default=0.3, help="延遲抖動比例")
+    parser.add_argument("--目標", "--target", dest="target", default="", help="改測已啟動的應用程式網址（需自行指向替身）")
+    parser.add_argument("--app-env", action="append", default=[], help="啟動應用程式時額外設定 KEY=VALUE，可重複")
+    parser.add_argument("--json", dest="json_path", default="", help="另存 JSON 結果路徑")
+    return parser  # 回傳 parser
+
+
+async def _main_async(args) -> int:
+    state = StandInState(
+        latency={"deepl": args.deepl_latency, "google": args.google_latency, "line": args.line_latency},
+        error_rate={"deepl": args.deepl_error_rate, "google": args.google_error_rate, "line": args.line_error_rate},
+        jitter=args.jitter,
+    )  # 替身設定
+    server = start_stand_ins(state)  # 啟動替身
+    stand_in_url = f"http://127.0.0.1:{server.server_address[1]}"  # 替身網址
+    process = None  # 應用程式子程序
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            base_url = args.target.rstrip("/")  # 目標網址
+            if base_url:
+                print(f"替身網址：{stand_in_url}（請設定 LINE_API_HOST / DEEPL_API_URL / GOOGLE_TRANSLATE_URL）")  # 提示設定
+            else:
+                process, base_url = start_app(stand_in_url, args.app_env, workdir)  # 啟動應用程式
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)  # 連線池
+            async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+                await wait_until_ready(client, base_url, timeout=30.0)  # 等待就緒
+                result = await run_load(args, LoadRunner(client, base_url), state)  # 執行壓測
+        finally:
+            if process is not None:
+                process.terminate()  # 停止應用程式
+                process.wait(timeout=30)  # 等待結束
+            server.shutdown()  # 停止替身
+    print_report(result)  # 輸出報告
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")  # 另存 JSON
+    return 0  # 回傳成功
+
+
+def main() -> int:
+    args = build_parser().parse_args()  # 解析參數
+    try:
+        parse_mix(args.mix)  # 先檢查比例格式
+    except ValueError as exc:
+        print(exc)  # 顯示錯誤
+        return 1  # 回傳失敗
+    return asyncio.run(_main_async(args))  # 執行壓測
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())  # 以退出碼結束
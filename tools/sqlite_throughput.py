@@ -0,0 +1,223 @@
+import argparse  # 匯入命令列參數工具
+import itertools  # 匯入計數工具
+import json  # 匯入 JSON 工具
+import os  # 匯入環境變數工具
+import random  # 匯入亂數工具
+import subprocess  # 匯入子程序工具
+import sys  # 匯入系統模組
+import tempfile  # 匯入暫存目錄工具
+import threading  # 匯入執行緒工具
+import time  # 匯入計時工具
+from pathlib import Path  # 匯入路徑工具
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # 取得專案根目錄
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))  # 將專案根目錄加入模組搜尋路徑
+
+from app.core.statistics import percentile  # 匯入百分位數工具
+
+
+PROFILES = {
+    "stock": {"SQLITE_TUNING_ENABLED": "false", "SQLITE_WRITE_QUEUE_ENABLED": "false"},
+    "wal": {"SQLITE_TUNING_ENABLED": "true", "SQLITE_WRITE_QUEUE_ENABLED": "false"},
+    "tuned": {"SQLITE_TUNING_ENABLED": "true", "SQLITE_WRITE_QUEUE_ENABLED": "true"},
+}  # 比較的 SQLite 設定（原始 / 只開 WAL 等調校 / 調校加單一寫入者）
+DEFAULT_MIX = "group_text=60,user_text=15,new_user=15,set_language=10"  # 預設訊息比例
+MESSAGE_KINDS = ("group_text", "user_text", "new_user", "set_language")  # 支援的訊息種類
+GROUP_COUNT = 50  # 預先建立的群組數
+USER_COUNT = 200  # 預先建立的使用者數
+
+
+def parse_mix(raw: str) -> dict[str, float]:
+    mix: dict[str, float] = {}  # 訊息種類 → 權重
+    for part in raw.split(","):
+        kind, _, weight = part.partition("=")  # 拆解 kind=weight
+        if kind.strip() not in MESSAGE_KINDS:
+            raise ValueError(f"不支援的訊息種類：{kind}")  # 種類錯誤
+        mix[kind.strip()] = float(weight or 0)  # 記錄權重
+    return mix  # 回傳比例
+
+
+def _child_env(profile: str, args, workdir: str) -> dict[str, str]:
+    env = dict(os.environ)  # 複製目前環境變數
+    env.update(PROFILES[profile])  # 套用比較設定
+    env.update(
+        {
+            "DATABASE_URL": f"sqlite:///{workdir}/{profile}.db",
+            "DB_POOL_SIZE": str(args.threads),
+            "DB_MAX_OVERFLOW": "0",
+            "TRANSLATION_MEMORY_ENABLED": "false",
+            "REPLY_DEADLINE_SECONDS": "0",
+            "CARD_CACHE_WARM_UP": "false",
+            "DEEPL_RATE_PER_SECOND": "0",
+            "GOOGLE_RATE_PER_SECOND": "0",
+            "GROUP_CACHE_TTL_SECONDS": "1",
+        }
+    )  # 每種設定使用獨立資料庫，排除翻譯與限速影響
+    return env  # 回傳子程序環境變數
+
+
+def run_profile(profile: str, args, workdir: str) -> dict:
+    command = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--child",
+        profile,
+        "--threads",
+        str(args.threads),
+        "--duration",
+        str(args.duration),
+        "--mix",
+        args.mix,
+    ]  # 在獨立程序執行（設定於匯入時讀取）
+    completed = subprocess.run(command, env=_child_env(profile, args, workdir), capture_output=True, text=True, cwd=PROJECT_ROOT)  # 執行子程序
+    if completed.returncode != 0:
+        raise RuntimeError(f"{profile} 執行失敗：\n{completed.stderr}")  # 子程序錯誤
+    return json.loads(completed.stdout.strip().splitlines()[-1])  # 最後一行為 JSON 結果
+
+
+def run_child(profile: str, args) -> dict:
+    from linebot.v3.webhooks import DeliveryContext, GroupSource, MessageEvent, TextMessageContent, UserSource  # 匯入事件模型
+
+    import app.bot.handlers as handlers  # 匯入 LINE 事件處理器
+    from app.db.session import engine, init_db, sqlite_stats  # 匯入資料庫初始化與統計
+    from app.services.id_service import seed_member_code_counter  # 匯入編號計數器初始化
+    from app.services import translation_service  # 匯入翻譯服務
+
+    init_db()  # 建立資料表
+    seed_member_code_counter(engine)  # 與正式啟動相同，先對齊編號計數器
+    translation_service.SYNC_PROVIDERS.update(
+        deepl=lambda text, code, deadline=None: f"[{code}] {text}",
+        google=lambda text, code, deadline=None: f"[{code}] {text}",
+    )  # 假翻譯來源（不連網）
+    handlers._reply_messages = lambda reply_token, messages: None  # 不實際回覆 LINE
+    event_ids = itertools.count()  # 每個事件使用不同 webhookEventId
+    new_user_ids = itertools.count()  # 新使用者流水號
+
+    def text_event(text: str, group_id: str | None, user_id: str) -> MessageEvent:
+        source = GroupSource(type="group", groupId=group_id, userId=user_id) if group_id else UserSource(type="user", userId=user_id)  # 事件來源
+        return MessageEvent(
+            type="message",
+            mode="active",
+            timestamp=int(time.time() * 1000),
+            source=source,
+            webhookEventId=f"sq{next(event_ids)}",
+            deliveryContext=DeliveryContext(isRedelivery=False),
+            replyToken="sq",
+            message=TextMessageContent(type="text", id="1", text=text, quoteToken="q"),
+        )  # 文字訊息事件
+
+    dispatch = handlers.line_handler.dispatch_event  # 事件分派
+    groups = [f"Csq{index:03d}" for index in range(GROUP_COUNT)]  # 群組 ID
+    users = [f"Usq{index:04d}" for index in range(USER_COUNT)]  # 使用者 ID
+    for index, group_id in enumerate(groups):
+        dispatch(text_event("綁定邀請者", group_id, users[index % USER_COUNT]))  # 建立群組並綁定邀請者
+        dispatch(text_event("設定語言 中文、英文、泰文", group_id, users[index % USER_COUNT]))  # 三種語言
+    for user_id in users:
+        dispatch(text_event("hello", None, user_id))  # 建立使用者
+
+    def build(kind: str, rng: random.Random) -> MessageEvent:
+        index = rng.randrange(GROUP_COUNT)  # 隨機群組
+        if kind == "group_text":
+            return text_event(f"see you at {rng.random()}", groups[index], users[rng.randrange(USER_COUNT)])  # 群組翻譯（讀取）
+        if kind == "user_text":
+            return text_event(f"thanks {rng.random()}", None, users[rng.randrange(USER_COUNT)])  # 個人翻譯（讀取）
+        if kind == "new_user":
+            return text_event(f"hi {rng.random()}", groups[index], f"Unew{next(new_user_ids)}")  # 首次發言建立使用者（寫入）
+        language = rng.choice(["日文", "韓文", "越南文"])  # 切換語言
+        return text_event(f"設定語言 {language}", groups[index], users[index % USER_COUNT])  # 邀請者切換群組語言（寫入）
+
+    mix = parse_mix(args.mix)  # 訊息比例
+    kinds, weights = list(mix), list(mix.values())  # 拆成清單
+    stop_at = time.perf_counter() + args.duration  # 結束時間
+    lock = threading.Lock()  # 統計鎖
+    latencies: list[float] = []  # 每則訊息耗時
+    errors: dict[str, int] = {}  # 錯誤類型 → 次數
+    counts = {kind: 0 for kind in kinds}  # 各種類完成數
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)  # 每個執行緒獨立亂數
+        while time.perf_counter() < stop_at:
+            kind = rng.choices(kinds, weights)[0]  # 依比例挑選
+            event = build(kind, rng)  # 建立事件
+            started = time.perf_counter()  # 開始計時
+            try:
+                dispatch(event)  # 完整事件處理
+            except Exception as exc:
+                reason = "database_locked" if "database is locked" in str(exc) else type(exc).__name__  # 錯誤分類
+                with lock:
+                    errors[reason] = errors.get(reason, 0) + 1  # 累計錯誤
+                continue
+            elapsed = time.perf_counter() - started  # 耗時
+            with lock:
+                latencies.append(elapsed)  # 記錄耗時
+                counts[kind] += 1  # 累計完成數
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]  # 建立執行緒
+    started = time.perf_counter()  # 開始時間
+    for thread in threads:
+        thread.start()  # 啟動
+    for thread in threads:
+        thread.join()  # 等待結束
+    elapsed = time.perf_counter() - started  # 實際秒數
+    latencies.sort()  # 排序後計算百分位數
+    stats = sqlite_stats()  # 實際生效參數與排隊統計
+    return {
+        "profile": profile,
+        "threads": args.threads,
+        "seconds": round(elapsed, 2),
+        "messages": len(latencies),
+        "messages_per_second": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        "counts": counts,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "journal_mode": stats["pragmas"]["journal_mode"],
+        "write_queue": stats["write_queue"],
+    }  # 本設定結果
+
+
+def print_report(results: list[dict]) -> None:
+    print(f"{'設定':8} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>9}  {'journal':8} 錯誤")  # 表頭
+    for result in results:
+        errors = ", ".join(f"{name}={count}" for name, count in result["errors"].items()) or "0"  # 錯誤摘要
+        print(
+            f"{result['profile']:8} {result['messages_per_second']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['max_ms']:>9.2f}  {result['journal_mode']:8} {errors}"
+        )  # 每種設定一行
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="翻翻君 SQLite 併發寫入吞吐量（比較原始設定與調校設定）")  # 建立 parser
+    parser.add_argument("--設定", "--profiles", dest="profiles", default=",".join(PROFILES), help="要比較的設定（逗號分隔）：stock / wal / tuned")
+    parser.add_argument("--執行緒", "--threads", dest="threads", type=int, default=16, help="同時處理訊息的執行緒數（模擬背景 worker）")
+    parser.add_argument("--秒數", "--duration", dest="duration", type=float, default=10.0, help="每種設定的量測秒數")
+    parser.add_argument("--比例", "--mix", dest="mix", default=DEFAULT_MIX, help="訊息比例，例如 group_text=60,user_text=15,new_user=15,set_language=10")
+    parser.add_argument("--json", dest="json_path", default="", help="另存 JSON 結果路徑")
+    parser.add_argument("--child", default="", help=argparse.SUPPRESS)  # 內部使用：在子程序執行單一設定
+    return parser  # 回傳 parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()  # 解析參數
+    parse_mix(args.mix)  # 先驗證比例
+    if args.child:
+        print(json.dumps(run_child(args.child, args), ensure_ascii=False))  # 子程序輸出 JSON
+        return 0
+    profiles = [profile.strip() for profile in args.profiles.split(",") if profile.strip()]  # 要比較的設定
+    unknown = [profile for profile in profiles if profile not in PROFILES]  # 不支援的設定
+    if unknown:
+        print(f"不支援的設定：{', '.join(unknown)}")  # 提示
+        return 2
+    workdir = tempfile.mkdtemp(prefix="fanfan-sqlite-")  # 暫存資料庫目錄
+    results = [run_profile(profile, args, workdir) for profile in profiles]  # 依序量測
+    print_report(results)  # 輸出表格
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")  # 另存 JSON
+    return 0  # 回傳成功
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())  # 以退出碼結束